@@ -0,0 +1,30 @@
+"""
+Ciclos da placa (no simulador do ATmega328P) para imprimir cada programa
+de exemplo, com o código padrão e com `--precompute`. A USART é
+considerada sempre livre, então os ciclos medem só o código gerado.
+
+Uso:
+    python -m benchmarks.board_cycles [programa.txt ...]
+"""
+import sys
+from pathlib import Path
+
+from pipeline.api import compile_source
+from simulator.avr import simulate
+
+SAMPLES = sorted(Path(__file__).resolve().parent.parent.glob("samples/*/*_tests.txt"))
+
+
+def board_cycles(source: str, precompute: bool) -> int:
+    return simulate(compile_source(source, precompute=precompute).asm).cycles
+
+
+def main(paths: list[Path]) -> None:
+    print(f"{'program':>24} {'cycles':>10} {'precompute':>10}")
+    for path in paths:
+        source = path.read_text(encoding="utf8")
+        print(f"{path.stem:>24} {board_cycles(source, False):>10} {board_cycles(source, True):>10}")
+
+
+if __name__ == "__main__":
+    main([Path(arg) for arg in sys.argv[1:]] or SAMPLES)
@@ -0,0 +1,63 @@
+"""
+Tempo de cada fase (lexer, parser, análise semântica, geração de código e
+os desenhos `render_ast`/`render_annotated_ast`) de uma expressão aninhada
+`(((1 1 +) 1 +) ... 1 +)` em várias profundidades. Com todos os percursos
+iterativos, o tempo por nível deve ficar constante.
+
+Cada profundidade roda `REPEATS` vezes, depois de um aquecimento, e vale o
+menor tempo de cada fase: uma única rodada mede também a partida a frio e
+as coletas do GC que caírem nela, e o tempo por nível parece crescer com a
+profundidade sem que nenhum percurso seja superlinear.
+
+Uso:
+    python -m benchmarks.nesting_depth [profundidade ...]
+"""
+import sys
+import time
+
+from lexer.compiled import CompiledLexer
+from lexer.token_stream import TokenStream
+from parser.parser import LL1Parser
+from parser.render import render_annotated_ast, render_ast
+from semantics.analyzer import SemanticAnalyzer
+from generator.generator import CodeGenerator
+
+DEPTHS = [1_000, 10_000, 100_000]
+REPEATS = 3
+PHASES = ["lex", "parse", "analyze", "generate", "render", "render+"]
+
+
+def nested_source(depth: int) -> str:
+    return "(" * depth + "1 1 +)" + " 1 +)" * (depth - 1) + "\n"
+
+
+def time_phases(src: str) -> list[float]:
+    """Segundos de cada fase de `PHASES`, na ordem."""
+    marks = [time.perf_counter()]
+    tokens = TokenStream.from_tokens(CompiledLexer(src))
+    marks.append(time.perf_counter())
+    arena = LL1Parser().parse_arena(tokens)
+    marks.append(time.perf_counter())
+    SemanticAnalyzer().annotate(arena)
+    marks.append(time.perf_counter())
+    CodeGenerator().generate(arena)
+    marks.append(time.perf_counter())
+    render_ast(arena)
+    marks.append(time.perf_counter())
+    render_annotated_ast(arena)
+    marks.append(time.perf_counter())
+    return [end - start for start, end in zip(marks, marks[1:])]
+
+
+def main(depths: list[int]) -> None:
+    time_phases(nested_source(100))
+    print(f"{'depth':>10}" + "".join(f"{phase:>10}" for phase in PHASES) + f"{'total':>10}   (µs/level)")
+    for depth in depths:
+        src = nested_source(depth)
+        best = [min(times) for times in zip(*(time_phases(src) for _ in range(REPEATS)))]
+        per_level = [seconds / depth * 1e6 for seconds in best]
+        print(f"{depth:>10}" + "".join(f"{us:>10.2f}" for us in per_level) + f"{sum(per_level):>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEPTHS)
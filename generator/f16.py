@@ -0,0 +1,237 @@
+"""
+Aritmética half-precision (IEEE 754, 16 bits) com o mesmo resultado, bit a
+bit, das rotinas AVR em `generator/subroutines`. Os valores são inteiros de
+16 bits (byte alto = r25/r23, byte baixo = r24/r22), e cada função segue o
+assembly correspondente, registrador por registrador, inclusive onde ele
+se afasta do IEEE:
+
+- `add_f16` trunca em vez de arredondar e zera os resultados subnormais;
+  quando B é subnormal ou zero, o `ldi r16, 1` que ajusta o expoente
+  sobrescreve o byte baixo da mantissa de B com 1;
+- `mul_f16` e `div_f16` calculam o expoente em 8 bits sem sinal, então um
+  expoente negativo dá a volta e vira infinito;
+- `div_f16` só trata +0 como divisor zero (-0 é dividido como 2^-15) e
+  monta o byte baixo do resultado com bits sobrepostos;
+- `mod_f16` devolve NaN (0x7E00) quando o divisor é ±0;
+- `pow_f16` desloca o expoente inteiro com os bytes trocados, então
+  expoentes a partir de 256 dão resultados errados;
+- `f16_to_uint16` ignora o sinal e o laço FOR usa só o byte baixo.
+
+Usado pela dobra de constantes (`generator/folding.py`), que precisa
+reproduzir na compilação exatamente o que a placa calcularia.
+"""
+import struct
+
+SIGN = 0x8000
+NAN = 0x7E00
+ONE = 0x3C00
+
+
+def to_bits(value: float) -> int:
+    """Codificação half-precision de `value` (a mesma do `LDI` dos literais); OverflowError fora da faixa."""
+    try:
+        return int.from_bytes(struct.pack('<e', value), "little")
+    except struct.error as e:
+        raise OverflowError(str(e)) from None
+
+
+def from_bits(bits: int) -> float:
+    return struct.unpack('<e', bits.to_bytes(2, "little"))[0]
+
+
+def is_zero(a: int) -> bool:
+    """`is_f16_zero`: ±0."""
+    return not a & 0x7FFF
+
+
+def _unpack(x: int) -> tuple[int, int]:
+    """Expoente e mantissa de 11 bits; subnormais usam expoente 1 e nenhum bit implícito."""
+    exp = (x >> 10) & 0x1F
+    mant = x & 0x3FF
+    if exp:
+        return exp, mant | 0x400
+    return 1, mant
+
+
+def add_f16(a: int, b: int) -> int:
+    sign_a, sign_b = a & SIGN, b & SIGN
+    exp_a, mant_a = _unpack(a)
+    exp_b, mant_b = _unpack(b)
+    if not b & 0x7C00:
+        mant_b = (mant_b & 0x300) | 1
+
+    # Alinhamento: a mantissa do menor expoente é deslocada (e truncada).
+    if exp_a >= exp_b:
+        exp = exp_a
+        mant_b >>= exp_a - exp_b
+    else:
+        exp = exp_b
+        mant_a >>= exp_b - exp_a
+
+    if sign_a == sign_b:
+        mant, sign = mant_a + mant_b, sign_a
+        if not mant:
+            return sign
+        if mant & 0x800:
+            mant >>= 1
+            exp += 1
+            if exp >= 31:
+                return sign | 0x7C00
+            return _pack_add(sign, exp, mant)
+    elif mant_a == mant_b:
+        return 0
+    elif mant_a > mant_b:
+        mant, sign = mant_a - mant_b, sign_a
+    else:
+        mant, sign = mant_b - mant_a, sign_b
+
+    # Normalização: desloca até o bit implícito; abaixo do expoente 1 vira zero.
+    while not mant & 0x400:
+        mant <<= 1
+        exp = (exp - 1) & 0xFF
+        if exp < 1:
+            return sign
+    return _pack_add(sign, exp, mant)
+
+
+def _pack_add(sign: int, exp: int, mant: int) -> int:
+    return sign | ((exp << 10) & 0x7C00) | (mant & 0x3FF)
+
+
+def sub_f16(a: int, b: int) -> int:
+    return add_f16(a, b ^ SIGN)
+
+
+def mul_f16(a: int, b: int) -> int:
+    sign = (a ^ b) & SIGN
+    if not a & 0x7FFF or not b & 0x7FFF:
+        return sign
+    exp_a, mant_a = _unpack(a)
+    exp_b, mant_b = _unpack(b)
+
+    exp = (exp_a + exp_b - 15) & 0xFF
+    product = mant_a * mant_b
+    if product & (1 << 21):
+        product >>= 1
+        exp = (exp + 1) & 0xFF
+
+    if exp >= 31:
+        return sign | 0x7C00
+    if exp < 1:
+        return sign
+    return sign | (exp << 10) | ((product >> 10) & 0x3FF)
+
+
+def div_f16(a: int, b: int) -> int:
+    if not b:
+        return (a & SIGN) | 0x7C00
+    sign = (a ^ b) & SIGN
+    if not a & 0x7FFF:
+        return sign
+
+    # O bit implícito é inserido mesmo em subnormais (e em -0 no divisor).
+    exp = (((a >> 10) & 0x1F) - ((b >> 10) & 0x1F) + 15) & 0xFF
+    remainder = (a & 0x3FF) | 0x400
+    divisor = (b & 0x3FF) | 0x400
+    quotient = 0
+    for _ in range(16):
+        bit = remainder >= divisor
+        if bit:
+            remainder -= divisor
+        quotient = ((quotient << 1) | bit) & 0xFFFF
+        remainder = (remainder << 1) & 0xFFFF
+
+    if not quotient:
+        return sign
+    while not quotient & 0xFF00:
+        quotient = (quotient << 8) & 0xFFFF
+        exp = (exp - 8) & 0xFF
+        if not quotient & 0xFF00:
+            return sign
+    while not quotient & 0x8000:
+        quotient = (quotient << 1) & 0xFFFF
+        exp = (exp - 1) & 0xFF
+
+    if exp >= 31:
+        return sign | 0x7C00
+    if exp < 1:
+        return sign
+    high, low = quotient >> 8, quotient & 0xFF
+    # O byte baixo junta M7..M3 (bits 7-3) com M2..M0 deslocados só até os
+    # bits 4-2, como no assembly.
+    r25 = ((exp << 2) & 0x7C) | ((high & 0x60) >> 5)
+    r24 = ((high & 0x1F) << 3) | ((low & 0xE0) >> 3)
+    return sign | (r25 << 8) | r24
+
+
+def div_int_f16(a: int, b: int) -> int:
+    r = div_f16(a, b)
+    sign = r & SIGN
+    if not r & 0x7FFF:
+        return sign
+    exp = (r >> 10) & 0x1F
+    if exp == 31:
+        return r
+    e = exp - 15
+    if e < 0:
+        return sign
+    if e >= 10:
+        return r
+
+    k = 10 - e
+    low = r & (0xFF << k) & 0xFF
+    high = r >> 8
+    if k >= 9:
+        keep = 0x02 if k == 9 else 0x00
+        high = (high & 0xFC) | (high & 0x03 & keep)
+    return (high << 8) | low
+
+
+def mod_f16(a: int, b: int) -> int:
+    if not b & 0x7FFF:
+        return NAN
+    quotient = div_int_f16(a, b)
+    # A pilha da rotina troca os operandos: calcula (B * i) - A e inverte o sinal.
+    r = sub_f16(mul_f16(b, quotient), a)
+    if r & 0x7FFF:
+        r ^= SIGN
+    return r
+
+
+def f16_to_uint16(x: int) -> int:
+    """Inteiro (sem sinal, 16 bits) de um float16; o sinal é ignorado."""
+    exp = (x >> 10) & 0x1F
+    mant = (x & 0x3FF) | 0x400
+    shift = exp - 25
+    if shift < 0:
+        return mant >> -shift
+    return (mant << shift) & 0xFFFF
+
+
+def pow_f16(a: int, b: int) -> int:
+    n = f16_to_uint16(b)
+    if n == 1:
+        return a
+    result, power = ONE, a
+    low, high = n & 0xFF, n >> 8
+    while low or high:
+        if low & 1:
+            result = mul_f16(result, power)
+        power = mul_f16(power, power)
+        # `lsr r26` seguido de `ror r27`: o bit que sai do byte baixo entra
+        # no topo do byte alto (o certo seria deslocar o alto primeiro).
+        carry = low & 1
+        low >>= 1
+        high = (carry << 7) | (high >> 1)
+    return result
+
+
+def for_count(x: int) -> int:
+    """Iterações de um FOR: `f16_to_uint16` e só o byte baixo (`MOV r20, r26`)."""
+    return f16_to_uint16(x) & 0xFF
+
+
+BINARY_OPS = {
+    "+": add_f16, "-": sub_f16, "*": mul_f16, "|": div_f16,
+    "/": div_int_f16, "%": mod_f16, "^": pow_f16,
+}
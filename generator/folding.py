@@ -0,0 +1,117 @@
+"""
+Dobra de constantes sobre a AST anotada. Cada subárvore que só depende de
+literais é avaliada na compilação com a aritmética bit a bit das rotinas
+AVR (`generator/f16.py`), e o valor vai para `ASTArena.consts` (o
+`const_value` das vistas em árvore). O gerador de código carrega esse
+valor direto com `LDI`, sem chamar nenhuma sub-rotina.
+
+Não são dobrados:
+- `MEM` (lê ou escreve a memória), nem nada que dependa dele;
+- `RES` (lê o resultado de outra linha), a não ser que quem chama saiba o
+  que a linha vai ler (`read_result`, usado por `generator/table.py`);
+- um `FOR` que não executa nenhuma vez (o resultado seria o conteúdo
+  anterior da temporária);
+- um `FOR` no corpo de outro `FOR`: os dois usam r20 como contador, e o
+  laço de dentro muda a contagem do de fora, então eliminá-lo mudaria o
+  programa;
+- valores que o `LDI` de um literal não reproduz exatamente (NaN com
+  outro sinal ou outro payload).
+"""
+from typing import Callable
+
+from parser.arena import ASTArena, Op
+from . import f16
+
+BINARY_OPS = {Op.ADD: "+", Op.SUB: "-", Op.MUL: "*", Op.REAL_DIV: "|",
+              Op.INT_DIV: "/", Op.MOD: "%", Op.POW: "^"}
+
+
+def _subtree_start(arena: ASTArena, node: int) -> int:
+    while arena.child_count[node]:
+        node = arena.child(node, 0)
+    return node
+
+
+def _loadable(bits: int) -> bool:
+    """O valor volta aos mesmos bits quando o gerador o escreve como literal."""
+    try:
+        return f16.to_bits(float(repr(f16.from_bits(bits)))) == bits
+    except OverflowError:
+        return False
+
+
+def fold_constants(arena: ASTArena, root: int | None = None, line_index: int = 0,
+                   read_result: Callable[[int], int | None] | None = None) -> int:
+    """
+    Dobra as constantes da subárvore de `root` (por padrão, a árvore
+    inteira) em `arena.consts` e devolve quantos nós receberam um valor.
+    Com `read_result`, um `RES` da linha `line_index` vale
+    `read_result(índice da linha lida)` (None se o valor não é conhecido).
+    """
+    values = constant_values(arena, root, line_index, read_result)
+    arena.consts.update(values)
+    return len(values)
+
+
+def constant_values(arena: ASTArena, root: int | None = None, line_index: int = 0,
+                    read_result: Callable[[int], int | None] | None = None) -> dict[int, float]:
+    """
+    Valores que `fold_constants` gravaria, sem alterar a arena. Os IDs da
+    subárvore formam um intervalo em pós-ordem, então os filhos são
+    avaliados antes do pai em uma única varredura.
+    """
+    if root is None:
+        root = arena.root
+    start = _subtree_start(arena, root)
+    ops = arena.ops
+
+    # Nós executados dentro do corpo de um FOR (o contador do laço de
+    # fora ainda está em r20 enquanto eles rodam).
+    in_loop = bytearray(root - start + 1)
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        children = arena.children(n)
+        for i, child in enumerate(children):
+            in_loop[child - start] = in_loop[n - start] or (ops[n] == Op.FOR and i == 1)
+        stack.extend(children)
+
+    values: list[int | None] = [None] * (root - start + 1)
+    folded: dict[int, float] = {}
+    for n in range(start, root + 1):
+        op = ops[n]
+        value = None
+        if op == Op.NUMBER:
+            try:
+                value = f16.to_bits(float(arena.label(n)))
+            except OverflowError:
+                pass
+            values[n - start] = value
+            continue
+
+        operands = [values[child - start] for child in arena.children(n)]
+        if op in BINARY_OPS:
+            if None not in operands:
+                value = f16.BINARY_OPS[BINARY_OPS[op]](*operands)
+        elif op == Op.RES:
+            if read_result is not None:
+                value = read_result(line_index - int(arena.label(arena.child(n, 0))))
+        elif op == Op.IF:
+            value = operands[0]  # a condição, usada pelo ELSE
+        elif op == Op.ELSE:
+            then_node = arena.child(n, 0)
+            condition = values[arena.child(then_node, 0) - start]
+            if condition is not None:
+                branch = arena.child(arena.child(n, 0), 1) if not f16.is_zero(condition) else arena.child(n, 1)
+                value = values[branch - start]
+        elif op == Op.FOR:
+            count, body = operands
+            if count is not None and body is not None and not in_loop[n - start] and f16.for_count(count):
+                value = body
+
+        if value is not None and op != Op.IF and not _loadable(value):
+            value = None
+        values[n - start] = value
+        if value is not None and op != Op.IF:
+            folded[n] = f16.from_bits(value)
+    return folded
@@ -11,7 +11,10 @@ from .subroutines.pow_f16 import POW_F16
 from .subroutines.res_op import RES_OP
 from .subroutines.sub_f16 import SUB_F16
 from .subroutines.utils import USART_CONFIG, PRINT_F16, SERIAL_COMM
+from .folding import constant_values, fold_constants
 from parser.ast_node import ASTNode
+from parser.arena import ASTArena, Op
+from parser.traversal import trampoline
 
 
 class TempVarManager:
@@ -21,15 +24,34 @@ class TempVarManager:
 
     def __init__(self):
         self.count = 0
-        self.definitions = []
+        self.namespace = ""
+        # (namespace, count) dos namespaces já encerrados, em ordem.
+        self.closed: list[tuple[str, int]] = []
+
+    def set_namespace(self, namespace: str) -> None:
+        """Recomeça a numeração em 1 sob um novo prefixo: `T<namespace><n>`."""
+        if self.count:
+            self.closed.append((self.namespace, self.count))
+        self.namespace, self.count = namespace, 0
 
     def new_temp(self) -> str:
-        """Cria um novo nome de variável temporária e armazena sua definição."""
+        """Cria um novo nome de variável temporária."""
         self.count += 1
-        temp_name = f"T{self.count}"
-        self.definitions.append(f"{temp_name}_L: .byte 1")
-        self.definitions.append(f"{temp_name}_H: .byte 1")
-        return temp_name
+        return f"T{self.namespace}{self.count}"
+
+    @property
+    def definitions(self) -> list[str]:
+        """
+        Definições `.byte` das temporárias criadas até aqui. São montadas a
+        partir dos contadores só quando pedidas, para que a geração em
+        streaming não acumule uma string por temporária ao longo do programa.
+        """
+        definitions = []
+        for namespace, count in (*self.closed, (self.namespace, self.count)):
+            for i in range(1, count + 1):
+                definitions.append(f"T{namespace}{i}_L: .byte 1")
+                definitions.append(f"T{namespace}{i}_H: .byte 1")
+        return definitions
 
     def get_temp_variables_definitions(self) -> str:
         """Retorna todas as definições de variáveis como uma única string."""
@@ -75,8 +97,23 @@ def generate_full_header():
     return '\n'.join(header_parts) + '\n'
 
 
-def generate_data_segment(results_size: int, temp_vars_defs: str):
-    """Monta a string para o segmento de dados (.dseg) do assembly."""
+def generate_data_segment(results_size: int, temp_vars_defs: str, results_first: bool = False):
+    """
+    Monta a string para o segmento de dados (.dseg) do assembly. Com
+    `results_first`, `results` vem antes das temporárias, no início da SRAM.
+    """
+    if results_first:
+        return f"""
+.dseg
+results: .byte {results_size}
+    .equ lo8_results = ((results) & 0xFF)
+    .equ hi8_results = (((results) >> 8) & 0xFF)
+{temp_vars_defs}
+
+storeVal: .byte 2
+    .equ BUFFER_ADDR = 0x100
+    .equ BUFFER_SIZE = 11
+"""
     return f"""
 .dseg
 {temp_vars_defs}
@@ -95,18 +132,82 @@ class LabelGenerator:
 
     def __init__(self):
         self.count = 0
+        self.namespace = ""
+        # Labels criados no namespace corrente (só depois de `set_namespace`).
+        self.issued: list[str] | None = None
+
+    def set_namespace(self, namespace: str) -> None:
+        """Recomeça a numeração em 1 sob um novo prefixo: `<prefix>_<namespace><n>`."""
+        self.namespace, self.count, self.issued = namespace, 0, []
 
     def new_label(self, prefix: str = "L") -> str:
         self.count += 1
-        return f"{prefix}_{self.count}"
+        label = f"{prefix}_{self.namespace}{self.count}"
+        if self.issued is not None:
+            self.issued.append(label)
+        return label
+
+
+BINARY_OPS = (Op.ADD, Op.SUB, Op.MUL, Op.POW, Op.REAL_DIV, Op.INT_DIV, Op.MOD)
+
+
+def _is_loadable_const(value: int | float | None) -> bool:
+    """A constante dobrada cabe em um f16 e é carregada com LDI (veja `CodeGenerator._visit`)."""
+    if value is None:
+        return False
+    try:
+        float_to_ieee754_half(float(value))
+        return True
+    except (OverflowError, struct.error):
+        return False
+
+
+def line_temps(arena: ASTArena, line_node: int) -> int:
+    """
+    Quantas temporárias o `CodeGenerator` (com a dobra de constantes) aloca
+    para a linha `line_node`, sem gerar código nem alterar a arena: uma por
+    operação binária, IF-ELSE, FOR, RES e MEM, exceto nas subárvores
+    dobradas.
+    """
+    folded = constant_values(arena, line_node)
+    temps = 0
+    stack = [line_node]
+    while stack:
+        node = stack.pop()
+        value = folded.get(node)
+        if _is_loadable_const(arena.consts.get(node) if value is None else value):
+            continue
+        op = arena.ops[node]
+        if op in BINARY_OPS or op in (Op.FOR, Op.MEM):
+            stack.extend(arena.children(node))
+        elif op == Op.ELSE:
+            then_node, else_branch = arena.children(node)
+            if_node, then_branch = arena.children(then_node)
+            stack.extend((arena.child(if_node, 0), then_branch, else_branch))
+        elif op != Op.RES:
+            continue
+        temps += 1
+    return temps
 
 
 class CodeGenerator:
     """
-    Percorre a AST anotada e gera o código assembly final.
+    Percorre a AST (arena) e gera o código assembly final.
     """
 
-    def __init__(self):
+    def __init__(self, namespaced: bool = False, fold: bool = True):
+        """
+        Com `namespaced`, labels e temporárias de cada linha são numerados a
+        partir de 1 sob o número da linha (`T3_1`, `else_3_1`): o código de
+        uma linha deixa de depender das linhas anteriores e pode ser gerado
+        em qualquer ordem ou em outro processo. A ordem e o tamanho das
+        variáveis no `.dseg` não mudam, então o binário montado é o mesmo.
+        Com `fold`, cada linha passa antes pela dobra de constantes
+        (`generator/folding.py`).
+        """
+        self.arena: ASTArena | None = None
+        self.namespaced = namespaced
+        self.fold = fold
         self.main_code = []
         self.temp_manager = TempVarManager()
         self.label_gen = LabelGenerator()
@@ -119,39 +220,60 @@ class CodeGenerator:
         """Retorna o corpo principal do código assembly gerado."""
         return "\n".join(self.main_code)
 
+    def take_main_code(self) -> str:
+        """Devolve o código gerado até aqui e esvazia o buffer (geração em streaming)."""
+        code = self.get_main_code()
+        self.main_code.clear()
+        return code
+
     def get_temp_definitions(self) -> str:
         """Retorna as definições de .byte para todas as variáveis temporárias usadas."""
         return "\n".join(self.temp_manager.definitions)
 
-    def generate(self, ast_root: ASTNode):
+    def generate(self, ast_root: ASTNode | ASTArena, first_line: int = 0):
         """
-        Ponto de entrada que inicia a geração de código, navegando a
-        estrutura recursiva de <program> e <program_tail>.
+        Ponto de entrada que inicia a geração de código: cada filho de
+        <program> é uma linha, gerada na ordem. O código é gerado a partir
+        da arena; uma árvore de `ASTNode` é convertida antes. `first_line`
+        é o índice da primeira linha quando a AST é só um trecho do programa.
         """
-        if not ast_root or ast_root.label != '<program>' or not ast_root.children:
-            return
+        if isinstance(ast_root, ASTNode):
+            if ast_root.label != '<program>' or not ast_root.children:
+                return
+            ast_root = ASTArena.from_tree(ast_root)
 
-        current_expr_node = ast_root.children[0]
-        current_tail_node = ast_root.children[1]
-        line_index = 0
-
-        self._process_line(current_expr_node, line_index)
+        arena = ast_root
+        if not arena or arena.ops[arena.root] != Op.PROGRAM or not arena.child_count[arena.root]:
+            return
 
-        line_index = 1
-        while current_tail_node and current_tail_node.label == '<program_tail>' and current_tail_node.children:
-            current_expr_node = current_tail_node.children[0]
-            self._process_line(current_expr_node, line_index)
+        self.arena = arena
+        for line_index, line_node in enumerate(arena.children(arena.root), first_line):
+            self._process_line(line_node, line_index)
 
-            current_tail_node = current_tail_node.children[1]
-            line_index += 1
+    def generate_line(self, line: ASTArena, line_index: int, line_node: int | None = None):
+        """
+        Gera uma única linha já anotada: por padrão, a raiz de uma arena
+        própria da linha (`LL1Parser.parse_lines`); `line_node` escolhe outra
+        expressão da arena. Sem namespaces, rótulos e temporárias continuam
+        numerados ao longo do programa inteiro.
+        """
+        self.arena = line
+        self._process_line(line.root if line_node is None else line_node, line_index)
 
-    def _process_line(self, line_node: ASTNode, line_index: int):
+    def _process_line(self, line_node: int, line_index: int):
         """
         Método auxiliar que gera o código para uma única linha de expressão,
         salvando e imprimindo seu resultado final.
         """
+        if self.namespaced:
+            namespace = f"{line_index + 1}_"
+            self.temp_manager.set_namespace(namespace)
+            self.label_gen.set_namespace(namespace)
+
         self.main_code.append(f"\n; --- Line {line_index + 1} ---")
 
+        if self.fold:
+            fold_constants(self.arena, line_node)
         final_loc = self._generate_expression(line_node, line_index)
 
         if not final_loc:
@@ -166,43 +288,47 @@ class CodeGenerator:
 
         self.main_code.append("    RCALL print_f16")
 
-    def _generate_expression(self, node: ASTNode, line_index: int) -> str:
+    def _generate_expression(self, node: int, line_index: int) -> str:
         """
-        Método despachante recursivo que lida com a otimização de forma segura.
+        Gera o código de uma expressão percorrendo a árvore com uma pilha
+        explícita (ver `trampoline`), na mesma ordem da versão recursiva.
         """
-        if node.const_value is not None:
-            temp_var = self.temp_manager.new_temp()
-            self.main_code.append(f"; Attempting to use constant folded value: {node.const_value}")
+        return trampoline((node, line_index), self._visit)
 
+    def _visit(self, request: tuple[int, int]):
+        """
+        Método despachante que lida com a otimização de forma segura. Os
+        métodos com filhos são geradores que pedem o código de cada filho
+        com `yield` e recebem de volta a localização do seu resultado.
+        """
+        node, line_index = request
+        arena = self.arena
+        const_value = arena.consts.get(node)
+        if const_value is not None:
+            # Subárvore dobrada na compilação: quem usa o valor o carrega
+            # direto com LDI, como um literal, sem nenhuma sub-rotina.
             try:
-                const_as_float = float(node.const_value)
-
-                low, high = float_to_ieee754_half(const_as_float)
-
-                self.main_code.append(self._generate_load_operand(str(node.const_value), "r24", "r25"))
-                self.main_code.append(f"    STS {temp_var}_L, r24")
-                self.main_code.append(f"    STS {temp_var}_H, r25")
-                return temp_var
-
+                float_to_ieee754_half(float(const_value))
+                return repr(float(const_value))
             except (OverflowError, struct.error):
                 self.main_code.append(
-                    f"; Constant value {node.const_value} is out of range for 16-bit float. Generating full expression instead.")
-                pass
+                    f"; Constant value {const_value} is out of range for 16-bit float. Generating full expression instead.")
 
-        if self._is_number(node.label):
+        op = arena.ops[node]
+        if op == Op.NUMBER:
             return self._generate_literal(node)
-        elif node.label in self.op_map:
+        elif op in BINARY_OPS:
             return self._generate_binary_op(node, line_index)
-        elif node.label == 'ELSE':
+        elif op == Op.ELSE:
             return self._generate_if_then_else(node, line_index)
-        elif node.label == 'FOR':
+        elif op == Op.FOR:
             return self._generate_for(node, line_index)
-        elif node.label == 'RES':
+        elif op == Op.RES:
             return self._generate_res(node, line_index)
-        elif node.label == 'MEM':
+        elif op == Op.MEM:
             return self._generate_mem(node, line_index)
 
-        raise NotImplementedError(f"Code generation for node '{node.label}' is not implemented.")
+        raise NotImplementedError(f"Code generation for node '{arena.label(node)}' is not implemented.")
 
     def _is_number(self, s: str) -> bool:
         try:
@@ -210,8 +336,8 @@ class CodeGenerator:
         except (ValueError, TypeError):
             return False
 
-    def _generate_literal(self, node: ASTNode) -> str:
-        return node.label
+    def _generate_literal(self, node: int) -> str:
+        return self.arena.label(node)
 
     def _generate_load_operand(self, operand_loc: str, reg_low: str, reg_high: str) -> str:
         if self._is_number(operand_loc):
@@ -221,15 +347,17 @@ class CodeGenerator:
         else:
             return f"    LDS {reg_low}, {operand_loc}_L\n    LDS {reg_high}, {operand_loc}_H"
 
-    def _generate_binary_op(self, node: ASTNode, line_index: int) -> str:
-        left_loc = self._generate_expression(node.children[0], line_index)
-        right_loc = self._generate_expression(node.children[1], line_index)
+    def _generate_binary_op(self, node: int, line_index: int) -> str:
+        arena = self.arena
+        left_loc = (yield arena.child(node, 0), line_index)
+        right_loc = (yield arena.child(node, 1), line_index)
 
-        subroutine = self.op_map[node.label]
+        label = arena.label(node)
+        subroutine = self.op_map[label]
         temp_result = self.temp_manager.new_temp()
 
         code = [
-            f"; Binary op: {left_loc} {node.label} {right_loc}",
+            f"; Binary op: {left_loc} {label} {right_loc}",
             self._generate_load_operand(left_loc, "r24", "r25"),
             self._generate_load_operand(right_loc, "r22", "r23"),
             f"    RCALL {subroutine}",
@@ -239,32 +367,33 @@ class CodeGenerator:
         self.main_code.extend(code)
         return temp_result
 
-    def _generate_if_then_else(self, node: ASTNode, line_index: int) -> str:
-        then_node = node.children[0]
-        else_branch = node.children[1]
-        if_node = then_node.children[0]
-        then_branch = then_node.children[1]
-        condition = if_node.children[0]
+    def _generate_if_then_else(self, node: int, line_index: int) -> str:
+        arena = self.arena
+        then_node = arena.child(node, 0)
+        else_branch = arena.child(node, 1)
+        if_node = arena.child(then_node, 0)
+        then_branch = arena.child(then_node, 1)
+        condition = arena.child(if_node, 0)
 
         else_label = self.label_gen.new_label("else")
         end_if_label = self.label_gen.new_label("endif")
 
         temp_final = self.temp_manager.new_temp()
 
-        condition_loc = self._generate_expression(condition, line_index)
+        condition_loc = (yield condition, line_index)
         self.main_code.append(f"; IF-ELSE expression")
         self.main_code.append(self._generate_load_operand(condition_loc, "r24", "r25"))
         self.main_code.append("    RCALL is_f16_zero")
         self.main_code.append(f"    BREQ {else_label}")
 
-        then_loc = self._generate_expression(then_branch, line_index)
+        then_loc = (yield then_branch, line_index)
         self.main_code.append(self._generate_load_operand(then_loc, "r24", "r25"))
         self.main_code.append(f"    STS {temp_final}_L, r24")
         self.main_code.append(f"    STS {temp_final}_H, r25")
         self.main_code.append(f"    RJMP {end_if_label}")
 
         self.main_code.append(f"{else_label}:")
-        else_loc = self._generate_expression(else_branch, line_index)
+        else_loc = (yield else_branch, line_index)
         self.main_code.append(self._generate_load_operand(else_loc, "r24", "r25"))
         self.main_code.append(f"    STS {temp_final}_L, r24")
         self.main_code.append(f"    STS {temp_final}_H, r25")
@@ -273,8 +402,8 @@ class CodeGenerator:
 
         return temp_final
 
-    def _generate_for(self, node: ASTNode, line_index: int) -> str:
-        iterations_node, body_node = node.children
+    def _generate_for(self, node: int, line_index: int) -> str:
+        iterations_node, body_node = self.arena.children(node)
 
         loop_start_label = self.label_gen.new_label("for_start")
         loop_end_label = self.label_gen.new_label("for_end")
@@ -282,7 +411,7 @@ class CodeGenerator:
         temp_for_result = self.temp_manager.new_temp()
 
         self.main_code.append(f"; FOR loop setup")
-        iterations_loc = self._generate_expression(iterations_node, line_index)
+        iterations_loc = (yield iterations_node, line_index)
         self.main_code.append(self._generate_load_operand(iterations_loc, "r24", "r25"))
         self.main_code.append("    MOV r22, r24")
         self.main_code.append("    MOV r23, r25")
@@ -293,7 +422,7 @@ class CodeGenerator:
         self.main_code.append("    TST r20")
         self.main_code.append(f"    BREQ {loop_end_label}")
 
-        body_result_loc = self._generate_expression(body_node, line_index)
+        body_result_loc = (yield body_node, line_index)
         self.main_code.append(self._generate_load_operand(body_result_loc, "r24", "r25"))
         self.main_code.append(f"    STS {temp_for_result}_L, r24")
         self.main_code.append(f"    STS {temp_for_result}_H, r25")
@@ -305,9 +434,9 @@ class CodeGenerator:
 
         return temp_for_result
 
-    def _generate_res(self, node: ASTNode, line_index: int) -> str:
-        child_node = node.children[0]
-        n_value = int(child_node.label)
+    def _generate_res(self, node: int, line_index: int) -> str:
+        child_node = self.arena.child(node, 0)
+        n_value = int(self.arena.label(child_node))
 
         target_line_index = line_index - n_value
 
@@ -322,11 +451,11 @@ class CodeGenerator:
         self.main_code.extend(code)
         return temp_result
 
-    def _generate_mem(self, node: ASTNode, line_index: int) -> str:
+    def _generate_mem(self, node: int, line_index: int) -> str:
         temp_result = self.temp_manager.new_temp()
 
-        if node.children:
-            operand_loc = self._generate_expression(node.children[0], line_index)
+        if self.arena.child_count[node]:
+            operand_loc = (yield self.arena.child(node, 0), line_index)
             code = [
                 f"; MEM write",
                 self._generate_load_operand(operand_loc, "r24", "r25"),
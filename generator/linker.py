@@ -0,0 +1,81 @@
+"""
+Geração de código por fragmentos e ligação do programa final.
+
+Cada linha do programa vira um `Fragment` autocontido: o código da linha,
+as definições `.byte` das suas temporárias e os labels que ela define,
+todos no namespace da linha (`CodeGenerator(namespaced=True)`). Como um
+fragmento não depende dos outros, eles podem ser gerados em qualquer ordem,
+em threads ou processos, e guardados individualmente; `link` os ordena
+pela linha e monta o `.asm` com o cabeçalho, o código e o `.dseg`.
+"""
+from __future__ import annotations
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+from parser.arena import ASTArena
+from generator.generator import CodeGenerator, generate_full_header, generate_data_segment
+
+
+@dataclass(frozen=True, slots=True)
+class Fragment:
+    line_index: int
+    code: str
+    temp_definitions: tuple[str, ...]
+    labels: tuple[str, ...]
+
+
+class LinkError(Exception):
+    pass
+
+
+def generate_fragment(arena: ASTArena, line_node: int, line_index: int) -> Fragment:
+    """Gera uma linha (já anotada) da arena como um fragmento independente."""
+    code_gen = CodeGenerator(namespaced=True)
+    code_gen.generate_line(arena, line_index, line_node)
+    return Fragment(
+        line_index,
+        code_gen.get_main_code(),
+        tuple(code_gen.temp_manager.definitions),
+        tuple(code_gen.label_gen.issued)
+    )
+
+
+def generate_fragments(arena: ASTArena, first_line: int = 0, executor: Executor | None = None) -> list[Fragment]:
+    """
+    Fragmentos de todas as linhas de um `<program>` anotado, na ordem.
+    Com `executor` (por exemplo um `ThreadPoolExecutor`), as linhas são
+    geradas nele.
+    """
+    lines = arena.children(arena.root)
+    indices = range(first_line, first_line + len(lines))
+    mapper = executor.map if executor is not None else map
+    return list(mapper(generate_fragment, [arena] * len(lines), lines, indices))
+
+
+def link(fragments: Iterable[Fragment]) -> str:
+    """
+    Monta o `.asm` final. Os fragmentos podem chegar em qualquer ordem, mas
+    precisam cobrir as linhas 0..n-1 sem repetir símbolos.
+    """
+    ordered = sorted(fragments, key=lambda fragment: fragment.line_index)
+
+    symbols: set[str] = set()
+    for expected, fragment in enumerate(ordered):
+        if fragment.line_index != expected:
+            raise LinkError(f"Missing fragment for line {expected + 1}.")
+        for symbol in fragment.labels + fragment.temp_definitions:
+            name = symbol.split(":", 1)[0]
+            if name in symbols:
+                raise LinkError(f"Symbol '{name}' defined by more than one line (line {fragment.line_index + 1}).")
+            symbols.add(name)
+
+    main_code = "\n".join(fragment.code for fragment in ordered)
+    temp_defs = "\n".join(definition for fragment in ordered for definition in fragment.temp_definitions)
+    return assemble_program(main_code, temp_defs, len(ordered))
+
+
+def assemble_program(main_code: str, temp_defs: str, num_lines: int) -> str:
+    """Cabeçalho, código das linhas, laço final e `.dseg` (2 bytes de resultado por linha)."""
+    end_loop = "end:\n\trjmp end\n"
+    return generate_full_header() + main_code + "\n" + end_loop + generate_data_segment(num_lines * 2, temp_defs)
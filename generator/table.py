@@ -0,0 +1,104 @@
+"""
+Avaliação do programa inteiro na compilação (`--precompute`). Toda linha
+cujo resultado é conhecido sem executar nada na placa (não depende de
+`MEM`, só de literais e de `RES` de outras linhas conhecidas) é avaliada
+com a aritmética das rotinas AVR (`generator/f16.py`). As que a dobra de
+constantes comum já reduz a um literal (`LDI` e `STS`) ficam como estão:
+ler o valor da tabela custaria mais ciclos. As demais (as que dependem de
+`RES`) viram entradas de uma tabela `.db` na flash, e cada sequência delas
+é um laço curto que lê a tabela com `LPM`, guarda os valores em `results`
+(para os `RES` das outras linhas) e os imprime. A saída serial é a mesma do
+programa sem a tabela.
+"""
+from parser.arena import ASTArena, Op
+from . import f16
+from .folding import constant_values, fold_constants
+from .generator import CodeGenerator, generate_full_header, generate_data_segment
+
+TABLE_LABEL = "results_table"
+# Valores por diretiva `.db` na tabela.
+DB_VALUES_PER_LINE = 8
+
+
+def evaluate_lines(arena: ASTArena) -> list[int | None]:
+    """
+    Resultado (bits f16) de cada linha de um `<program>` anotado, ou None
+    quando ele só é conhecido na execução. `results` fica no início da
+    SRAM, então um `RES` lê sempre a linha de índice `alvo & 0x7F`: o
+    `lsl r24` de `res_op` perde o bit 7 e a soma em r30 nunca tem vai-um.
+    """
+    values: list[int | None] = []
+
+    def read_result(target: int) -> int | None:
+        return values[target & 0x7F]
+
+    for line_index, line in enumerate(arena.children(arena.root)):
+        fold_constants(arena, line, line_index, read_result)
+        value = arena.consts.get(line)
+        values.append(None if value is None else f16.to_bits(value))
+    return values
+
+
+def table_loop(first_line: int, count: int, table_offset: int) -> str:
+    """Copia `count` entradas da tabela para `results` a partir de `first_line`, imprimindo cada uma."""
+    loop_label = f"table_loop_{first_line + 1}"
+    lines = f"Line {first_line + 1}" if count == 1 else f"Lines {first_line + 1}-{first_line + count}"
+    return "\n".join([
+        f"\n; --- {lines}: precomputed ---",
+        f"    LDI r30, LOW(2*{TABLE_LABEL}+{table_offset * 2})",
+        f"    LDI r31, HIGH(2*{TABLE_LABEL}+{table_offset * 2})",
+        f"    LDI r28, LOW(results+{first_line * 2})",
+        f"    LDI r29, HIGH(results+{first_line * 2})",
+        f"    LDI r26, LOW({count})",
+        f"    LDI r27, HIGH({count})",
+        f"{loop_label}:",
+        "    LPM r24, Z+",
+        "    LPM r25, Z+",
+        "    ST Y+, r24",
+        "    ST Y+, r25",
+        "    RCALL print_f16",
+        "    SBIW r26, 1",
+        f"    BRNE {loop_label}",
+    ])
+
+
+def format_table(values: list[int]) -> str:
+    """Tabela `.db` na flash, byte baixo primeiro (a ordem em que o `LPM Z+` lê)."""
+    lines = [f"\n{TABLE_LABEL}:"]
+    for i in range(0, len(values), DB_VALUES_PER_LINE):
+        chunk = values[i:i + DB_VALUES_PER_LINE]
+        lines.append("    .db " + ", ".join(f"0x{v & 0xFF:02X}, 0x{v >> 8:02X}" for v in chunk))
+    return "\n".join(lines) + "\n"
+
+
+def generate_precomputed(arena: ASTArena) -> str:
+    """`.asm` completo de um `<program>` anotado, com as linhas conhecidas na tabela."""
+    if not arena or arena.ops[arena.root] != Op.PROGRAM:
+        values, lines = [], []
+    else:
+        values, lines = evaluate_lines(arena), arena.children(arena.root)
+
+    # Só vão para a tabela as linhas conhecidas que a dobra comum (sem ler
+    # `RES`) não reduz a um literal: para as outras, o laço de `LPM` só
+    # acrescentaria ciclos.
+    tabled = [value is not None and line not in constant_values(arena, line)
+              for value, line in zip(values, lines)]
+
+    code_gen = CodeGenerator()
+    table: list[int] = []
+    line_index = 0
+    while line_index < len(lines):
+        if not tabled[line_index]:
+            code_gen.generate_line(arena, line_index, lines[line_index])
+            line_index += 1
+            continue
+        first_line = line_index
+        while line_index < len(lines) and tabled[line_index]:
+            line_index += 1
+        code_gen.main_code.append(table_loop(first_line, line_index - first_line, len(table)))
+        table.extend(values[first_line:line_index])
+
+    end_loop = "end:\n\trjmp end\n"
+    return (generate_full_header() + code_gen.get_main_code() + "\n" + end_loop
+            + (format_table(table) if table else "")
+            + generate_data_segment(len(lines) * 2, code_gen.get_temp_definitions(), results_first=True))
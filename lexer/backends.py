@@ -0,0 +1,29 @@
+from importlib import import_module
+
+from lexer.compiled import CompiledLexer
+from lexer.jff import load_generated_lexer
+
+# Nome → "módulo:classe". O módulo só é importado quando o backend é
+# escolhido, para que o numpy não pese na partida de quem não o usa.
+LEXERS = {
+    "dfa": "lexer.dfa:Lexer",
+    "compiled": "lexer.compiled:CompiledLexer",
+    "numpy": "lexer.vectorized:VectorizedLexer",
+}
+
+
+def resolve_lexer(lexer_name: str):
+    """
+    `generated` gera (se preciso) e carrega o lexer especializado do `.jff`.
+    `auto` faz o mesmo e só usa o lexer compilado quando o módulo não pode
+    ser gravado (por exemplo, numa instalação somente leitura).
+    """
+    if lexer_name == "generated":
+        return load_generated_lexer(build=True)
+    if lexer_name == "auto":
+        try:
+            return load_generated_lexer(build=True)
+        except OSError:
+            return CompiledLexer
+    module, name = LEXERS[lexer_name].split(":")
+    return getattr(import_module(module), name)
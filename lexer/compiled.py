@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from .transition_table import T
+from .categories import classify
+from .states import State
+from .tokens import Token, TokenType
+from .errors import LexError
+from .source import ChunkSource
+from .dfa import Lexer, ACCEPTING_STATES, WHITESPACE
+
+# O DFA de `transition_table.T` é compilado uma única vez, na importação do
+# módulo, para uma tabela densa de inteiros:
+#
+#   * cada `State` recebe um ID inteiro (a sua posição no Enum);
+#   * cada caractere é mapeado para uma classe de equivalência: dois
+#     caracteres pertencem à mesma classe quando levam todos os estados
+#     para o mesmo destino (incluindo o descarte de espaços em START);
+#   * TABLE[state * N_CLASSES + cls] guarda o próximo estado, DEAD quando
+#     não há transição ou SKIP para espaços ignorados em START.
+#
+# Para caracteres de 0 a 255 a classe vem de BYTE_CLASS; os demais (raros)
+# são classificados sob demanda e memorizados em _WIDE_CLASS.
+
+STATES = list(State)
+STATE_ID = {state: i for i, state in enumerate(STATES)}
+START = STATE_ID[State.START]
+
+DEAD = -1
+SKIP = -2
+
+ACCEPT: list[TokenType | None] = [ACCEPTING_STATES.get(state) for state in STATES]
+
+
+def _reference_step(state: State, char: str) -> int:
+    """Mesma decisão que `Lexer._step` toma para (estado, caractere)."""
+    if state is State.START and char in WHITESPACE:
+        return SKIP
+    next_state = T.get((state, classify(char))) or T.get((state, char.upper()))
+    return DEAD if next_state is None else STATE_ID[next_state]
+
+
+def _signature(char: str) -> tuple[int, ...]:
+    return tuple(_reference_step(state, char) for state in STATES)
+
+
+_CLASS_OF_SIGNATURE: dict[tuple[int, ...], int] = {}
+_CLASS_ROWS: list[tuple[int, ...]] = []
+
+
+def _register(signature: tuple[int, ...]) -> int:
+    cls = _CLASS_OF_SIGNATURE.get(signature)
+    if cls is None:
+        cls = len(_CLASS_ROWS)
+        _CLASS_OF_SIGNATURE[signature] = cls
+        _CLASS_ROWS.append(signature)
+    return cls
+
+
+BYTE_CLASS: list[int] = [_register(_signature(chr(code))) for code in range(256)]
+
+
+def _build_table() -> list[int]:
+    n_classes = len(_CLASS_ROWS)
+    table = [DEAD] * (len(STATES) * n_classes)
+    for cls, signature in enumerate(_CLASS_ROWS):
+        for state_id, next_id in enumerate(signature):
+            table[state_id * n_classes + cls] = next_id
+    return table
+
+
+N_CLASSES = len(_CLASS_ROWS)
+TABLE = _build_table()
+
+_WIDE_CLASS: dict[str, int] = {}
+
+
+def _wide_class(char: str) -> int:
+    """Classe de um caractere fora da faixa 0-255 (ex.: dígitos Unicode)."""
+    global N_CLASSES, TABLE
+
+    cls = _WIDE_CLASS.get(char)
+    if cls is None:
+        cls = _register(_signature(char))
+        if len(_CLASS_ROWS) != N_CLASSES:
+            N_CLASSES = len(_CLASS_ROWS)
+            TABLE = _build_table()
+        _WIDE_CLASS[char] = cls
+    return cls
+
+
+class CompiledLexer(Lexer):
+    """
+    Lexer equivalente a `lexer.dfa.Lexer`, mas que executa o DFA compilado:
+    cada caractere custa uma consulta em BYTE_CLASS e outra em TABLE, sem
+    hashing de Enums. O fluxo de tokens (e os erros) são idênticos.
+    """
+
+    def __init__(self, src: str, source: ChunkSource | None = None):
+        super().__init__(src, source)
+        self._codes = self._ascii_codes()
+
+    def _ascii_codes(self) -> bytes | None:
+        # Para janelas ASCII, os códigos dos caracteres vêm direto de um bytes.
+        return self.src.encode("ascii") if self.src.isascii() else None
+
+    def _fill(self, keep: int | None = None) -> bool:
+        if not super()._fill(keep):
+            return False
+        self._codes = self._ascii_codes()
+        return True
+
+    def __next__(self) -> Token:
+        byte_class = BYTE_CLASS
+        table, n_classes = TABLE, N_CLASSES
+        line, col = self.line, self.col
+        state = START
+        start = self.pos
+
+        while True:
+            src, codes, base = self.src, self._codes, self.base
+            n = len(src)
+            i = self.pos - base
+
+            while i < n:
+                if codes is not None:
+                    cls = byte_class[codes[i]]
+                else:
+                    code = ord(src[i])
+                    if code < 256:
+                        cls = byte_class[code]
+                    else:
+                        cls = _wide_class(src[i])
+                        table, n_classes = TABLE, N_CLASSES
+
+                next_id = table[state * n_classes + cls]
+
+                if next_id == SKIP:
+                    if src[i] == '\n':
+                        line += 1
+                        col = 1
+                    else:
+                        col += 1
+                    i += 1
+                    continue
+
+                if next_id == DEAD:
+                    token_type = ACCEPT[state]
+                    if token_type is not None:
+                        return self._emit_token(token_type, start, base + i, line, col)
+
+                    self.pos, self.line, self.col = base + i, line, col
+                    raise LexError(
+                        f"Unexpected character: '{src[i]}'",
+                        line,
+                        col,
+                        self.lines.text_at(base + i)
+                    )
+
+                if state == START:
+                    start = base + i
+                state = next_id
+                # Nenhuma transição consome '\n' fora de START.
+                col += 1
+                i += 1
+
+            self.pos = base + i
+            # Um lexema que atravessa o fim do bloco continua na próxima janela.
+            if not self._fill(start if state != START else self.pos):
+                break
+
+        self.line, self.col = line, col
+
+        if state == START:
+            raise StopIteration
+
+        token_type = ACCEPT[state]
+        if token_type is not None:
+            return self._emit_token(token_type, start, self.pos, line, col)
+
+        raise LexError(
+            f"Incomplete lexeme",
+            line,
+            col,
+            self.lines.line_text(line)
+        )
+
+    def _emit_token(self, token_type: TokenType, start: int, pos: int, line: int, col: int) -> Token:
+        self.pos, self.line, self.col = pos, line, col
+        lex = self.src[start - self.base:pos - self.base]
+        return Token(
+            token_type,
+            lex,
+            line,
+            col - len(lex),
+            start,
+            self.lines
+        )
@@ -1,11 +1,15 @@
 from __future__ import annotations
+import os
 from collections.abc import Iterator
+from typing import BinaryIO
 
 from .transition_table import T
 from .categories import classify
 from .states import State as S
 from .tokens import Token, TokenType
 from .errors import LexError
+from .line_index import LineIndex
+from .source import ChunkSource, CHUNK_SIZE
 
 
 ACCEPTING_STATES = {
@@ -27,24 +31,50 @@ WHITESPACE = " \t\r\n"
 
 
 class Lexer(Iterator[Token]):
-    def __init__(self, src: str):
+    def __init__(self, src: str, source: ChunkSource | None = None):
         self.src = src
+        self.base = 0
         self.pos = 0
         self.line = 1
         self.col = 1
         self.state = S.START
         self.lexeme: list[str] = []
         self.pending_token: Token | None = None
-
-    def _current_line_text(self) -> str:
-        start = self.src.rfind('\n', 0, self.pos) + 1
-        end = self.src.find('\n', self.pos)
-        if end == -1:
-            end = len(self.src)
-        return self.src[start:end]
+        self.source = source
+        self._chunks = source.chunks() if source else iter(())
+        self.lines = source.lines if source else LineIndex(src)
+
+    @classmethod
+    def from_file(cls, file: str | os.PathLike | BinaryIO, chunk_size: int = CHUNK_SIZE):
+        """Lexer que lê o fonte em blocos de um caminho ou leitor binário."""
+        return cls("", ChunkSource.from_file(file, chunk_size))
+
+    @classmethod
+    def from_mmap(cls, file: str | os.PathLike | BinaryIO, chunk_size: int = CHUNK_SIZE):
+        """Lexer que percorre o fonte mapeado em memória, bloco a bloco."""
+        return cls("", ChunkSource.from_mmap(file, chunk_size))
+
+    def close(self) -> None:
+        if self.source is not None:
+            self.source.close()
+
+    def _fill(self, keep: int | None = None) -> bool:
+        """
+        Carrega o próximo bloco do fonte. `self.src` passa a ser a janela que
+        começa no offset absoluto `keep` (por padrão, a posição atual).
+        """
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        keep = self.pos if keep is None else keep
+        self.src = self.src[keep - self.base:] + chunk
+        self.base = keep
+        return True
 
     def _peek(self):
-        return self.src[self.pos] if self.pos < len(self.src) else None
+        if self.pos - self.base >= len(self.src) and not self._fill():
+            return None
+        return self.src[self.pos - self.base]
 
     def _advance(self):
         char = self._peek()
@@ -66,7 +96,8 @@ class Lexer(Iterator[Token]):
             lex,
             self.line,
             self.col - len(lex),
-            self._current_line_text()
+            self.pos - len(lex),
+            self.lines
         )
         self.pending_token = token
         self.lexeme.clear()
@@ -94,7 +125,7 @@ class Lexer(Iterator[Token]):
                 f"Unexpected character: '{char}'",
                 self.line,
                 self.col,
-                self._current_line_text()
+                self.lines.text_at(self.pos)
             )
 
         if char is not None:
@@ -108,8 +139,8 @@ class Lexer(Iterator[Token]):
             token, self.pending_token = self.pending_token, None
             return token
 
-        while self.pos <= len(self.src):
-            if self.pos == len(self.src):
+        while True:
+            if self._peek() is None:
                 if self.state in ACCEPTING_STATES and self.lexeme:
                     self._emit(ACCEPTING_STATES[self.state])
                     token, self.pending_token = self.pending_token, None
@@ -122,7 +153,7 @@ class Lexer(Iterator[Token]):
                     f"Incomplete lexeme",
                     self.line,
                     self.col,
-                    self.src[self.line]
+                    self.lines.line_text(self.line)
                 )
 
             self._step()
@@ -130,5 +161,3 @@ class Lexer(Iterator[Token]):
             if self.pending_token:
                 token, self.pending_token = self.pending_token, None
                 return token
-
-        raise StopIteration
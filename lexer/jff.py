@@ -0,0 +1,333 @@
+"""
+Gera, a partir do autômato do JFLAP (`jflap/rpn_dfa.jff`), um módulo Python
+com um lexer especializado. Cada caminho do autômato vira um bloco de código
+aninhado (o estado atual é a própria posição no código), laços sobre o mesmo
+estado viram `while`, as palavras-chave são comparações desenroladas e nenhum
+dicionário é consultado por caractere.
+
+O módulo gerado é guardado em cache sob o hash do conteúdo do `.jff`
+(`lexer/__pycache__/rpn_dfa_<hash>.py`). Enquanto o diagrama não mudar, o
+mesmo módulo é reaproveitado; qualquer edição no `.jff` gera um novo.
+
+Uso (etapa de build):
+    python -m lexer.jff [arquivo.jff]
+"""
+from __future__ import annotations
+import hashlib
+import importlib.util
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .dfa import Lexer, ACCEPTING_STATES, WHITESPACE
+from .errors import LexError
+from .states import State
+
+ROOT = Path(__file__).resolve().parent.parent
+JFF_PATH = ROOT / "jflap" / "rpn_dfa.jff"
+CACHE_DIR = Path(__file__).resolve().parent / "__pycache__"
+
+# Leitura especial do JFLAP para "qualquer dígito" (segue `str.isdigit`, como `classify`).
+DIGIT_READ = "[0-9]"
+
+
+@dataclass
+class Automaton:
+    initial: int
+    labels: dict[int, str] = field(default_factory=dict)
+    finals: set[int] = field(default_factory=set)
+    transitions: dict[int, list[tuple[str, int]]] = field(default_factory=dict)
+
+
+def parse_jff(path: Path = JFF_PATH) -> Automaton:
+    root = ET.parse(path).getroot()
+    automaton = root.find("automaton")
+    if root.findtext("type") != "fa" or automaton is None:
+        raise ValueError(f"{path} is not a JFLAP finite automaton")
+
+    initial = None
+    labels, finals = {}, set()
+    for state in automaton.iter("state"):
+        state_id = int(state.get("id"))
+        labels[state_id] = state.findtext("label") or state.get("name")
+        if state.find("initial") is not None:
+            initial = state_id
+        if state.find("final") is not None:
+            finals.add(state_id)
+
+    if initial is None:
+        raise ValueError(f"{path} has no initial state")
+
+    transitions: dict[int, list[tuple[str, int]]] = {state_id: [] for state_id in labels}
+    for transition in automaton.iter("transition"):
+        read = transition.findtext("read") or ""
+        if read != DIGIT_READ and len(read) != 1:
+            raise ValueError(f"Unsupported JFLAP transition read {read!r} in {path}")
+        source, target = int(transition.findtext("from")), int(transition.findtext("to"))
+        if any(existing == read for existing, _ in transitions[source]):
+            raise ValueError(f"State {labels[source]} has two transitions on {read!r}; the automaton is not a DFA")
+        transitions[source].append((read, target))
+
+    return Automaton(initial, labels, finals, transitions)
+
+
+def jff_hash(path: Path = JFF_PATH) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def cached_module_path(path: Path = JFF_PATH) -> Path:
+    return CACHE_DIR / f"{path.stem}_{jff_hash(path)}.py"
+
+
+def _condition(reads: list[str]) -> str:
+    """Condição Python para um grupo de leituras que levam ao mesmo estado."""
+    parts = []
+    if DIGIT_READ in reads:
+        parts.append("'0' <= c <= '9'")
+
+    symbols = "".join(read for read in reads if read != DIGIT_READ and not read.isalpha())
+    if len(symbols) == 1:
+        parts.append(f"c == {symbols!r}")
+    elif symbols:
+        parts.append(f"c in {symbols!r}")
+
+    for read in reads:
+        if read.isalpha():
+            # O lexer de referência compara `char.upper()`: letras valem nas duas caixas.
+            parts.append(f"c == {read.upper()!r} or c == {read.lower()!r}")
+
+    return " or ".join(parts)
+
+
+def _branches(transitions: list[tuple[str, int]]) -> list[tuple[str, int]]:
+    """Agrupa as leituras por destino; símbolos e dígitos são testados antes das letras."""
+    groups: dict[int, list[str]] = {}
+    for read, target in transitions:
+        groups.setdefault(target, []).append(read)
+    ordered = sorted(groups.items(), key=lambda item: all(read.isalpha() for read in item[1]))
+    return [(_condition(reads), target) for target, reads in ordered]
+
+
+class _Emitter:
+    """Escreve o corpo de `__next__`, um bloco aninhado por caminho do autômato."""
+
+    def __init__(self, automaton: Automaton):
+        self.automaton = automaton
+        self.lines: list[str] = []
+        self.token_types = {
+            state_id: ACCEPTING_STATES[State[automaton.labels[state_id]]].name
+            for state_id in automaton.finals
+        }
+
+    def write(self, depth: int, text: str) -> None:
+        self.lines.append("    " * depth + text)
+
+    def state(self, state_id: int, depth: int, path: tuple[int, ...]) -> None:
+        """
+        Código executado logo após entrar em `state_id`: `i` aponta para o
+        próximo caractere e `start` para o início do lexema.
+        """
+        if state_id in path:
+            raise ValueError("Only self-loops are supported as cycles in the lexer automaton")
+        path += (state_id,)
+
+        transitions = self.automaton.transitions[state_id]
+        loop = [read for read, target in transitions if target == state_id]
+        others = [(read, target) for read, target in transitions if target != state_id]
+
+        if loop:
+            self.write(depth, "while i < n:")
+            self.write(depth + 1, "c = src[i]")
+            self.write(depth + 1, "if c >= '\\x80':")
+            self.write(depth + 2, "c = _fold(c)")
+            self.write(depth + 1, f"if not ({_condition(loop)}):")
+            self.write(depth + 2, "break")
+            self.write(depth + 1, "i += 1")
+
+        if others:
+            self.write(depth, "if i < n:")
+            self.write(depth + 1, "c = src[i]")
+            self.write(depth + 1, "if c >= '\\x80':")
+            self.write(depth + 2, "c = _fold(c)")
+            branch = "if"
+            for condition, target in _branches(others):
+                self.write(depth + 1, f"{branch} {condition}:  # -> {self.automaton.labels[target]}")
+                self.write(depth + 2, "i += 1")
+                self.state(target, depth + 2, path)
+                branch = "elif"
+
+        self.dead_end(state_id, depth)
+
+    def dead_end(self, state_id: int, depth: int) -> None:
+        """Nenhuma transição: emite o token (estado final) ou acusa o erro."""
+        if state_id in self.token_types:
+            self.write(depth, "self.pos, self.line, self.col = base + i, line, col + i - start")
+            self.write(depth, f"return Token({self.token_types[state_id]}, src[start:i], line, col, base + start, self.lines)")
+            return
+        self.write(depth, "if i < n:")
+        self.write(depth + 1, "self._unexpected(src[i], base + i, line, col + i - start)")
+        self.write(depth, "self._incomplete(base + i, line, col + i - start)")
+
+
+def generate_source(automaton: Automaton, origin: str = "") -> str:
+    """Código-fonte do módulo com a classe `GeneratedLexer`."""
+    emitter = _Emitter(automaton)
+    whitespace = "".join(WHITESPACE).replace("\n", "")
+
+    emitter.write(2, "src, base = self.src, self.base")
+    emitter.write(2, "n = len(src)")
+    emitter.write(2, "i = self.pos - base")
+    emitter.write(2, "line, col = self.line, self.col")
+    emitter.write(2, "")
+    emitter.write(2, "while True:")
+    emitter.write(3, "while i < n:")
+    emitter.write(4, "c = src[i]")
+    emitter.write(4, f"if c in {whitespace!r}:")
+    emitter.write(5, "col += 1")
+    emitter.write(4, "elif c == '\\n':")
+    emitter.write(5, "line += 1")
+    emitter.write(5, "col = 1")
+    emitter.write(4, "else:")
+    emitter.write(5, "break")
+    emitter.write(4, "i += 1")
+    emitter.write(3, "else:")
+    emitter.write(4, "self.pos = base + i")
+    emitter.write(4, "if not self._fill():")
+    emitter.write(5, "self.line, self.col = line, col")
+    emitter.write(5, "raise StopIteration")
+    emitter.write(4, "src, base = self.src, self.base")
+    emitter.write(4, "n, i = len(src), 0")
+    emitter.write(4, "continue")
+    emitter.write(3, "break")
+    emitter.write(2, "")
+    emitter.write(2, "# O lexema inteiro (até o próximo espaço) precisa estar na janela.")
+    emitter.write(2, "if not self._exhausted and self._last_space < base + i:")
+    emitter.write(3, "self._load_word(base + i)")
+    emitter.write(3, "src, base = self.src, self.base")
+    emitter.write(3, "n, i = len(src), self.pos - base")
+    emitter.write(2, "")
+    emitter.write(2, "start = i")
+    emitter.write(2, "i += 1")
+    emitter.write(2, "c = src[start]")
+    emitter.write(2, "if c >= '\\x80':")
+    emitter.write(3, "c = _fold(c)")
+
+    initial = automaton.initial
+    branch = "if"
+    for condition, target in _branches(automaton.transitions[initial]):
+        emitter.write(2, f"{branch} {condition}:  # -> {automaton.labels[target]}")
+        emitter.state(target, 3, (initial,))
+        branch = "elif"
+    emitter.write(2, "self._unexpected(src[start], base + start, line, col)")
+
+    header = [
+        f"# Gerado automaticamente por lexer/jff.py a partir de {origin or 'um autômato JFLAP'}.",
+        "# NÃO EDITE: altere o .jff e gere novamente.",
+        "from lexer.jff import GeneratedLexerBase, fold as _fold",
+        "from lexer.tokens import Token, TokenType",
+        "",
+    ] + [
+        f"{name} = TokenType.{name}" for name in sorted(set(emitter.token_types.values()))
+    ] + [
+        "",
+        "",
+        "class GeneratedLexer(GeneratedLexerBase):",
+        "    def __next__(self):",
+    ]
+    return "\n".join(header + emitter.lines) + "\n"
+
+
+def fold(ch: str) -> str:
+    """
+    Caractere ASCII equivalente a `ch` (não ASCII) para o autômato: dígitos
+    Unicode contam como dígito e os demais valem pela sua versão maiúscula,
+    exatamente como em `Lexer._step`.
+    """
+    if ch.isdigit():
+        return "0"
+    upper = ch.upper()
+    return upper if len(upper) == 1 and upper.isascii() and upper.isalpha() else "\x00"
+
+
+class GeneratedLexerBase(Lexer):
+    """Base dos lexers gerados: janela de leitura e mensagens de erro."""
+
+    def __init__(self, src: str, source=None):
+        super().__init__(src, source)
+        self._exhausted = source is None
+        self._last_space = self._find_last_space()
+
+    def _find_last_space(self) -> int:
+        """
+        Última posição da janela até a qual todo lexema que começa nela termina
+        dentro da janela: um espaço, ou o caractere antes de um parêntese (que
+        nunca faz parte de outro lexema). Assim a janela só precisa ir até o
+        fim do lexema atual, e não da palavra inteira até o próximo espaço.
+        """
+        space = max(self.src.rfind(w) for w in WHITESPACE)
+        paren = max(self.src.rfind("("), self.src.rfind(")")) - 1
+        return self.base + max(space, paren)
+
+    def _fill(self, keep: int | None = None) -> bool:
+        if not super()._fill(keep):
+            self._exhausted = True
+            return False
+        self._last_space = self._find_last_space()
+        return True
+
+    def _load_word(self, pos: int) -> None:
+        """Estende a janela até conter o lexema que começa em `pos` (ou o fim do fonte)."""
+        self.pos = pos
+        while not self._exhausted and self._last_space < pos:
+            self._fill(pos)
+
+    def _unexpected(self, char: str, pos: int, line: int, col: int):
+        self.pos, self.line, self.col = pos, line, col
+        raise LexError(
+            f"Unexpected character: '{char}'",
+            line,
+            col,
+            self.lines.text_at(pos)
+        )
+
+    def _incomplete(self, pos: int, line: int, col: int):
+        self.pos, self.line, self.col = pos, line, col
+        raise LexError(
+            f"Incomplete lexeme",
+            line,
+            col,
+            self.lines.line_text(line)
+        )
+
+
+def build_generated_lexer(path: Path = JFF_PATH) -> Path:
+    """Gera (se ainda não estiver em cache) o módulo do lexer e devolve o seu caminho."""
+    target = cached_module_path(path)
+    if not target.exists():
+        source = generate_source(parse_jff(path), path.name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(source, encoding="utf8")
+        tmp.replace(target)
+    return target
+
+
+def load_generated_lexer(path: Path = JFF_PATH, build: bool = False) -> type[Lexer] | None:
+    """
+    Classe `GeneratedLexer` do módulo em cache para o `.jff` atual, ou None
+    se o módulo ainda não foi gerado (a menos que `build` seja verdadeiro).
+    """
+    target = build_generated_lexer(path) if build else cached_module_path(path)
+    if not target.exists():
+        return None
+
+    spec = importlib.util.spec_from_file_location(f"lexer._generated_{target.stem}", target)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.GeneratedLexer
+
+
+if __name__ == "__main__":
+    jff = Path(sys.argv[1]) if len(sys.argv) > 1 else JFF_PATH
+    print(build_generated_lexer(jff))
@@ -0,0 +1,79 @@
+from array import array
+from bisect import bisect_right
+from typing import Callable
+
+
+class LineIndex:
+    """
+    Índice dos inícios de linha de um código fonte, montado em uma única
+    passada. Os tokens guardam apenas o offset do lexema; o texto da linha
+    só é recuperado (por busca binária) quando um erro precisa exibi-lo.
+    """
+
+    __slots__ = ("src", "starts")
+
+    def __init__(self, src: str):
+        self.src = src
+        self.starts = array("I", [0])
+
+        newline = src.find("\n")
+        while newline != -1:
+            self.starts.append(newline + 1)
+            newline = src.find("\n", newline + 1)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def line_of(self, offset: int) -> int:
+        """Número da linha (a partir de 1) que contém o offset."""
+        return bisect_right(self.starts, offset)
+
+    def line_text(self, line: int) -> str:
+        """Texto da linha indicada, sem a quebra de linha final."""
+        if line < 1 or line > len(self.starts):
+            return ""
+        start = self.starts[line - 1]
+        end = self.starts[line] - 1 if line < len(self.starts) else len(self.src)
+        return self.src[start:end]
+
+    def text_at(self, offset: int) -> str:
+        """Texto da linha que contém o offset."""
+        return self.line_text(self.line_of(offset))
+
+
+class StreamLineIndex(LineIndex):
+    """
+    Variante do índice para fontes lidas em blocos: guarda os inícios de
+    linha em caracteres (para os offsets dos tokens) e em bytes (para reler
+    a linha do arquivo sob demanda), sem manter o texto completo em memória.
+    """
+
+    __slots__ = ("byte_starts", "_read_line", "_char_base", "_byte_base")
+
+    def __init__(self, read_line: Callable[[int], bytes]):
+        super().__init__("")
+        self.byte_starts = array("I", [0])
+        self._read_line = read_line
+        self._char_base = 0
+        self._byte_base = 0
+
+    def feed(self, text: str, raw: bytes) -> None:
+        """Registra as quebras de linha de um bloco já decodificado e dos seus bytes."""
+        newline = text.find("\n")
+        while newline != -1:
+            self.starts.append(self._char_base + newline + 1)
+            newline = text.find("\n", newline + 1)
+
+        newline = raw.find(b"\n")
+        while newline != -1:
+            self.byte_starts.append(self._byte_base + newline + 1)
+            newline = raw.find(b"\n", newline + 1)
+
+        self._char_base += len(text)
+        self._byte_base += len(raw)
+
+    def line_text(self, line: int) -> str:
+        if line < 1 or line > len(self.byte_starts):
+            return ""
+        raw = self._read_line(self.byte_starts[line - 1])
+        return raw.decode("utf-8", errors="replace").rstrip("\n")
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import codecs
+import io
+import mmap
+import os
+from collections.abc import Iterator
+from typing import BinaryIO, Callable
+
+from .line_index import StreamLineIndex
+
+CHUNK_SIZE = 1 << 16
+
+
+class ChunkSource:
+    """
+    Fonte lida em blocos a partir de um arquivo binário ou de um mmap.
+
+    Os blocos são decodificados incrementalmente (UTF-8), de modo que um
+    caractere multibyte partido entre dois blocos é montado corretamente.
+    O índice de linhas é alimentado à medida que os blocos passam, e o texto
+    de uma linha é relido do arquivo apenas quando um erro precisa dele.
+    """
+
+    def __init__(self, read: Callable[[int], bytes], read_line: Callable[[int], bytes],
+                 chunk_size: int = CHUNK_SIZE, close: Callable[[], None] | None = None):
+        self._read = read
+        self._close = close
+        self.chunk_size = chunk_size
+        self.lines = StreamLineIndex(read_line)
+
+    @classmethod
+    def from_file(cls, file: str | os.PathLike | BinaryIO, chunk_size: int = CHUNK_SIZE) -> ChunkSource:
+        """Lê de um caminho ou de um leitor binário já aberto."""
+        owned = not hasattr(file, "read")
+        reader: BinaryIO = open(file, "rb") if owned else file
+
+        def read_line(start: int) -> bytes:
+            if not reader.seekable():
+                return b""
+            current = reader.tell()
+            try:
+                reader.seek(start)
+                return reader.readline()
+            finally:
+                reader.seek(current)
+
+        return cls(reader.read, read_line, chunk_size, reader.close if owned else None)
+
+    @classmethod
+    def from_mmap(cls, file: str | os.PathLike | BinaryIO, chunk_size: int = CHUNK_SIZE) -> ChunkSource:
+        """Mapeia o arquivo em memória e o percorre em fatias de `chunk_size` bytes."""
+        owned = not hasattr(file, "fileno")
+        handle: BinaryIO = open(file, "rb") if owned else file
+
+        if os.fstat(handle.fileno()).st_size == 0:
+            if owned:
+                handle.close()
+            return cls.from_file(io.BytesIO(b""), chunk_size)
+
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        cursor = 0
+
+        def read(size: int) -> bytes:
+            nonlocal cursor
+            data = mapped[cursor:cursor + size]
+            cursor += len(data)
+            return data
+
+        def read_line(start: int) -> bytes:
+            end = mapped.find(b"\n", start)
+            return mapped[start:] if end == -1 else mapped[start:end]
+
+        def close() -> None:
+            mapped.close()
+            if owned:
+                handle.close()
+
+        return cls(read, read_line, chunk_size, close)
+
+    def chunks(self) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        while True:
+            raw = self._read(self.chunk_size)
+            text = decoder.decode(raw, final=not raw)
+            self.lines.feed(text, raw)
+            if text:
+                yield text
+            if not raw:
+                return
+
+    def close(self) -> None:
+        if self._close is not None:
+            self._close()
+            self._close = None
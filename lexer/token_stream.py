@@ -0,0 +1,174 @@
+from __future__ import annotations
+from array import array
+from collections.abc import Iterable
+
+from .line_index import LineIndex
+from .tokens import Token, TokenType
+
+TOKEN_TYPES: list[TokenType | None] = [None] * (max(t.value for t in TokenType) + 1)
+for _t in TokenType:
+    TOKEN_TYPES[_t.value] = _t
+
+EOF = TokenType.EOF.value
+
+
+class TokenStream:
+    """
+    Sequência de tokens em estrutura de arrays: o tipo de cada token fica em
+    um `array('B')` e offset no fonte, tamanho, linha e coluna em `array('I')`.
+
+    Os lexemas não são guardados um a um: `text` é o próprio código fonte
+    (quando o lexer o tem inteiro em memória) ou a concatenação dos lexemas
+    (fontes lidas em blocos), e cada lexema é fatiado de lá só quando pedido.
+    Os lexemas acrescentados com `append` ficam numa lista e só são juntados
+    a `text` quando ele é lido. O stream sempre termina com um token EOF.
+    """
+
+    __slots__ = ("types", "offsets", "lengths", "lines", "cols", "_text", "_pending", "_size",
+                 "text_offsets", "index")
+
+    def __init__(self, text: str = "", index: LineIndex | None = None, shares_source: bool = False):
+        self.types = array("B")
+        self.offsets = array("I")
+        self.lengths = array("I")
+        self.lines = array("I")
+        self.cols = array("I")
+        self._text = text
+        # Lexemas de `append` ainda fora de `_text` (os dos últimos tokens) e
+        # o tamanho que `text` terá quando eles forem juntados.
+        self._pending: list[str] = []
+        self._size = len(text)
+        self.index = index
+        # Posição de cada lexema em `text`: quando `text` é o próprio fonte,
+        # são os offsets dos tokens.
+        self.text_offsets = self.offsets if shares_source else array("I")
+
+    @classmethod
+    def from_tokens(cls, tokens: Iterable[Token], index: LineIndex | None = None) -> TokenStream:
+        """
+        Consome um lexer (ou qualquer iterável de `Token`) e acrescenta o EOF
+        logo após o último token, se ele ainda não estiver lá.
+        """
+        if index is None:
+            index = getattr(tokens, "lines", None)
+        shares_source = type(index) is LineIndex and bool(index.src)
+        stream = cls(index.src if shares_source else "", index, shares_source)
+
+        types, offsets, lengths = stream.types, stream.offsets, stream.lengths
+        lines, cols = stream.lines, stream.cols
+        text_offsets = stream.text_offsets
+        pieces: list[str] = []
+        size = 0
+        line = col = 1
+
+        for tok in tokens:
+            length = len(tok.lexeme)
+            types.append(tok.type.value)
+            offsets.append(tok.offset)
+            if not shares_source:
+                text_offsets.append(size)
+                pieces.append(tok.lexeme)
+                size += length
+            lengths.append(length)
+            lines.append(tok.line)
+            cols.append(tok.col)
+            line, col = tok.line, tok.col + length
+            if stream.index is None:
+                stream.index = tok.lines
+
+        if not types or types[-1] != EOF:
+            types.append(EOF)
+            offsets.append(offsets[-1] + lengths[-1] if len(offsets) else 0)
+            if not shares_source:
+                text_offsets.append(size)
+            lengths.append(0)
+            lines.append(line)
+            cols.append(col)
+
+        if not shares_source:
+            stream._text = "".join(pieces)
+            stream._size = size
+        return stream
+
+    @property
+    def text(self) -> str:
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending.clear()
+        return self._text
+
+    def empty_copy(self) -> TokenStream:
+        """Stream vazio sobre o mesmo fonte e índice de linhas."""
+        shares_source = self.text_offsets is self.offsets
+        return type(self)(self.text if shares_source else "", self.index, shares_source)
+
+    def segment(self, start: int, stop: int) -> TokenStream:
+        """
+        Os tokens `start:stop` como um stream próprio (mesmo texto e índice),
+        terminado por um EOF logo após o último deles.
+        """
+        shares_source = self.text_offsets is self.offsets
+        part = type(self)(self.text, self.index, shares_source)
+        part.types = self.types[start:stop]
+        part.offsets = self.offsets[start:stop]
+        part.lengths = self.lengths[start:stop]
+        part.lines = self.lines[start:stop]
+        part.cols = self.cols[start:stop]
+        part.text_offsets = part.offsets if shares_source else self.text_offsets[start:stop]
+
+        last = stop - 1
+        part.types.append(EOF)
+        part.offsets.append(self.offsets[last] + self.lengths[last])
+        if not shares_source:
+            part.text_offsets.append(self.text_offsets[last] + self.lengths[last])
+        part.lengths.append(0)
+        part.lines.append(self.lines[last])
+        part.cols.append(self.cols[last] + self.lengths[last])
+        return part
+
+    def append(self, tok: Token) -> None:
+        """Acrescenta um token ao fim do stream (parser em modo streaming)."""
+        self.types.append(tok.type.value)
+        self.offsets.append(tok.offset)
+        if self.text_offsets is not self.offsets:
+            self.text_offsets.append(self._size)
+            self._pending.append(tok.lexeme)
+            self._size += len(tok.lexeme)
+        self.lengths.append(len(tok.lexeme))
+        self.lines.append(tok.line)
+        self.cols.append(tok.col)
+        if self.index is None:
+            self.index = tok.lines
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def type(self, k: int) -> TokenType:
+        return TOKEN_TYPES[self.types[k]]
+
+    def lexeme(self, k: int) -> str:
+        pending = len(self._pending)
+        if pending and k >= len(self.types) - pending:
+            return self._pending[k - len(self.types) + pending]
+        start = self.text_offsets[k]
+        return self._text[start:start + self.lengths[k]]
+
+    def src_line(self, k: int) -> str:
+        """Texto da linha do token, recuperado do índice só quando pedido."""
+        if self.index is None:
+            return ""
+        return self.index.line_text(self.lines[k])
+
+    def token(self, k: int) -> Token:
+        """Materializa o token `k` como um `Token`."""
+        return Token(
+            TOKEN_TYPES[self.types[k]],
+            self.lexeme(k),
+            self.lines[k],
+            self.cols[k],
+            self.offsets[k],
+            self.index
+        )
+
+    def __getitem__(self, k: int) -> Token:
+        return self.token(k)
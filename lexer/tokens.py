@@ -1,5 +1,10 @@
-from dataclasses import dataclass
+from __future__ import annotations
+from dataclasses import dataclass, field
 from enum import Enum, auto
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .line_index import LineIndex
 
 
 class TokenType(Enum):
@@ -23,7 +28,15 @@ class Token:
     lexeme: str
     line: int
     col: int
-    src_line: str = ""
+    offset: int = 0
+    lines: LineIndex | None = field(default=None, compare=False, repr=False)
+
+    @property
+    def src_line(self) -> str:
+        """Texto da linha do token, recuperado do índice só quando pedido."""
+        if self.lines is None:
+            return ""
+        return self.lines.text_at(self.offset)
 
     def __repr__(self) -> str:
         return f"<{self.type.name} {self.lexeme!r} @{self.line}:{self.col}>"
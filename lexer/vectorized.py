@@ -0,0 +1,223 @@
+from __future__ import annotations
+import os
+from collections.abc import Iterator
+from typing import BinaryIO
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - backend opcional
+    np = None
+
+from .compiled import CompiledLexer
+from .errors import LexError
+from .line_index import LineIndex
+from .token_stream import TOKEN_TYPES
+from .tokens import Token, TokenType
+
+# Classes de byte usadas na pré-varredura. Letras e dígitos/ponto formam
+# corridas; parênteses e operadores são sempre tokens de um caractere.
+SPACE, L_PAREN, R_PAREN, DIGIT, DOT, MINUS, BIN_OP, LETTER, OTHER = range(9)
+
+# Corridas de letras com até KEY_BYTES bytes são deduplicadas vetorialmente.
+KEY_BYTES = 7
+
+# Uma corrida de letras pode conter mais de um token ("IFTHEN"); o DFA
+# valida cada grafia distinta uma única vez e guarda os tokens resultantes
+# como tuplas (tipo, offset relativo, tamanho).
+Template = tuple[tuple[TokenType, int, int], ...]
+
+if np is not None:
+    CLASS_LUT = np.full(256, OTHER, dtype=np.uint8)
+    for _chars, _cls in ((" \t\r\n", SPACE), ("(", L_PAREN), (")", R_PAREN), ("0123456789", DIGIT),
+                         (".", DOT), ("-", MINUS), ("+*/|%^", BIN_OP),
+                         ("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz", LETTER)):
+        CLASS_LUT[[ord(c) for c in _chars]] = _cls
+
+    # Grupo de corrida: bytes consecutivos do mesmo grupo pertencem ao mesmo
+    # token, exceto pelos de um caractere só (SINGLE).
+    GROUP_LUT = np.arange(9, dtype=np.uint8)
+    GROUP_LUT[DOT] = DIGIT
+    SINGLE_LUT = np.zeros(9, dtype=np.bool_)
+    SINGLE_LUT[[L_PAREN, R_PAREN, MINUS, BIN_OP]] = True
+
+    FIXED_TYPE = np.zeros(9, dtype=np.uint8)
+    FIXED_TYPE[L_PAREN] = TokenType.L_PAREN.value
+    FIXED_TYPE[R_PAREN] = TokenType.R_PAREN.value
+    FIXED_TYPE[BIN_OP] = TokenType.ARITHMETIC_OP.value
+    FIXED_TYPE[MINUS] = TokenType.ARITHMETIC_OP.value
+
+
+def _letters_template(word: str) -> Template | None:
+    """Tokens de uma corrida de letras, ou None se o DFA a rejeitar."""
+    try:
+        return tuple((tok.type, tok.offset, len(tok.lexeme)) for tok in CompiledLexer(word))
+    except LexError:
+        return None
+
+
+class VectorizedLexer(Iterator[Token]):
+    """
+    Backend opcional (requer numpy) para lexing em lote de fontes grandes.
+
+    O fonte é carregado como um array uint8 e uma única indexação em
+    CLASS_LUT classifica todos os bytes. `np.diff`/`np.flatnonzero` encontram
+    as fronteiras das corridas, e tipo, linha e coluna de cada token são
+    calculados de uma vez para o fonte inteiro. O DFA só é consultado para
+    validar a grafia das palavras-chave; números (inclusive com `-`) são
+    validados pelas próprias contagens da pré-varredura.
+
+    A partir da primeira corrida inválida, o lexer compilado assume e produz
+    exatamente o mesmo erro que o `Lexer` de referência. Fontes não ASCII
+    são entregues inteiramente ao lexer compilado.
+    """
+
+    def __init__(self, src: str):
+        if np is None:
+            raise ImportError("The vectorized lexer backend requires numpy (pip install numpy).")
+
+        self.src = src
+        self.lines = LineIndex(src)
+        self._next = 0
+        self._fallback: CompiledLexer | None = None
+        self._fallback_at: int | None = None
+        self._types: list[int] = []
+        self._offsets: list[int] = []
+        self._lengths: list[int] = []
+        self._lines: list[int] = []
+        self._cols: list[int] = []
+
+        if not src.isascii():
+            self._fallback_at = 0
+        elif src:
+            self._prescan(np.frombuffer(src.encode("ascii"), dtype=np.uint8))
+
+    def _prescan(self, data) -> None:
+        n = len(data)
+        cls = CLASS_LUT[data]
+        group = GROUP_LUT[cls]
+        solid = cls != SPACE
+
+        prev_cls = np.concatenate(([SPACE], cls[:-1]))
+        prev_group = GROUP_LUT[prev_cls]
+
+        # Um token começa em todo byte não-espaço que troca de grupo ou que é
+        # um token de um caractere; um dígito logo após `-` continua o número.
+        starts_mask = solid & (SINGLE_LUT[cls] | (group != prev_group))
+        starts_mask &= ~((cls == DIGIT) & (prev_cls == MINUS))
+        starts = np.flatnonzero(starts_mask)
+
+        stops = np.flatnonzero(np.concatenate((starts_mask | ~solid, [True])))
+        ends = stops[np.searchsorted(stops, starts, side="right")]
+        lengths = ends - starts
+        first = cls[starts]
+
+        is_number = (first == DIGIT) | (first == DOT) | ((first == MINUS) & (lengths > 1))
+        dots = np.concatenate(([0], np.cumsum(cls == DOT)))
+        run_dots = dots[ends] - dots[starts]
+        body_first = cls[np.minimum(starts + (first == MINUS), n - 1)]
+        last = cls[ends - 1]
+
+        types = FIXED_TYPE[first].copy()
+        types[is_number] = np.where(run_dots[is_number] == 1, TokenType.NUM_FLOAT.value, TokenType.NUM_INT.value)
+
+        valid = ~is_number | ((body_first == DIGIT) & (last == DIGIT) & (run_dots <= 1))
+        valid &= first != OTHER
+
+        expanded: dict[int, Template] = {}
+        letter_runs = np.flatnonzero(first == LETTER)
+        if len(letter_runs):
+            # Corridas curtas são agrupadas por uma chave com os seus bytes, de
+            # modo que cada grafia distinta passe pelo DFA uma única vez.
+            run_starts, run_lengths = starts[letter_runs], lengths[letter_runs]
+            keys = run_lengths.astype(np.uint64) << np.uint64(56)
+            for j in range(KEY_BYTES):
+                byte = data[np.minimum(run_starts + j, n - 1)].astype(np.uint64)
+                keys |= np.where(run_lengths > j, byte, 0).astype(np.uint64) << np.uint64(8 * j)
+            keys[run_lengths > KEY_BYTES] = np.arange(np.count_nonzero(run_lengths > KEY_BYTES), dtype=np.uint64)
+
+            unique_keys, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            unique_types = np.zeros(len(unique_keys), dtype=np.uint8)
+            unique_valid = np.ones(len(unique_keys), dtype=np.bool_)
+            unique_templates: dict[int, Template] = {}
+            for u, k in enumerate(first_seen.tolist()):
+                s = int(run_starts[k])
+                template = _letters_template(self.src[s:s + int(run_lengths[k])])
+                if template is None:
+                    unique_valid[u] = False
+                elif len(template) == 1:
+                    unique_types[u] = template[0][0].value
+                else:
+                    unique_templates[u] = template
+
+            types[letter_runs] = unique_types[inverse]
+            valid[letter_runs] = unique_valid[inverse]
+            for u, template in unique_templates.items():
+                for k in letter_runs[inverse == u].tolist():
+                    expanded[k] = template
+
+        invalid = np.flatnonzero(~valid)
+        if len(invalid):
+            cut = int(invalid[0])
+            self._fallback_at = int(starts[cut])
+            starts, lengths, types = starts[:cut], lengths[:cut], types[:cut]
+
+        newlines = np.flatnonzero(data == ord("\n"))
+        previous = np.searchsorted(newlines, starts)
+        line_starts = np.concatenate(([-1], newlines))[previous] + 1
+
+        self._types = types.tolist()
+        self._offsets = starts.tolist()
+        self._lengths = lengths.tolist()
+        self._lines = (previous + 1).tolist()
+        self._cols = (starts - line_starts + 1).tolist()
+
+        for k in sorted((k for k in expanded if k < len(self._offsets)), reverse=True):
+            s, line, col = self._offsets[k], self._lines[k], self._cols[k]
+            template = expanded[k]
+            self._types[k:k + 1] = [t.value for t, _, _ in template]
+            self._offsets[k:k + 1] = [s + rel for _, rel, _ in template]
+            self._lengths[k:k + 1] = [length for _, _, length in template]
+            self._lines[k:k + 1] = [line] * len(template)
+            self._cols[k:k + 1] = [col + rel for _, rel, _ in template]
+
+    @classmethod
+    def from_file(cls, file: str | os.PathLike | BinaryIO, chunk_size: int | None = None):
+        """Lê o arquivo inteiro: o backend vetorizado trabalha sobre o fonte completo."""
+        if hasattr(file, "read"):
+            return cls(file.read().decode("utf-8"))
+        with open(file, "rb") as f:
+            return cls(f.read().decode("utf-8"))
+
+    from_mmap = from_file
+
+    def close(self) -> None:
+        pass
+
+    def _start_fallback(self) -> CompiledLexer:
+        lexer = CompiledLexer(self.src)
+        lexer.lines = self.lines
+        lexer.pos = self._fallback_at
+        lexer.line = self.lines.line_of(lexer.pos)
+        lexer.col = lexer.pos - self.lines.starts[lexer.line - 1] + 1
+        return lexer
+
+    def __next__(self) -> Token:
+        k = self._next
+        if k < len(self._offsets):
+            self._next = k + 1
+            offset = self._offsets[k]
+            return Token(
+                TOKEN_TYPES[self._types[k]],
+                self.src[offset:offset + self._lengths[k]],
+                self._lines[k],
+                self._cols[k],
+                offset,
+                self.lines
+            )
+
+        if self._fallback_at is None:
+            raise StopIteration
+
+        if self._fallback is None:
+            self._fallback = self._start_fallback()
+        return next(self._fallback)
@@ -1,18 +1,21 @@
 import sys
 from pathlib import Path
 import argparse
+from typing import Collection
 
-from lexer.dfa import Lexer
-from lexer.tokens import Token, TokenType
+from lexer.backends import LEXERS, resolve_lexer
 from lexer.errors import LexError
-from parser.ast_node import ASTNode
 from parser.parser import LL1Parser
 from parser.errors import LL1SyntaxError
-from parser.render import render_ast, render_annotated_ast
+from parser.render import GraphView, format_ast, format_tokens
 from semantics.analyzer import SemanticAnalyzer
 from semantics.errors import SemanticError
 
 from generator.generator import CodeGenerator, generate_full_header, generate_data_segment
+from pipeline.api import compile_file
+from pipeline.parallel import compile_parallel
+from pipeline.cache import CACHE_DIR, CompileCache, compile_cached, compiler_version
+from pipeline.incremental import compile_incremental
 
 GREEN = "\033[32m"
 YELLOW = "\033[33m"
@@ -20,11 +23,42 @@ RED = "\033[31m"
 RESET = "\033[0m"
 
 
-def render_image(src_path, ast):
-    out_png = src_path.with_suffix("").with_name(src_path.stem + "_ast.png")
-    graph = render_ast(ast)
-    graph.render(out_png.with_suffix("").as_posix(), format="png", cleanup=True)
-    print(f"{GREEN}AST image saved to {out_png}{RESET}")
+# Artefato de `--emit` → fase do pipeline de que ele depende. As imagens
+# (png, svg ou o próprio DOT) precisam da AST anotada; a fase mais avançada pedida decide até onde a
+# compilação vai.
+EMIT_STAGES = {
+    "tokens": "tokens",
+    "ast": "ast",
+    "annotated-ast": "annotated-ast",
+    "asm": "asm",
+    "png": "annotated-ast",
+    "svg": "annotated-ast",
+    "dot": "annotated-ast",
+}
+IMAGE_FORMATS = ("png", "svg", "dot")
+
+# Acima disso o layout do `dot` leva minutos e a imagem fica ilegível.
+DEFAULT_MAX_NODES = 2000
+
+
+def parse_emit(value: str) -> list[str]:
+    """Lista de artefatos separados por vírgula (`--emit asm,png`)."""
+    emit = [artifact.strip() for artifact in value.split(",") if artifact.strip()]
+    for artifact in emit:
+        if artifact not in EMIT_STAGES:
+            raise argparse.ArgumentTypeError(
+                f"unknown artifact {artifact!r} (choose from {', '.join(EMIT_STAGES)})")
+    return emit
+
+
+def write_artifact(data: str | bytes, src_path: Path, suffix: str) -> Path:
+    """Salva um artefato ao lado do fonte (`<nome><suffix>`)."""
+    output_file = src_path.with_name(src_path.stem + suffix)
+    if isinstance(data, bytes):
+        output_file.write_bytes(data)
+    else:
+        output_file.write_text(data, encoding="utf8")
+    return output_file
 
 
 def write_assembly_file(code: str, src_path: Path):
@@ -34,98 +68,178 @@ def write_assembly_file(code: str, src_path: Path):
     print(f"{GREEN}Assembly file saved to {output_file}{RESET}")
 
 
-def count_program_lines(program_node: ASTNode) -> int:
+def compile_streaming(src_path: Path, lexer) -> None:
     """
-    Percorre a AST gerada pela gramática para contar o número total de linhas/expressões.
+    Front-end de passada única: o parser puxa os tokens do lexer sob demanda,
+    a análise semântica anota cada nó na redução que o completa e cada linha
+    é gerada e escrita no .asm assim que termina. A memória fica limitada a
+    uma linha; em troca, as imagens da AST não são geradas.
     """
-    if not program_node or program_node.label != '<program>' or not program_node.children:
-        return 0
+    print("Starting single-pass compilation (streaming)...")
+    print(f"{YELLOW}AUTOMATIC TYPE-CASTING ENABLED.{RESET}")
+    parser = LL1Parser()
+    analyzer = SemanticAnalyzer()
+    code_gen = CodeGenerator()
 
-    count = 1
-
-    current_tail = program_node.children[1]
-
-    while current_tail and current_tail.label == '<program_tail>' and current_tail.children:
-        count += 1
-        current_tail = current_tail.children[1]
-
-    return count
+    output_file = src_path.with_suffix(".asm")
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    num_lines = 0
+    try:
+        with tmp_file.open("w", encoding="utf8") as out:
+            out.write(generate_full_header())
+            for line in parser.parse_lines(lexer, analyzer.annotate_node):
+                analyzer.check_line(line, line.root)
+                code_gen.generate_line(line, num_lines)
+                if num_lines:
+                    out.write("\n")
+                out.write(code_gen.take_main_code())
+                num_lines += 1
+
+            data_seg = generate_data_segment(num_lines * 2, code_gen.get_temp_definitions())
+            out.write("\n" + "end:\n\trjmp end\n" + data_seg)
+        tmp_file.replace(output_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+    print(f"{GREEN}Syntax OK ✔{RESET}")
+    print(f"{GREEN}Semantics OK ✔{RESET}")
+    print(f"{GREEN}Code Generation OK ✔{RESET}")
+    print(f"{GREEN}Assembly file saved to {output_file}{RESET}")
 
 
-def main(src_path_str: str) -> None:
+def main(src_path_str: str, lexer_name: str = "auto", stream: bool = False, jobs: int = 1,
+         cache_dir: Path | None = None, incremental: bool = False, emit: Collection[str] = ("asm",),
+         view: GraphView = GraphView(), precompute: bool = False) -> None:
     src_path = Path(src_path_str)
     if not src_path.is_file():
         print(f"{RED}[ERROR] File not found: {src_path}{RESET}")
         sys.exit(1)
 
-    code = src_path.read_text(encoding="utf8")
-
-    try:
-        # --- FASE 1: LEXER ---
-        lexer = Lexer(code)
-        tokens = [tok for tok in lexer]
-
-        if not tokens or tokens[-1].type is not TokenType.EOF:
-            if tokens:
-                last = tokens[-1]
-                line, col = last.line, last.col + len(last.lexeme)
-                src_line = getattr(last, "src_line", "")
-            else:
-                line = col = 1
-                src_line = ""
-            tokens.append(Token(TokenType.EOF, "", line, col, src_line))
-
-        # --- FASE 2: PARSER ---
-        print("Starting parsing...")
-        parser = LL1Parser()
-        ast_root = parser.parse(tokens)
-        print(f"{GREEN}Syntax OK ✔{RESET}")
-        render_image(src_path, ast_root)
-
-        # --- FASE 3: ANÁLISE SEMÂNTICA ---
-        print("Starting semantic analysis...")
+    if cache_dir is not None or jobs > 1 or incremental:
+        src = src_path.read_text(encoding="utf8")
         print(f"{YELLOW}AUTOMATIC TYPE-CASTING ENABLED.{RESET}")
-        analyzer = SemanticAnalyzer()
-        annotated_ast_root = analyzer.analyze(ast_root)
-        print(f"{GREEN}Semantics OK ✔{RESET}")
-
-        out_png = src_path.with_suffix("").with_name(src_path.stem + "_annotated_ast.png")
-        graph = render_annotated_ast(annotated_ast_root)
-        graph.render(out_png.with_suffix("").as_posix(), format="png", cleanup=True)
-        print(f"{GREEN}Annotated AST image saved to {out_png}{RESET}")
-
-        # --- FASE 4: GERAÇÃO DE CÓDIGO ---
-        print("Starting code generation...")
-        code_gen = CodeGenerator()
-        code_gen.generate(ast_root)
+        try:
+            if incremental:
+                print("Starting incremental compilation...")
+                # O estado da última compilação fica no cache, por arquivo.
+                build_key = f"build:{compiler_version()}:{src_path.resolve()}"
+                with CompileCache(cache_dir or CACHE_DIR) as cache:
+                    full_assembly, build = compile_incremental(src, cache.get_build(build_key))
+                    cache.put_build(build_key, build)
+                print(f"Recompiled {build.recompiled} of {len(build.codes)} line(s).")
+            elif cache_dir is not None:
+                print(f"Starting cached compilation ({cache_dir})...")
+                with CompileCache(cache_dir) as cache:
+                    full_assembly = compile_cached(src, cache)
+                    print(f"Cache: {cache.stats}")
+            else:
+                print(f"Starting parallel compilation ({jobs} jobs)...")
+                full_assembly = compile_parallel(src, jobs)
+        except (LexError, LL1SyntaxError, SemanticError) as e:
+            sys.tracebacklimit = 0
+            print(e)
+            sys.exit(1)
         print(f"{GREEN}Code Generation OK ✔{RESET}")
-
-        # --- FASE 5: MONTAGEM DO ARQUIVO FINAL ---
-        header = generate_full_header()
-        main_code = code_gen.get_main_code()
-        temp_defs = code_gen.get_temp_definitions()
-
-        # O tamanho do array de resultados é 2 bytes por linha
-        num_lines = count_program_lines(ast_root)
-        results_byte_count = num_lines * 2
-        data_seg = generate_data_segment(results_byte_count, temp_defs)
-
-        end_loop = "end:\n\trjmp end\n"
-
-        full_assembly = header + main_code + "\n" + end_loop + data_seg
-
         write_assembly_file(full_assembly, src_path)
+        return
+
+    if stream:
+        # O fonte é lido em blocos direto do arquivo, sem carregar o texto inteiro.
+        lexer = resolve_lexer(lexer_name).from_file(src_path)
+        try:
+            compile_streaming(src_path, lexer)
+        except (LexError, LL1SyntaxError, SemanticError) as e:
+            sys.tracebacklimit = 0
+            print(e)
+            sys.exit(1)
+        finally:
+            lexer.close()
+        return
+
+    print("Starting compilation...")
+    print(f"{YELLOW}AUTOMATIC TYPE-CASTING ENABLED.{RESET}")
+    image_format = next((fmt for fmt in IMAGE_FORMATS if fmt in emit), None)
+    try:
+        result = compile_file(src_path, [EMIT_STAGES[artifact] for artifact in emit], lexer_name,
+                              render=image_format is not None, image_format=image_format or "png", view=view,
+                              precompute=precompute)
+    except (RuntimeError, ValueError) as e:  # falha ao desenhar as imagens
+        print(f"{RED}[ERROR] {e}{RESET}")
+        sys.exit(1)
 
-    except (LexError, LL1SyntaxError, SemanticError) as e:
+    if result.tokens is not None and "tokens" in emit:
+        output_file = write_artifact(format_tokens(result.tokens), src_path, "_tokens.txt")
+        print(f"{GREEN}Tokens saved to {output_file}{RESET}")
+    if result.arena is not None:
+        print(f"{GREEN}Syntax OK ✔{RESET}")
+        if "ast" in emit:
+            output_file = write_artifact(format_ast(result.arena), src_path, "_ast.txt")
+            print(f"{GREEN}AST saved to {output_file}{RESET}")
+        if "ast" in result.images:
+            output_file = write_artifact(result.images["ast"], src_path, f"_ast.{image_format}")
+            print(f"{GREEN}AST image saved to {output_file}{RESET}")
+    if result.annotated:
+        print(f"{GREEN}Semantics OK ✔{RESET}")
+        if "annotated-ast" in emit:
+            output_file = write_artifact(format_ast(result.arena, annotated=True), src_path, "_annotated_ast.txt")
+            print(f"{GREEN}Annotated AST saved to {output_file}{RESET}")
+        if "annotated-ast" in result.images:
+            output_file = write_artifact(result.images["annotated-ast"], src_path,
+                                         f"_annotated_ast.{image_format}")
+            print(f"{GREEN}Annotated AST image saved to {output_file}{RESET}")
+    if not result.ok:
         sys.tracebacklimit = 0
-        print(e)
+        print(*result.diagnostics)
         sys.exit(1)
 
+    if result.asm is not None:
+        print(f"{GREEN}Code Generation OK ✔{RESET}")
+        write_assembly_file(result.asm, src_path)
+
 
 if __name__ == "__main__":
     cli_parser = argparse.ArgumentParser(description="Compilador para a linguagem RPN.")
     cli_parser.add_argument("source_file", help="O arquivo de código fonte para compilar.")
+    cli_parser.add_argument("--lexer", choices=["auto", "generated", *sorted(LEXERS)], default="auto",
+                            help="Implementação do lexer (gerada a partir do .jff, DFA interpretado, "
+                                 "tabela compilada ou pré-varredura com numpy).")
+    cli_parser.add_argument("--stream", action="store_true",
+                            help="Compila em uma única passada, linha a linha, sem montar a AST inteira "
+                                 "(só gera o .asm).")
+    cli_parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                            help="Compila trechos do programa em N processos, com labels e temporárias "
+                                 "por linha (só gera o .asm).")
+    cli_parser.add_argument("--cache", dest="cache_dir", nargs="?", type=Path, const=CACHE_DIR, default=None,
+                            metavar="DIR",
+                            help="Reaproveita o .asm do programa ou os fragmentos de linhas já compilados "
+                                 f"(cache em disco, padrão {CACHE_DIR}; só gera o .asm).")
+    cli_parser.add_argument("--incremental", action="store_true",
+                            help="Recompila só as linhas alteradas desde a última compilação do arquivo "
+                                 "(estado guardado no cache; só gera o .asm).")
+    cli_parser.add_argument("--emit", type=parse_emit, default=["asm"], metavar="ARTIFACTS",
+                            help="Artefatos a gerar, separados por vírgula: tokens, ast, annotated-ast "
+                                 "(em texto), asm e png, svg ou dot (imagens das ASTs, desenhadas em segundo "
+                                 "plano). Só as fases necessárias rodam (padrão: asm).")
+    cli_parser.add_argument("--graph-line", type=int, default=None, metavar="N",
+                            help="Desenha só a N-ésima expressão do programa (a partir de 1).")
+    cli_parser.add_argument("--graph-max-nodes", type=int, default=DEFAULT_MAX_NODES, metavar="N",
+                            help=f"Limite de nós por imagem (padrão: {DEFAULT_MAX_NODES}; 0 = sem limite).")
+    cli_parser.add_argument("--graph-max-depth", type=int, default=None, metavar="N",
+                            help="Resume em um nó as subárvores abaixo da profundidade N.")
+    cli_parser.add_argument("--graph-collapse", action="store_true",
+                            help="Resume as subárvores repetidas em um nó que aponta para a primeira.")
+    cli_parser.add_argument("--precompute", action="store_true",
+                            help="Calcula na compilação os resultados das linhas que não dependem de MEM e "
+                                 "os grava em uma tabela na flash, impressa por um laço com LPM.")
 
     args = cli_parser.parse_args()
-
-    main(args.source_file)
+    if (args.stream or args.jobs > 1 or args.cache_dir is not None or args.incremental) and args.emit != ["asm"]:
+        cli_parser.error("--emit is only supported in the default mode (the other modes produce only the .asm)")
+    if (args.stream or args.jobs > 1 or args.cache_dir is not None or args.incremental) and args.precompute:
+        cli_parser.error("--precompute is only supported in the default mode")
+    if sum(fmt in args.emit for fmt in IMAGE_FORMATS) > 1:
+        cli_parser.error(f"--emit accepts only one image format ({', '.join(IMAGE_FORMATS)})")
+    view = GraphView(args.graph_line, args.graph_max_nodes or None, args.graph_max_depth, args.graph_collapse)
+
+    main(args.source_file, args.lexer, args.stream, args.jobs, args.cache_dir, args.incremental, args.emit, view,
+         args.precompute)
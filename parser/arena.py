@@ -0,0 +1,211 @@
+from __future__ import annotations
+from array import array
+from enum import IntEnum
+from typing import Sequence
+
+from lexer.tokens import Token
+from parser.ast_node import ASTNode
+from parser.traversal import trampoline
+from semantics.annotated_ast import AnnotatedASTNode
+from semantics.types import SemanticType, SignType
+
+
+class Op(IntEnum):
+    UNKNOWN = 0
+    PROGRAM = 1
+    NUMBER = 2
+    ADD = 3
+    SUB = 4
+    MUL = 5
+    REAL_DIV = 6
+    INT_DIV = 7
+    MOD = 8
+    POW = 9
+    RES = 10
+    MEM = 11
+    IF = 12
+    THEN = 13
+    ELSE = 14
+    FOR = 15
+
+
+# Rótulo fixo de cada opcode; literais e nós desconhecidos usam o lexema.
+OP_LABELS: list[str | None] = [None] * len(Op)
+for _op, _label in ((Op.PROGRAM, "<program>"), (Op.ADD, "+"), (Op.SUB, "-"), (Op.MUL, "*"),
+                    (Op.REAL_DIV, "|"), (Op.INT_DIV, "/"), (Op.MOD, "%"), (Op.POW, "^"),
+                    (Op.RES, "RES"), (Op.MEM, "MEM"), (Op.IF, "IF"), (Op.THEN, "THEN"),
+                    (Op.ELSE, "ELSE"), (Op.FOR, "FOR")):
+    OP_LABELS[_op] = _label
+
+LABEL_OPS = {label: Op(op) for op, label in enumerate(OP_LABELS) if label is not None}
+
+SEMANTIC_TYPES: list[SemanticType | None] = [None] * (max(t.value for t in SemanticType) + 1)
+for _t in SemanticType:
+    SEMANTIC_TYPES[_t.value] = _t
+
+SIGN_TYPES: list[SignType | None] = [None] * (max(s.value for s in SignType) + 1)
+for _s in SignType:
+    SIGN_TYPES[_s.value] = _s
+
+
+def op_for_label(label: str) -> Op:
+    """Opcode de um rótulo da AST (o lexema, para nós vindos de tokens)."""
+    op = LABEL_OPS.get(label)
+    if op is not None:
+        return op
+    try:
+        float(label)
+        return Op.NUMBER
+    except (ValueError, TypeError):
+        return Op.UNKNOWN
+
+
+class ASTArena:
+    """
+    AST em arrays paralelos, com os nós referenciados por um ID inteiro.
+
+    Cada nó tem um opcode, o índice do seu token (-1 se não houver), os
+    filhos (`child_start`/`child_count` apontando para `child_ids`) e as
+    anotações da análise semântica (`types`, `signs`, `casts`; 0 = ainda
+    não anotado). Constantes dobradas ficam em `consts`, esparso.
+
+    Os IDs são alocados em pós-ordem: os filhos vêm sempre antes do pai, a
+    subárvore de um nó ocupa um intervalo contíguo que termina nele e a
+    raiz é o último nó. Assim, anotar a árvore é uma única varredura linear.
+    As árvores de objetos (`ASTNode`, `AnnotatedASTNode`) são apenas vistas
+    montadas a partir da arena quando alguém precisa delas.
+    """
+
+    __slots__ = ("ops", "tok", "child_start", "child_count", "child_ids",
+                 "types", "signs", "casts", "consts", "tokens", "labels")
+
+    def __init__(self, tokens: Sequence[Token] = ()):
+        self.ops = array("B")
+        self.tok = array("i")
+        self.child_start = array("I")
+        self.child_count = array("I")
+        self.child_ids = array("I")
+        self.types = array("B")
+        self.signs = array("B")
+        self.casts = array("B")
+        self.consts: dict[int, int | float] = {}
+        # `TokenStream` (arenas do parser) ou lista de `Token` (arenas
+        # convertidas de árvores de objetos).
+        self.tokens = tokens
+        # Rótulos explícitos de literais/nós desconhecidos sem token próprio.
+        self.labels: dict[int, str] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    @property
+    def root(self) -> int:
+        return len(self.ops) - 1
+
+    def add(self, op: int, token: int = -1, children: Sequence[int] = ()) -> int:
+        node = len(self.ops)
+        self.ops.append(op)
+        self.tok.append(token)
+        self.child_start.append(len(self.child_ids))
+        self.child_count.append(len(children))
+        self.child_ids.extend(children)
+        self.types.append(0)
+        self.signs.append(0)
+        self.casts.append(0)
+        return node
+
+    def set_children(self, node: int, children: Sequence[int]) -> None:
+        self.child_start[node] = len(self.child_ids)
+        self.child_count[node] = len(children)
+        self.child_ids.extend(children)
+
+    def children(self, node: int) -> Sequence[int]:
+        start = self.child_start[node]
+        return self.child_ids[start:start + self.child_count[node]]
+
+    def child(self, node: int, i: int) -> int:
+        return self.child_ids[self.child_start[node] + i]
+
+    def label(self, node: int) -> str:
+        fixed = OP_LABELS[self.ops[node]]
+        if fixed is not None:
+            return fixed
+        if self.labels is not None and node in self.labels:
+            return self.labels[node]
+        return self.tokens.lexeme(self.tok[node])
+
+    def token(self, node: int) -> Token | None:
+        k = self.tok[node]
+        return self.tokens[k] if k >= 0 else None
+
+    def eval_type(self, node: int) -> SemanticType | None:
+        return SEMANTIC_TYPES[self.types[node]]
+
+    def sign(self, node: int) -> SignType | None:
+        return SIGN_TYPES[self.signs[node]]
+
+    # ───────────────────────── conversões ─────────────────────────
+
+    @classmethod
+    def from_tree(cls, root: ASTNode | AnnotatedASTNode) -> ASTArena:
+        """Converte uma árvore de objetos (anotada ou não), alocando em pós-ordem."""
+        tokens: list[Token] = []
+        arena = cls(tokens)
+        arena.labels = {}
+
+        def visit(node):
+            children = []
+            for child in node.children:
+                children.append((yield child))
+
+            token = getattr(node, "token", None) or getattr(node, "original_token", None)
+            k = -1
+            if token is not None:
+                k = len(tokens)
+                tokens.append(token)
+
+            op = op_for_label(node.label)
+            n = arena.add(op, k, children)
+            if OP_LABELS[op] is None:
+                arena.labels[n] = node.label
+
+            eval_type = getattr(node, "eval_type", None)
+            sign = getattr(node, "sign", None)
+            arena.types[n] = eval_type.value if eval_type is not None else 0
+            arena.signs[n] = sign.value if sign is not None else 0
+            arena.casts[n] = node.needs_cast_to_float
+            const_value = getattr(node, "const_value", None)
+            if const_value is not None:
+                arena.consts[n] = const_value
+            return n
+
+        trampoline(root, visit)
+        return arena
+
+    def to_tree(self) -> ASTNode:
+        """Vista da arena como árvore de `ASTNode` (os filhos já existem quando o pai é montado)."""
+        views: list[ASTNode] = []
+        for n in range(len(self.ops)):
+            views.append(ASTNode(
+                self.label(n),
+                [views[c] for c in self.children(n)],
+                self.token(n),
+                SEMANTIC_TYPES[self.types[n]],
+                bool(self.casts[n]),
+                self.consts.get(n)
+            ))
+        return views[-1]
+
+    def to_annotated(self) -> AnnotatedASTNode:
+        """Vista da arena (já anotada) como árvore de `AnnotatedASTNode`."""
+        views: list[AnnotatedASTNode] = []
+        for n in range(len(self.ops)):
+            views.append(AnnotatedASTNode(
+                self.label(n),
+                [views[c] for c in self.children(n)],
+                SEMANTIC_TYPES[self.types[n]],
+                SIGN_TYPES[self.signs[n]],
+                self.token(n),
+                bool(self.casts[n])
+            ))
+        return views[-1]
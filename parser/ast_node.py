@@ -5,7 +5,7 @@ from semantics.types import SemanticType
 from lexer.tokens import Token
 
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
     label: str
     children: List["ASTNode"] = field(default_factory=list)
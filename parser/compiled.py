@@ -0,0 +1,97 @@
+"""
+Versão pré-compilada da tabela LL(1) (`M`) e das produções (`P`).
+
+Todos os símbolos viram inteiros: terminais são o `value` do `TokenType`,
+não terminais começam em `NT_BASE` e as marcas de redução são o número da
+regra com sinal negativo. A tabela é uma lista plana indexada por
+`(não terminal - NT_BASE) * N_TERMINALS + terminal`, e cada produção é uma
+tupla já invertida, pronta para `stack.extend`. Regras sem ação de redução
+(as que só repassam o nó do filho) nem empilham marca.
+
+`line_expansions` é a variante usada pelo parser em modo streaming: depois
+de cada `<expr>` de nível superior vem a marca `line_end`, desempilhada
+assim que a linha termina de ser reduzida.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+from lexer.tokens import TokenType
+
+N_TERMINALS = max(t.value for t in TokenType) + 1
+NT_BASE = N_TERMINALS
+
+# Regras com ação de redução no parser (os `case` de `LL1Parser`). As demais
+# só repassam o nó do filho (ou, em `<expr>`, a expressão entre os
+# parênteses, que não geram nós) e nem empilham marca; as de `<program_tail>`
+# também: cada linha fica na pilha da AST até a redução de `<program>`, que
+# junta todas como filhas de um único nó. O MEM lido tem marca para que o nó
+# seja dado como completo.
+REDUCE_RULES = {
+    1: ("<program>", ["<expr>", "<program_tail>"]),
+    3: ("<rpn>", ["KW_MEM"]),
+    4: ("<rpn>", ["<operand>", "<rpn_tail>"]),
+    6: ("<rpn_tail>", ["<operand>", "<op_binary>"]),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledGrammar:
+    start: int
+    table: list[int]
+    expansions: list[tuple[int, ...]]
+    names: list[str]
+    expected: list[str]
+    line_expansions: list[tuple[int, ...]]
+    line_end: int
+
+
+def compile_grammar(table: dict, productions: dict, start: str = "<program>",
+                    line: str = "<expr>", line_parents: tuple[str, ...] = ("<program>", "<program_tail>")) -> CompiledGrammar:
+    nonterminals = list(dict.fromkeys([start, *table, *(lhs for lhs, _ in productions.values())]))
+    nt_id = {name: NT_BASE + i for i, name in enumerate(nonterminals)}
+
+    def resolve(symbol: str) -> int:
+        if symbol in TokenType.__members__:
+            return TokenType[symbol].value
+        return nt_id[symbol]
+
+    n_rules = max(productions) + 1
+    line_end = -n_rules
+    expansions: list[tuple[int, ...]] = [()] * n_rules
+    line_expansions: list[tuple[int, ...]] = [()] * n_rules
+    line_id = nt_id.get(line)
+    for rule, production in REDUCE_RULES.items():
+        if productions.get(rule) != production:
+            raise ValueError(f"Rule {rule} must be {production[0]} -> {' '.join(production[1])}")
+    for rule, (lhs, rhs) in productions.items():
+        if not isinstance(rhs, list):
+            rhs = [rhs] if rhs else []
+        symbols = tuple(resolve(sym) for sym in reversed(rhs))
+        expansions[rule] = (-rule, *symbols) if rule in REDUCE_RULES else symbols
+        if lhs in line_parents:
+            # Invertida: a marca fica logo abaixo de cada linha na pilha.
+            marked = []
+            for sym in expansions[rule]:
+                if sym == line_id:
+                    marked.append(line_end)
+                marked.append(sym)
+            line_expansions[rule] = tuple(marked)
+        else:
+            line_expansions[rule] = expansions[rule]
+
+    flat = [0] * (len(nonterminals) * N_TERMINALS)
+    expected = [""] * (NT_BASE + len(nonterminals))
+    for name, row in table.items():
+        base = (nt_id[name] - NT_BASE) * N_TERMINALS
+        for token_type, rule in row.items():
+            flat[base + token_type.value] = rule
+        expected[nt_id[name]] = ", ".join(t.name for t in row)
+
+    names = [""] * (NT_BASE + len(nonterminals))
+    for t in TokenType:
+        names[t.value] = t.name
+    for name, symbol in nt_id.items():
+        names[symbol] = name
+
+    return CompiledGrammar(nt_id[start], flat, expansions, names, expected,
+                           line_expansions, line_end)
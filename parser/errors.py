@@ -12,3 +12,10 @@ class LL1SyntaxError(Exception):
             f"\n{self.src_line.rstrip()}\033[31m\n{pointer}\n"
             f"SyntaxError: {self.msg} (line {self.line}, col {self.col})\033[0m\n"
         )
+
+
+class LL1GrammarError(Exception):
+    def __init__(self, msg: str, conflicts: list):
+        super().__init__(msg)
+        self.msg = msg
+        self.conflicts = conflicts
@@ -1,106 +1,190 @@
-from collections import deque
-from dataclasses import dataclass
+import gc
 from lexer.tokens import TokenType, Token
+from lexer.token_stream import TokenStream, TOKEN_TYPES
+from lexer.line_index import LineIndex
 from parser.table import M, P
+from parser.compiled import CompiledGrammar, compile_grammar, NT_BASE, N_TERMINALS
 from parser.errors import LL1SyntaxError
 from parser.ast_node import ASTNode
-from typing import List
+from parser.arena import ASTArena, Op, LABEL_OPS
+from collections.abc import Callable, Generator, Iterable, Iterator
 
+GRAMMAR = compile_grammar(M, P)
+EOF = TokenType.EOF.value
 
-@dataclass
-class Build:
-    lhs: str
-    arity: int
-    rule_id: int
+# Parênteses e EOF não geram nós; números viram literais e os demais
+# terminais viram nós de operador/palavra-chave.
+LEAF_TERMINALS = frozenset(t.value for t in TokenType) - {
+    TokenType.L_PAREN.value, TokenType.R_PAREN.value, TokenType.EOF.value
+}
+NUMBER_TERMINALS = frozenset({TokenType.NUM_INT.value, TokenType.NUM_FLOAT.value})
+
+# Marca, na pilha da AST, de um `<rpn_tail>` binário (operando + operador).
+BINARY_TAIL = -1
 
 
 class LL1Parser:
     def __init__(self, table=M, productions=P):
         self.table = table
         self.prod = productions
+        self.grammar: CompiledGrammar = GRAMMAR if (table, productions) == (M, P) else compile_grammar(table, productions)
 
     @staticmethod
-    def _err(msg: str, tok: Token):
-        raise LL1SyntaxError(msg, tok.line, tok.col, tok.src_line)
-
-    def parse(self, token_iterable: List[Token]):
-        tokens = deque(token_iterable)
-        sym_stack: list = [TokenType.EOF, "<program>"]
-        ast_stack: list[ASTNode] = []
+    def _err(msg: str, tokens: TokenStream, k: int):
+        raise LL1SyntaxError(msg, tokens.lines[k], tokens.cols[k], tokens.src_line(k))
+
+    def parse(self, token_iterable: TokenStream | Iterable[Token]) -> ASTNode:
+        """AST como árvore de `ASTNode` (uma vista da arena montada pelo parser)."""
+        return self.parse_arena(token_iterable).to_tree()
+
+    def parse_arena(self, token_iterable: TokenStream | Iterable[Token]) -> ASTArena:
+        tokens = token_iterable
+        if not isinstance(tokens, TokenStream):
+            tokens = TokenStream.from_tokens(tokens)
+
+        # A AST não tem ciclos; com o coletor ativo, cada coleta percorreria
+        # as estruturas construídas até ali.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            run = self._parse(tokens, self.grammar.expansions)
+            try:
+                next(run)
+            except StopIteration as stop:
+                return stop.value
+            raise RuntimeError("AST construction failed: unexpected line boundary in batch mode.")
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def parse_lines(self, token_iterable: Iterable[Token],
+                    on_reduce: Callable[[ASTArena, int, int], None] | None = None) -> Iterator[ASTArena]:
+        """
+        Modo streaming: os tokens são puxados do lexer um a um, só quando o
+        parser precisa deles, e cada linha de nível superior é entregue, em
+        uma arena própria cuja raiz é a expressão da linha, assim que termina
+        de ser reduzida. Só a linha corrente fica em memória.
+
+        `on_reduce(arena, nó, índice_da_linha)` é chamado quando cada nó fica
+        completo (literais ao serem lidos, MEM lido e operadores na redução
+        que os fecha), sempre em pós-ordem: é o ponto em que a análise
+        semântica pode anotar a linha durante o próprio parsing.
+        """
+        index = getattr(token_iterable, "lines", None)
+        shares_source = type(index) is LineIndex and bool(index.src)
+        tokens = TokenStream(index.src if shares_source else "", index, shares_source)
+        yield from self._parse(tokens, self.grammar.line_expansions, iter(token_iterable), on_reduce)
+
+    def _parse(self, tokens: TokenStream, expansions: list[tuple[int, ...]],
+               source: Iterator[Token] | None = None,
+               on_reduce: Callable[[ASTArena, int, int], None] | None = None) -> Generator[ASTArena, None, ASTArena | None]:
+        """
+        Os nós são alocados na arena à medida que os tokens são consumidos.
+        Como a notação é pós-fixa, o operador chega depois dos operandos e a
+        ordem dos IDs já é a pós-ordem da árvore: as reduções só ligam os
+        filhos ao nó do operador.
+
+        Com `source`, os tokens vêm do lexer sob demanda e, a cada marca de
+        fim de linha (`line_expansions`), a arena da linha é entregue e o
+        parser recomeça com uma arena e um stream vazios. Sem `source`, o
+        stream já está completo, nada é entregue e o retorno é a arena do
+        programa inteiro.
+        """
+        types = tokens.types
+        k = 0
+
+        arena = ASTArena(tokens)
+        grammar = self.grammar
+        table, line_end = grammar.table, grammar.line_end
+        sym_stack: list[int] = [EOF, grammar.start]
+        ast_stack: list[int] = []
+        line_index = 0
+        end = None
 
         while sym_stack:
             top = sym_stack.pop()
 
-            if isinstance(top, Build):
-                match top.rule_id:
-                    case 2:
-                        ast_stack.pop()
-                        rpn_node = ast_stack.pop()
-                        ast_stack.pop()
-                        ast_stack.append(rpn_node)
+            if top < 0:
+                if top == line_end:
+                    ast_stack.pop()
+                    yield arena
+                    line_index += 1
+                    tokens = tokens.empty_copy()
+                    types = tokens.types
+                    k = 0
+                    arena = ASTArena(tokens)
+                    continue
+
+                match -top:
+                    case 1 if ast_stack:
+                        # `<program>` é o símbolo inicial: tudo o que está na
+                        # pilha são as linhas do programa, na ordem.
+                        lines = ast_stack[:]
+                        ast_stack[:] = [arena.add(Op.PROGRAM, arena.tok[lines[0]], lines)]
 
                     case 3:
-                        mem_keyword_node = ast_stack.pop()
-                        ast_stack.append(ASTNode(label=mem_keyword_node.label,
-                                                 children=[],
-                                                 token=mem_keyword_node.token))
+                        if on_reduce is not None:
+                            on_reduce(arena, ast_stack[-1], line_index)
 
                     case 4:
-                        tail_or_op_node = ast_stack.pop()
-                        operand1_node = ast_stack.pop()
-
-                        if tail_or_op_node.label == '<rpn_tail>':
-                            operand2_node = tail_or_op_node.children[0]
-                            op_node = tail_or_op_node.children[1]
-                            ast_stack.append(ASTNode(label=op_node.label,
-                                                     children=[operand1_node, operand2_node],
-                                                     token=op_node.token))
+                        op_node = ast_stack.pop()
+                        if op_node == BINARY_TAIL:
+                            op_node = ast_stack.pop()
+                            operand2_node = ast_stack.pop()
+                            operand1_node = ast_stack.pop()
+                            arena.set_children(op_node, (operand1_node, operand2_node))
                         else:
-                            op_node = tail_or_op_node
-                            ast_stack.append(ASTNode(label=op_node.label,
-                                                     children=[operand1_node],
-                                                     token=op_node.token))
-
-                    case 5 | 7 | 8 | 9 | 10 | 11 | 12 | 13 | 14 | 15 | 16:
-                        pass
-
-                    case 1 | 6 | 17 | 18:
-                        children = [ast_stack.pop() for _ in range(top.arity)][::-1]
-                        if top.lhs == '<program>' and not children:
-                            ast_stack.append(ASTNode(top.lhs, [], None))
-                        else:
-                            ast_stack.append(ASTNode(top.lhs, children, children[0].token if children else None))
+                            operand1_node = ast_stack.pop()
+                            arena.set_children(op_node, (operand1_node,))
+                        ast_stack.append(op_node)
+                        if on_reduce is not None:
+                            on_reduce(arena, op_node, line_index)
 
-                continue
+                    case 6:
+                        # `<rpn_tail>` binário: operando e operador ficam na
+                        # pilha, marcados para a redução da regra 4.
+                        ast_stack.append(BINARY_TAIL)
 
-            la_tok = tokens[0]
-            la_type = la_tok.type
+                continue
 
-            if isinstance(top, TokenType):
-                if top == la_type:
-                    token = tokens.popleft()
-                    if top is not TokenType.EOF:
-                        ast_stack.append(ASTNode(label=token.lexeme, token=token))
+            if source is not None and k == len(types):
+                tok = next(source, None)
+                if tok is None:
+                    # Fim do lexer: EOF logo após o último token lido.
+                    if end is None:
+                        tok = Token(TokenType.EOF, "", 1, 1, 0, tokens.index)
+                    else:
+                        length = len(end.lexeme)
+                        tok = Token(TokenType.EOF, "", end.line, end.col + length, end.offset + length, end.lines)
+                end = tok
+                tokens.append(tok)
+
+            la = types[k]
+
+            if top < NT_BASE:
+                if top == la:
+                    if top in LEAF_TERMINALS:
+                        if top in NUMBER_TERMINALS:
+                            node = arena.add(Op.NUMBER, k)
+                            if on_reduce is not None:
+                                on_reduce(arena, node, line_index)
+                        else:
+                            node = arena.add(LABEL_OPS.get(tokens.lexeme(k), Op.UNKNOWN), k)
+                        ast_stack.append(node)
+                    k += 1
                     continue
-                self._err(f"Expected {top.name}, found {la_type.name}", la_tok)
+                self._err(f"Expected {TOKEN_TYPES[top].name}, found {TOKEN_TYPES[la].name}", tokens, k)
 
-            prod_num = self.table.get(top, {}).get(la_type)
-            if prod_num is None:
-                expected_tokens = ", ".join(t.name for t in self.table.get(top, {}))
-                self._err(f"Unexpected {la_type.name}; expected one of: {expected_tokens}", la_tok)
+            prod_num = table[(top - NT_BASE) * N_TERMINALS + la]
+            if not prod_num:
+                self._err(f"Unexpected {TOKEN_TYPES[la].name}; expected one of: {grammar.expected[top]}", tokens, k)
 
-            _, rhs = self.prod[prod_num]
-            if not isinstance(rhs, list):
-                rhs = [rhs] if rhs else []
+            sym_stack.extend(expansions[prod_num])
 
-            sym_stack.append(Build(top, len(rhs), prod_num))
-            for sym in reversed(rhs):
-                if isinstance(sym, str) and sym in TokenType.__members__:
-                    sym_stack.append(TokenType[sym])
-                else:
-                    sym_stack.append(sym)
+        if source is not None:
+            return None
 
         if len(ast_stack) != 1:
             raise RuntimeError(f"AST construction failed. Final stack size: {len(ast_stack)}")
 
-        return ast_stack[0]
+        return arena
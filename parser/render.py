@@ -1,49 +1,240 @@
-from graphviz import Digraph
+from __future__ import annotations
+import io
+import subprocess
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, TextIO
+
+from lexer.token_stream import TokenStream
 from parser.ast_node import ASTNode
+from parser.arena import ASTArena, Op
 from semantics.annotated_ast import AnnotatedASTNode
 
+if TYPE_CHECKING:
+    from graphviz import Digraph
 
-def render_ast(root: ASTNode, fmt="png") -> Digraph:
-    g = Digraph(format=fmt)
-    counter = {"id": 0}
 
-    def add(node: ASTNode):
-        counter["id"] += 1
-        my_id = f"n{counter['id']}"
-        g.node(my_id, node.label)
-        for child in node.children:
-            child_id = add(child)
-            g.edge(my_id, child_id)
-        return my_id
+def format_tokens(tokens: TokenStream) -> str:
+    """Listagem dos tokens, um por linha: posição (`linha:coluna`), tipo e lexema, separados por tabulação."""
+    rows = []
+    for k in range(len(tokens)):
+        tok = tokens[k]
+        rows.append(f"{tok.line}:{tok.col}\t{tok.type.name}\t{tok.lexeme}\n")
+    return "".join(rows)
 
-    add(root)
-    return g
 
+def format_ast(arena: ASTArena, annotated: bool = False) -> str:
+    """
+    AST em texto, um nó por linha e indentada pela profundidade. Com
+    `annotated`, cada nó leva também o tipo, o sinal e a conversão para
+    float. A pilha é explícita, então a profundidade da árvore não importa.
+    """
+    rows = []
+    stack = [(arena.root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        row = "  " * depth + arena.label(node)
+        if annotated:
+            row += f"  : {arena.eval_type(node).name} {arena.sign(node).name}"
+            if arena.casts[node]:
+                row += " CAST TO FLOAT"
+        rows.append(row + "\n")
+        stack.extend((child, depth + 1) for child in reversed(arena.children(node)))
+    return "".join(rows)
 
-def render_annotated_ast(root: AnnotatedASTNode) -> Digraph:
+
+@dataclass(frozen=True, slots=True)
+class GraphView:
     """
-    Cria uma representação visual de uma árvore de nós já anotados
-    pelo analisador semântico, mostrando o label, tipo e sinal.
+    Recorte da AST a desenhar. `line` escolhe uma única expressão do
+    programa (a partir de 1), e o custo passa a ser proporcional só a ela.
+    `max_nodes` limita o número de nós escritos. `max_depth` resume em um
+    único nó as subárvores abaixo dessa profundidade. Com `collapse_repeats`,
+    uma subárvore idêntica a outra já desenhada (com pelo menos
+    `min_repeat_size` nós) vira um nó que aponta para a primeira.
+    """
+    line: int | None = None
+    max_nodes: int | None = None
+    max_depth: int | None = None
+    collapse_repeats: bool = False
+    min_repeat_size: int = 3
+
+
+def _record_escape(text: str) -> str:
+    return "".join("\\" + ch if ch in '{}|<>"\\' else ch for ch in text)
+
+
+def _node_label(arena: ASTArena, node: int, annotated: bool, summary: str | None) -> str:
+    if not annotated:
+        label = arena.label(node).replace("\\", "\\\\").replace('"', '\\"')
+        return label + (f"\\n{summary}" if summary else "")
+    parts = [_record_escape(arena.label(node)),
+             f"type: {arena.eval_type(node).name}",
+             f"sign: {arena.sign(node).name}"]
+    if arena.casts[node]:
+        parts.append("CAST TO FLOAT")
+    if summary:
+        parts.append(_record_escape(summary))
+    return "{ " + " | ".join(parts) + " }"
+
+
+def _subtree_start(arena: ASTArena, node: int) -> int:
+    """Primeiro ID da subárvore (a folha mais à esquerda): ela ocupa `[início, node]`."""
+    while arena.child_count[node]:
+        node = arena.child(node, 0)
+    return node
+
+
+def write_dot(arena: ASTArena, out: TextIO, annotated: bool = False, view: GraphView = GraphView()) -> int:
+    """
+    Escreve a AST (ou a AST anotada) em DOT direto no arquivo `out`, nó a
+    nó e sem montar o grafo em memória, e devolve o número de nós escritos.
+    Os nós se chamam `n<ID da arena>`. Só a subárvore escolhida por `view`
+    é percorrida; as formas canônicas usadas por `collapse_repeats` saem de
+    uma varredura linear do seu intervalo de IDs (pós-ordem).
+    """
+    root = arena.root
+    if view.line is not None:
+        if arena.ops[root] != Op.PROGRAM or not 1 <= view.line <= arena.child_count[root]:
+            raise ValueError(f"Line {view.line} is out of range for this program.")
+        root = arena.child(root, view.line - 1)
+    start = _subtree_start(arena, root)
+
+    # Sem `collapse_repeats`, nada é pré-calculado: o tamanho de uma
+    # subárvore resumida sai do seu intervalo de IDs, e o percurso para
+    # assim que o orçamento de nós acaba, sem visitar o resto.
+    sizes = shapes = None
+    if view.collapse_repeats:
+        sizes = array("I", bytes(4 * (root - start + 1)))
+        shapes = array("I", sizes)
+        canonical: dict[tuple, int] = {}
+        for n in range(start, root + 1):
+            children = arena.children(n)
+            sizes[n - start] = 1 + sum(sizes[c - start] for c in children)
+            key = (arena.label(n), arena.types[n] if annotated else 0, arena.casts[n] if annotated else 0,
+                   *(shapes[c - start] for c in children))
+            shapes[n - start] = canonical.setdefault(key, len(canonical))
+
+    def size(node: int) -> int:
+        return sizes[node - start] if sizes is not None else node - _subtree_start(arena, node) + 1
+
+    out.write("digraph AST {\n")
+    if annotated:
+        out.write("  node [shape=record];\n")
+    drawn: dict[int, int] = {}
+    written = covered = 0
+    # Pilha de (pai, filhos ainda não visitados, profundidade dos filhos).
+    stack = [(-1, iter((root,)), 0)]
+    while stack:
+        parent, pending, depth = stack[-1]
+        node = next(pending, None)
+        if node is None:
+            stack.pop()
+            continue
+        if view.max_nodes is not None and written >= view.max_nodes:
+            out.write(f'  omitted [label="... {root - start + 1 - covered} more nodes", shape=note];\n')
+            break
+
+        summary = None
+        if shapes is not None and sizes[node - start] >= view.min_repeat_size and shapes[node - start] in drawn:
+            summary = f"same as n{drawn[shapes[node - start]]} ({sizes[node - start]} nodes)"
+        elif view.max_depth is not None and depth >= view.max_depth and arena.child_count[node]:
+            summary = f"... {size(node)} nodes"
+
+        style = ", style=dashed" if summary else ""
+        out.write(f'  n{node} [label="{_node_label(arena, node, annotated, summary)}"{style}];\n')
+        if parent >= 0:
+            out.write(f"  n{parent} -> n{node};\n")
+        written += 1
+        if summary is None:
+            covered += 1
+            if shapes is not None:
+                drawn.setdefault(shapes[node - start], node)
+            stack.append((node, iter(arena.children(node)), depth + 1))
+        else:
+            covered += size(node)
+    out.write("}\n")
+    return written
+
+
+def dot_source(arena: ASTArena, annotated: bool = False, view: GraphView = GraphView()) -> str:
+    buffer = io.StringIO()
+    write_dot(arena, buffer, annotated, view)
+    return buffer.getvalue()
+
+
+def render_graph(arena: ASTArena, fmt: str = "svg", annotated: bool = False,
+                 view: GraphView = GraphView()) -> bytes:
+    """
+    Desenha a AST no formato `fmt` (`svg`, `png`, ... ou `dot`, o próprio
+    texto DOT). O DOT é escrito direto na entrada do executável `dot`, em
+    outra thread: enquanto isso, a saída e os erros do `dot` são lidos, para
+    que nenhum dos dois pipes encha e trave o processo.
     """
-    dot = Digraph()
+    if fmt == "dot":
+        return dot_source(arena, annotated, view).encode("utf8")
+    try:
+        proc = subprocess.Popen(["dot", f"-T{fmt}"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("Graphviz 'dot' executable not found; install Graphviz or emit 'dot' instead.")
 
-    def add_nodes_edges(node: AnnotatedASTNode):
-        label_parts = [
-            node.label,
-            f"type: {node.eval_type.name}",
-            f"sign: {node.sign.name}"
-        ]
+    failures: list[BaseException] = []
+    errors: list[bytes] = []
 
-        if node.needs_cast_to_float:
-            label_parts.append("CAST TO FLOAT")
+    def feed() -> None:
+        try:
+            with io.TextIOWrapper(proc.stdin, encoding="utf8") as stdin:
+                write_dot(arena, stdin, annotated, view)
+        except BaseException as e:
+            failures.append(e)
 
-        formatted_label = "{ " + " | ".join(label_parts) + " }"
+    threads = [threading.Thread(target=feed), threading.Thread(target=lambda: errors.append(proc.stderr.read()))]
+    for thread in threads:
+        thread.start()
+    image = proc.stdout.read()
+    for thread in threads:
+        thread.join()
+    if failures and not isinstance(failures[0], BrokenPipeError):
+        raise failures[0]
 
-        dot.node(str(id(node)), label=formatted_label, shape="record")
+    # `dot` que sai sem ler toda a entrada (BrokenPipeError) também falhou.
+    if proc.wait() != 0 or failures:
+        message = errors[0].decode(errors="replace").strip() or "it stopped reading its input"
+        raise RuntimeError(f"Graphviz 'dot' failed: {message}")
+    return image
 
-        for child in node.children:
-            add_nodes_edges(child)
-            dot.edge(str(id(node)), str(id(child)))
 
-    add_nodes_edges(root)
-    return dot
+def _digraph(arena: ASTArena, annotated: bool, fmt: str | None) -> Digraph:
+    # O pacote graphviz só é importado por quem ainda usa esta interface.
+    from graphviz import Digraph
+
+    graph = Digraph(format=fmt)
+    stack = [arena.root]
+    while stack:
+        node = stack.pop()
+        if annotated:
+            graph.node(f"n{node}", label=_node_label(arena, node, True, None), shape="record")
+        else:
+            graph.node(f"n{node}", arena.label(node))
+        children = arena.children(node)
+        for child in children:
+            graph.edge(f"n{node}", f"n{child}")
+        stack.extend(reversed(children))
+    return graph
+
+
+def render_ast(root: ASTNode | ASTArena, fmt="png") -> Digraph:
+    arena = root if isinstance(root, ASTArena) else ASTArena.from_tree(root)
+    return _digraph(arena, False, fmt)
+
+
+def render_annotated_ast(root: AnnotatedASTNode | ASTArena, fmt: str | None = None) -> Digraph:
+    """
+    Cria uma representação visual de uma árvore de nós já anotados
+    pelo analisador semântico, mostrando o label, tipo e sinal. Sem `fmt`,
+    vale o formato padrão do graphviz.
+    """
+    arena = root if isinstance(root, ASTArena) else ASTArena.from_tree(root)
+    return _digraph(arena, True, fmt)
@@ -1,4 +1,4 @@
-from lexer.tokens import TokenType
+from parser.table_builder import load_table
 
 P = {
     1: ("<program>", ["<expr>", "<program_tail>"]),
@@ -21,45 +21,6 @@ P = {
     18: ("<program_tail>", []),
 }
 
-M = {
-    "<program>": {
-        TokenType.L_PAREN: 1
-    },
-    "<expr>": {
-        TokenType.L_PAREN: 2
-    },
-    "<rpn>": {
-        TokenType.KW_MEM: 3,
-        TokenType.NUM_INT: 4,
-        TokenType.NUM_FLOAT: 4,
-        TokenType.L_PAREN: 4
-    },
-    "<rpn_tail>": {
-        TokenType.KW_MEM: 5,
-        TokenType.KW_RES: 5,
-        TokenType.KW_IF: 5,
-        TokenType.NUM_INT: 6,
-        TokenType.NUM_FLOAT: 6,
-        TokenType.L_PAREN: 6
-    },
-    "<operand>": {
-        TokenType.NUM_INT: 7,
-        TokenType.NUM_FLOAT: 8,
-        TokenType.L_PAREN: 9
-    },
-    "<op_unary>": {
-        TokenType.KW_MEM: 10,
-        TokenType.KW_RES: 11,
-        TokenType.KW_IF: 12
-    },
-    "<op_binary>": {
-        TokenType.KW_THEN: 13,
-        TokenType.KW_ELSE: 14,
-        TokenType.KW_FOR: 15,
-        TokenType.ARITHMETIC_OP: 16
-    },
-    "<program_tail>": {
-        TokenType.L_PAREN: 17,
-        TokenType.EOF: 18
-    }
-}
+# Tabela de predição gerada a partir de P (ver parser/table_builder.py) e
+# lida do cache em disco enquanto as produções não mudarem.
+M = load_table(P).table
@@ -0,0 +1,203 @@
+"""
+Monta a tabela LL(1) a partir das produções `P`: calcula FIRST/FOLLOW,
+detecta conflitos e guarda o resultado em cache, em JSON, sob o hash da
+gramática (`parser/__pycache__/ll1_table-<hash>.json`). Enquanto as
+produções não mudarem, o parser só lê o arquivo em cache.
+
+Uso (relatório de tempo e conflitos):
+    python -m parser.table_builder
+"""
+from __future__ import annotations
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from lexer.tokens import TokenType
+from parser.errors import LL1GrammarError
+
+# Incrementar quando o formato do cache (ou o algoritmo) mudar.
+TABLE_CACHE_VERSION = 1
+
+CACHE_DIR = Path(__file__).resolve().parent / "__pycache__"
+EPSILON = "ε"
+END = TokenType.EOF.name
+
+
+@dataclass
+class Conflict:
+    nonterminal: str
+    terminal: str
+    rules: tuple[int, int]
+
+    def __str__(self) -> str:
+        return f"{self.nonterminal} on {self.terminal}: rules {self.rules[0]} and {self.rules[1]}"
+
+
+@dataclass
+class TableBuild:
+    table: dict[str, dict[TokenType, int]]
+    grammar_hash: str
+    conflicts: list[Conflict] = field(default_factory=list)
+    seconds: float = 0.0
+    from_cache: bool = False
+
+    def report(self) -> str:
+        origin = "loaded from cache" if self.from_cache else "built"
+        lines = [f"LL(1) table {self.grammar_hash} {origin} in {self.seconds * 1000:.3f} ms, "
+                 f"{len(self.conflicts)} conflict(s)"]
+        lines += [f"  conflict: {conflict}" for conflict in self.conflicts]
+        return "\n".join(lines)
+
+
+def _rhs(rhs) -> list[str]:
+    if not isinstance(rhs, list):
+        return [rhs] if rhs else []
+    return rhs
+
+
+def _is_terminal(symbol: str) -> bool:
+    return symbol in TokenType.__members__
+
+
+def _first_of(symbols: list[str], first: dict[str, dict[str, None]]) -> dict[str, None]:
+    """FIRST de uma sequência de símbolos (com ε se todos puderem ser vazios)."""
+    result: dict[str, None] = {}
+    for symbol in symbols:
+        if _is_terminal(symbol):
+            result[symbol] = None
+            return result
+        result.update((t, None) for t in first[symbol] if t != EPSILON)
+        if EPSILON not in first[symbol]:
+            return result
+    result[EPSILON] = None
+    return result
+
+
+def first_sets(productions: dict) -> dict[str, dict[str, None]]:
+    """FIRST de cada não terminal, como dicionários (conjuntos ordenados)."""
+    first: dict[str, dict[str, None]] = {lhs: {} for lhs, _ in productions.values()}
+    changed = True
+    while changed:
+        changed = False
+        for _, (lhs, rhs) in sorted(productions.items()):
+            before = len(first[lhs])
+            first[lhs].update(_first_of(_rhs(rhs), first))
+            changed |= len(first[lhs]) != before
+    return first
+
+
+def follow_sets(productions: dict, start: str = "<program>",
+                first: dict[str, dict[str, None]] | None = None) -> dict[str, dict[str, None]]:
+    """FOLLOW de cada não terminal; o fim da entrada é o terminal EOF."""
+    first = first if first is not None else first_sets(productions)
+    follow: dict[str, dict[str, None]] = {lhs: {} for lhs, _ in productions.values()}
+    follow[start][END] = None
+    changed = True
+    while changed:
+        changed = False
+        for _, (lhs, rhs) in sorted(productions.items()):
+            symbols = _rhs(rhs)
+            for i, symbol in enumerate(symbols):
+                if _is_terminal(symbol):
+                    continue
+                before = len(follow[symbol])
+                rest = _first_of(symbols[i + 1:], first)
+                follow[symbol].update((t, None) for t in rest if t != EPSILON)
+                if EPSILON in rest:
+                    follow[symbol].update(follow[lhs])
+                changed |= len(follow[symbol]) != before
+    return follow
+
+
+def grammar_hash(productions: dict, start: str = "<program>") -> str:
+    canonical = json.dumps(
+        [TABLE_CACHE_VERSION, start, [[rule, lhs, _rhs(rhs)] for rule, (lhs, rhs) in sorted(productions.items())]],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf8")).hexdigest()[:16]
+
+
+def build_table(productions: dict, start: str = "<program>") -> TableBuild:
+    """Monta a tabela; em caso de conflito, a primeira regra encontrada é mantida."""
+    began = time.perf_counter()
+    first = first_sets(productions)
+    follow = follow_sets(productions, start, first)
+
+    rows: dict[str, dict[str, int]] = {start: {}}
+    conflicts: list[Conflict] = []
+    for rule, (lhs, rhs) in sorted(productions.items()):
+        row = rows.setdefault(lhs, {})
+        lookahead = _first_of(_rhs(rhs), first)
+        if EPSILON in lookahead:
+            lookahead.update(follow[lhs])
+        for terminal in lookahead:
+            if terminal == EPSILON:
+                continue
+            if terminal in row and row[terminal] != rule:
+                conflicts.append(Conflict(lhs, terminal, (row[terminal], rule)))
+                continue
+            row[terminal] = rule
+
+    table = {lhs: {TokenType[t]: rule for t, rule in row.items()} for lhs, row in rows.items()}
+    return TableBuild(table, grammar_hash(productions, start), conflicts, time.perf_counter() - began)
+
+
+def cache_path(digest: str) -> Path:
+    return CACHE_DIR / f"ll1_table-{digest}.json"
+
+
+def _write_cache(build: TableBuild) -> None:
+    payload = {
+        "version": TABLE_CACHE_VERSION,
+        "grammar": build.grammar_hash,
+        "table": {lhs: {t.name: rule for t, rule in row.items()} for lhs, row in build.table.items()},
+        "conflicts": [[c.nonterminal, c.terminal, list(c.rules)] for c in build.conflicts],
+    }
+    target = cache_path(build.grammar_hash)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf8")
+        tmp.replace(target)
+    except OSError:
+        pass  # sem permissão de escrita: a tabela é só recalculada na próxima vez
+
+
+def _read_cache(digest: str) -> TableBuild | None:
+    try:
+        payload = json.loads(cache_path(digest).read_text(encoding="utf8"))
+    except (OSError, ValueError):
+        return None
+    if payload.get("version") != TABLE_CACHE_VERSION or payload.get("grammar") != digest:
+        return None
+    table = {lhs: {TokenType[t]: rule for t, rule in row.items()} for lhs, row in payload["table"].items()}
+    conflicts = [Conflict(lhs, t, tuple(rules)) for lhs, t, rules in payload["conflicts"]]
+    return TableBuild(table, digest, conflicts, from_cache=True)
+
+
+def load_table(productions: dict, start: str = "<program>", strict: bool = True) -> TableBuild:
+    """
+    Tabela LL(1) das produções, lida do cache quando possível. Com `strict`,
+    uma gramática com conflitos levanta `LL1GrammarError`.
+    """
+    began = time.perf_counter()
+    build = _read_cache(grammar_hash(productions, start))
+    if build is None:
+        build = build_table(productions, start)
+        _write_cache(build)
+    else:
+        build.seconds = time.perf_counter() - began
+
+    if strict and build.conflicts:
+        raise LL1GrammarError("Grammar is not LL(1):\n" + "\n".join(f"  {c}" for c in build.conflicts),
+                              build.conflicts)
+    return build
+
+
+if __name__ == "__main__":
+    from parser.table import P
+
+    print(build_table(P).report())
+    print(load_table(P, strict=False).report())
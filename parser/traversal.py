@@ -0,0 +1,33 @@
+from collections.abc import Callable, Generator
+from typing import Any
+
+
+def trampoline(request: Any, visit: Callable[[Any], Generator | Any]) -> Any:
+    """
+    Executa um percurso pós-ordem sem recursão. `visit(request)` devolve o
+    resultado de um nó folha ou um gerador que, para cada filho, faz
+    `resultado = yield pedido_do_filho` e termina com `return resultado`.
+    Os geradores pendentes ficam em uma pilha explícita, então a
+    profundidade da árvore não esbarra no limite de recursão do Python e a
+    ordem de execução é a mesma da versão recursiva.
+    """
+    value = visit(request)
+    if not isinstance(value, Generator):
+        return value
+
+    stack = [value]
+    value = None
+    while stack:
+        try:
+            request = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+
+        value = visit(request)
+        if isinstance(value, Generator):
+            stack.append(value)
+            value = None
+
+    return value
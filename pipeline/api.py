@@ -0,0 +1,193 @@
+"""
+API de biblioteca do compilador: recebe o texto fonte e devolve os
+artefatos de cada fase em memória, sem ler nem escrever arquivos, sem
+imprimir nada e sem `sys.exit`. Os erros de compilação viram diagnósticos
+no resultado. O `main.py` é só uma casca de linha de comando sobre ela.
+
+Uso:
+    from pipeline.api import compile_source
+
+    result = compile_source("(1 2.5 +)\\n(1 RES)")
+    if result.ok:
+        print(result.asm)
+    else:
+        print(*result.diagnostics)
+"""
+from __future__ import annotations
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Iterable
+
+from lexer.backends import resolve_lexer
+from lexer.errors import LexError
+from lexer.token_stream import TokenStream
+from parser.arena import ASTArena, Op
+from parser.ast_node import ASTNode
+from parser.errors import LL1SyntaxError
+from parser.parser import LL1Parser
+from parser.render import GraphView, render_graph
+from semantics.analyzer import SemanticAnalyzer
+from semantics.annotated_ast import AnnotatedASTNode
+from semantics.errors import SemanticError
+from generator.generator import CodeGenerator
+from generator.linker import assemble_program
+from generator.table import generate_precomputed
+
+# Fases em ordem de dependência: pedir uma fase roda todas as anteriores.
+STAGES = ("tokens", "ast", "annotated-ast", "asm")
+
+
+@dataclass(frozen=True, slots=True)
+class Diagnostic:
+    """Um erro de compilação, com a fase que o levantou e a posição no fonte."""
+    stage: str
+    message: str
+    line: int | None
+    col: int | None
+    error: Exception = field(repr=False, compare=False)
+
+    @classmethod
+    def from_error(cls, stage: str, error: Exception) -> Diagnostic:
+        return cls(stage, getattr(error, "msg", str(error)),
+                   getattr(error, "line", None), getattr(error, "col", None), error)
+
+    def __str__(self) -> str:
+        return str(self.error)
+
+
+@dataclass(slots=True)
+class CompileResult:
+    """
+    Artefatos de uma compilação. Só as fases pedidas (e as anteriores a
+    elas) são preenchidas; uma fase que falhou deixa as seguintes em None.
+    A AST fica na arena (`arena`), anotada no lugar pela análise semântica;
+    `ast` e `annotated_ast` são as vistas em árvore de objetos, montadas
+    quando acessadas. `timings` tem o tempo de cada fase, em segundos, e
+    `images` as imagens renderizadas (só com `render=True`).
+    """
+    tokens: TokenStream | None = None
+    arena: ASTArena | None = None
+    annotated: bool = False
+    asm: str | None = None
+    diagnostics: list[Diagnostic] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+    images: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.diagnostics
+
+    @property
+    def ast(self) -> ASTNode | None:
+        return self.arena.to_tree() if self.arena is not None else None
+
+    @property
+    def annotated_ast(self) -> AnnotatedASTNode | None:
+        return self.arena.to_annotated() if self.annotated else None
+
+    @property
+    def num_lines(self) -> int:
+        """Número de linhas/expressões do programa (filhas diretas de `<program>`)."""
+        arena = self.arena
+        if not arena or arena.ops[arena.root] != Op.PROGRAM:
+            return 0
+        return arena.child_count[arena.root]
+
+
+def compile_source(source: str, stages: Iterable[str] = ("asm",), lexer: str = "auto",
+                   render: bool = False, image_format: str = "png",
+                   view: GraphView = GraphView(), precompute: bool = False) -> CompileResult:
+    """
+    Compila o texto `source` até a última fase de `stages` (veja `STAGES`).
+    `lexer` é o nome de uma implementação, como na opção `--lexer` do
+    `main.py`. Com `render=True`, as árvores produzidas também são
+    desenhadas (no formato `image_format`, recortadas por `view`) em
+    segundo plano enquanto a compilação segue. Com `precompute=True`, as
+    linhas cujo resultado é conhecido na compilação viram uma tabela na
+    flash (`generator/table.py`).
+    """
+    return _compile(resolve_lexer(lexer)(source), stages, render, image_format, view, precompute)
+
+
+def compile_file(path: str | os.PathLike, stages: Iterable[str] = ("asm",), lexer: str = "auto",
+                 render: bool = False, image_format: str = "png",
+                 view: GraphView = GraphView(), precompute: bool = False) -> CompileResult:
+    """Como `compile_source`, mas o lexer lê o arquivo em blocos, sem carregar o texto inteiro."""
+    tokens = resolve_lexer(lexer).from_file(path)
+    try:
+        return _compile(tokens, stages, render, image_format, view, precompute)
+    finally:
+        tokens.close()
+
+
+def _last_stage(stages: Iterable[str]) -> int:
+    last = -1
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}; expected one of: {', '.join(STAGES)}")
+        last = max(last, STAGES.index(stage))
+    return last
+
+
+def _compile(lexer, stages: Iterable[str], render: bool, image_format: str, view: GraphView,
+             precompute: bool) -> CompileResult:
+    last = _last_stage(stages)
+    result = CompileResult()
+    timings = result.timings
+    # As imagens são desenhadas em segundo plano, cada uma assim que a sua
+    # árvore fica pronta, enquanto as fases seguintes continuam; o `dot`
+    # roda em um subprocesso, fora do GIL.
+    renders: dict[str, Future] = {}
+    stage = "tokens"
+    with ThreadPoolExecutor(max_workers=2) if render else nullcontext() as renderer:
+        try:
+            start = perf_counter()
+            result.tokens = TokenStream.from_tokens(lexer)
+            timings[stage] = perf_counter() - start
+
+            if last >= 1:
+                stage = "ast"
+                start = perf_counter()
+                result.arena = LL1Parser().parse_arena(result.tokens)
+                timings[stage] = perf_counter() - start
+                if render:
+                    renders[stage] = renderer.submit(render_image, result.arena, False, image_format, view)
+
+            if last >= 2:
+                stage = "annotated-ast"
+                start = perf_counter()
+                SemanticAnalyzer().annotate(result.arena)
+                result.annotated = True
+                timings[stage] = perf_counter() - start
+                if render:
+                    renders[stage] = renderer.submit(render_image, result.arena, True, image_format, view)
+
+            if last >= 3:
+                stage = "asm"
+                start = perf_counter()
+                if precompute:
+                    result.asm = generate_precomputed(result.arena)
+                else:
+                    code_gen = CodeGenerator()
+                    code_gen.generate(result.arena)
+                    result.asm = assemble_program(code_gen.get_main_code(), code_gen.get_temp_definitions(),
+                                                  result.num_lines)
+                timings[stage] = perf_counter() - start
+        except (LexError, LL1SyntaxError, SemanticError) as e:
+            result.diagnostics.append(Diagnostic.from_error(stage, e))
+
+        if renders:
+            timings["render"] = 0.0
+            for name, future in renders.items():
+                result.images[name], elapsed = future.result()
+                timings["render"] += elapsed
+    return result
+
+
+def render_image(arena: ASTArena, annotated: bool, image_format: str, view: GraphView) -> tuple[bytes, float]:
+    """Imagem da AST (ou da AST anotada) e o tempo gasto para desenhá-la."""
+    start = perf_counter()
+    return render_graph(arena, image_format, annotated, view), perf_counter() - start
@@ -0,0 +1,333 @@
+"""
+Cache de compilação em disco, endereçado pelo conteúdo.
+
+Guarda, em um único banco SQLite, principalmente dois tipos de entrada:
+
+- `program`: o `.asm` final de um programa inteiro, sob o hash do texto
+  fonte, da versão do compilador e das opções de geração. Um programa que
+  não mudou é servido sem lexer, parser, análise ou geração de código;
+  opcionalmente, a arena anotada (`ast`) é guardada junto.
+- `line`: o `Fragment` de cada linha (`generator.linker`), sob o hash da
+  sequência normalizada de tokens da linha (tipo e lexema, sem posições)
+  e do seu índice, do qual dependem RES e o namespace dos símbolos.
+
+Além delas, `build` guarda o estado da última compilação incremental de
+cada arquivo (`pipeline.incremental`).
+
+A "versão do compilador" é o hash dos fontes dos pacotes do compilador,
+então qualquer mudança no código invalida o cache sozinha. As entradas
+menos usadas recentemente são descartadas quando o banco passa de
+`max_bytes`, e os acertos/faltas ficam em `stats` (desta instância) e
+acumulados no próprio banco.
+
+Uso (estatísticas e limpeza):
+    python -m pipeline.cache [--clear]
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import time
+import zlib
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+
+from lexer.compiled import CompiledLexer
+from lexer.errors import LexError
+from lexer.token_stream import TokenStream
+from lexer.tokens import TokenType
+from parser.arena import ASTArena
+from parser.errors import LL1SyntaxError
+from parser.parser import LL1Parser
+from semantics.analyzer import SemanticAnalyzer
+from semantics.errors import SemanticError
+from generator.linker import Fragment, generate_fragments, link
+from pipeline.parallel import compile_serial
+
+# Incrementar quando o formato das entradas mudar.
+CACHE_FORMAT_VERSION = 1
+
+CACHE_DIR = Path(os.environ.get("RPN_CACHE_DIR", Path.home() / ".cache" / "rpn-compiler"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+ROOT = Path(__file__).resolve().parent.parent
+COMPILER_PACKAGES = ("lexer", "parser", "semantics", "generator", "pipeline")
+
+L_PAREN, R_PAREN = TokenType.L_PAREN.value, TokenType.R_PAREN.value
+
+# Chaves consultadas por comando no SQLite (limite de parâmetros).
+LOOKUP_BATCH = 500
+
+
+@cache
+def compiler_version() -> str:
+    """Hash dos fontes `.py` dos pacotes do compilador."""
+    digest = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode())
+    for package in COMPILER_PACKAGES:
+        for path in sorted((ROOT / package).rglob("*.py")):
+            digest.update(path.relative_to(ROOT).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _options_text(options: Mapping[str, object] | None) -> str:
+    return json.dumps(dict(options or {}), sort_keys=True)
+
+
+def program_key(src: str, options: Mapping[str, object] | None = None) -> str:
+    digest = hashlib.sha256(f"program\0{compiler_version()}\0{_options_text(options)}\0".encode())
+    digest.update(src.encode("utf8"))
+    return digest.hexdigest()
+
+
+def line_key(tokens: TokenStream, start: int, stop: int, line_index: int,
+             options: Mapping[str, object] | None = None) -> str:
+    """Chave de uma linha: os tokens `start:stop` (tipo e lexema) e o índice da linha."""
+    digest = hashlib.sha256(f"line\0{compiler_version()}\0{_options_text(options)}\0{line_index}\0".encode())
+    digest.update(tokens.types[start:stop].tobytes())
+    digest.update(tokens.lengths[start:stop].tobytes())
+    # Tipos e tamanhos delimitam os lexemas: basta o texto sem os espaços.
+    begin = tokens.text_offsets[start]
+    end = tokens.text_offsets[stop - 1] + tokens.lengths[stop - 1]
+    digest.update("".join(tokens.text[begin:end].split()).encode("utf8"))
+    return digest.hexdigest()
+
+
+def split_lines(tokens: TokenStream) -> list[tuple[int, int]]:
+    """
+    Intervalos `[start, stop)` de tokens de cada expressão de nível superior,
+    pelo balanço dos parênteses (o EOF final fica de fora). Tokens fora de
+    parênteses ficam com a linha corrente e fazem o parser falhar nela.
+    """
+    types = tokens.types
+    stop = len(types) - 1 if len(types) and types[-1] == TokenType.EOF.value else len(types)
+    ranges: list[tuple[int, int]] = []
+    start = depth = 0
+    for k in range(stop):
+        t = types[k]
+        if t == L_PAREN:
+            if depth == 0 and k > start:
+                ranges.append((start, k))
+                start = k
+            depth += 1
+        elif t == R_PAREN:
+            depth -= 1
+    if stop > start:
+        ranges.append((start, stop))
+    return ranges
+
+
+@dataclass
+class CacheStats:
+    hits: dict[str, int] = field(default_factory=lambda: {"program": 0, "line": 0})
+    misses: dict[str, int] = field(default_factory=lambda: {"program": 0, "line": 0})
+
+    def count(self, kind: str, hits: int, misses: int) -> None:
+        self.hits[kind] += hits
+        self.misses[kind] += misses
+
+    def __str__(self) -> str:
+        return ", ".join(f"{kind}: {self.hits[kind]} hit(s) / {self.misses[kind]} miss(es)" for kind in self.hits)
+
+
+class CompileCache:
+    """Cache LRU limitado por tamanho (ver a documentação do módulo)."""
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / "cache.sqlite3"
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, kind TEXT NOT NULL, value BLOB NOT NULL,
+                size INTEGER NOT NULL, last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS counters (
+                kind TEXT PRIMARY KEY, hits INTEGER NOT NULL, misses INTEGER NOT NULL
+            );
+        """)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> CompileCache:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ───────────────────────── acesso às entradas ─────────────────────────
+
+    def _get_many(self, keys: list[str]) -> dict[str, bytes]:
+        found: dict[str, bytes] = {}
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            found.update(self.db.execute(f"SELECT key, value FROM entries WHERE key IN ({marks})", batch))
+        if found:
+            now = time.time_ns()
+            self.db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", ((now, key) for key in found))
+        return found
+
+    def _put_many(self, kind: str, items: Iterable[tuple[str, bytes]]) -> None:
+        now = time.time_ns()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO entries (key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+            ((key, kind, value, len(key) + len(value), now) for key, value in items)
+        )
+
+    def _record(self, kind: str, hits: int, misses: int) -> None:
+        self.stats.count(kind, hits, misses)
+        self.db.execute(
+            "INSERT INTO counters (kind, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT (kind) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            (kind, hits, misses)
+        )
+
+    def get_program(self, key: str) -> str | None:
+        value = self._get_many([key]).get(key)
+        self._record("program", value is not None, value is None)
+        self.db.commit()
+        return zlib.decompress(value).decode("utf8") if value is not None else None
+
+    def put_program(self, key: str, asm: str, ast: ASTArena | None = None) -> None:
+        items = [(key, zlib.compress(asm.encode("utf8")))]
+        if ast is not None:
+            items.append((key + ".ast", zlib.compress(pickle.dumps(ast))))
+        self._put_many("program", items)
+        self.evict()
+
+    def get_ast(self, key: str) -> ASTArena | None:
+        """Arena anotada guardada com o programa, se houver."""
+        value = self._get_many([key + ".ast"]).get(key + ".ast")
+        self.db.commit()
+        return pickle.loads(zlib.decompress(value)) if value is not None else None
+
+    def get_fragments(self, keys: list[str]) -> dict[str, Fragment]:
+        found = self._get_many(keys)
+        self._record("line", len(found), len(keys) - len(found))
+        self.db.commit()
+        fragments = {}
+        for key, value in found.items():
+            line_index, code, temp_definitions, labels = json.loads(value)
+            fragments[key] = Fragment(line_index, code, tuple(temp_definitions), tuple(labels))
+        return fragments
+
+    def put_fragments(self, items: Iterable[tuple[str, Fragment]]) -> None:
+        self._put_many("line", (
+            (key, json.dumps([f.line_index, f.code, f.temp_definitions, f.labels]).encode("utf8"))
+            for key, f in items
+        ))
+        self.evict()
+
+    def get_build(self, key: str) -> object | None:
+        """Estado da última compilação incremental de um arquivo (`pipeline.incremental`)."""
+        value = self._get_many([key]).get(key)
+        self.db.commit()
+        return pickle.loads(zlib.decompress(value)) if value is not None else None
+
+    def put_build(self, key: str, build: object) -> None:
+        self._put_many("build", [(key, zlib.compress(pickle.dumps(build)))])
+        self.evict()
+
+    # ───────────────────────── tamanho e estatísticas ─────────────────────────
+
+    def size(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self) -> None:
+        """Remove as entradas usadas há mais tempo até o total caber em `max_bytes`."""
+        excess = self.size() - self.max_bytes
+        if excess > 0:
+            victims = []
+            for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            self.db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.db.commit()
+
+    def clear(self) -> None:
+        self.db.execute("DELETE FROM entries")
+        self.db.execute("DELETE FROM counters")
+        self.db.commit()
+
+    def summary(self) -> str:
+        lines = [f"{self.path}: {self.size() / 1024:.1f} KiB (max {self.max_bytes / 1024:.0f} KiB)"]
+        for kind, count, size in self.db.execute(
+                "SELECT kind, COUNT(*), SUM(size) FROM entries GROUP BY kind ORDER BY kind"):
+            lines.append(f"  {kind}: {count} entr{'y' if count == 1 else 'ies'}, {size / 1024:.1f} KiB")
+        for kind, hits, misses in self.db.execute("SELECT kind, hits, misses FROM counters ORDER BY kind"):
+            total = hits + misses
+            lines.append(f"  {kind} lookups: {hits} hit(s), {misses} miss(es)"
+                         + (f" ({hits / total:.0%} hit rate)" if total else ""))
+        return "\n".join(lines)
+
+
+def compile_cached(src: str, cache: CompileCache, options: Mapping[str, object] | None = None,
+                   keep_ast: bool = False) -> str:
+    """
+    Compila `src` usando o cache: primeiro o programa inteiro; se faltar,
+    as linhas com fragmento guardado são reaproveitadas e só as demais são
+    analisadas e geradas (cada trecho contíguo de linhas novas em um único
+    parse). Com `keep_ast`, a arena anotada do programa é guardada junto ao
+    `.asm`. Em um erro de compilação, o programa inteiro é recompilado para
+    reportar o primeiro erro exatamente como na compilação sem cache.
+    """
+    key = program_key(src, options)
+    asm = cache.get_program(key)
+    if asm is not None:
+        return asm
+
+    try:
+        tokens = TokenStream.from_tokens(CompiledLexer(src))
+        ranges = split_lines(tokens)
+        if not ranges:
+            raise LL1SyntaxError("Empty program.", 1, 1, "")
+        keys = [line_key(tokens, start, stop, i, options) for i, (start, stop) in enumerate(ranges)]
+        fragments = cache.get_fragments(keys)
+
+        new: list[tuple[str, Fragment]] = []
+        i = 0
+        while i < len(ranges):
+            if keys[i] in fragments:
+                i += 1
+                continue
+            first = i
+            while i < len(ranges) and keys[i] not in fragments:
+                i += 1
+            arena = LL1Parser().parse_arena(tokens.segment(ranges[first][0], ranges[i - 1][1]))
+            SemanticAnalyzer().annotate(arena, first)
+            new.extend(zip(keys[first:i], generate_fragments(arena, first)))
+    except (LexError, LL1SyntaxError, SemanticError):
+        # Sem cache: reporta o erro do programa inteiro (ou compila, se o
+        # problema era só o corte em linhas).
+        asm = link(compile_serial(src))
+    else:
+        cache.put_fragments(new)
+        fragments.update(new)
+        asm = link(fragments[k] for k in keys)
+
+    ast = None
+    if keep_ast:
+        ast = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+        SemanticAnalyzer().annotate(ast)
+    cache.put_program(key, asm, ast)
+    return asm
+
+
+if __name__ == "__main__":
+    with CompileCache() as compile_cache:
+        if "--clear" in sys.argv[1:]:
+            compile_cache.clear()
+        print(compile_cache.summary())
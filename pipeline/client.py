@@ -0,0 +1,106 @@
+"""
+Cliente do servidor de compilação (`pipeline.daemon`), com a mesma linha
+de comando do `main.py`. O fonte é enviado ao servidor e o `.asm` é salvo
+ao lado dele; sem servidor no ar, a compilação roda no próprio processo
+(`main.main`). Só a biblioteca padrão é importada antes disso, para que a
+partida do cliente fique barata. O servidor só devolve o `.asm` da
+compilação padrão, com cache ou incremental: com outros artefatos em
+`--emit`, ou com `--stream` ou `--jobs`, a compilação também roda no próprio
+processo. As combinações de opções que o `main.py` recusa são recusadas
+aqui também.
+
+Uso:
+    python -m pipeline.client <arquivo> [--lexer NOME] [--cache [DIR]] [--incremental] [--emit ARTEFATOS]
+                              [--graph-line N] [--graph-max-nodes N] [--graph-max-depth N] [--graph-collapse]
+                              [--precompute] [--stream] [--jobs N]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from pipeline.protocol import SOCKET_PATH, request
+
+GREEN = "\033[32m"
+RED = "\033[31m"
+RESET = "\033[0m"
+
+
+def main(argv: list[str] | None = None) -> None:
+    cli_parser = argparse.ArgumentParser(description="Cliente do servidor de compilação RPN.")
+    cli_parser.add_argument("source_file", help="O arquivo de código fonte para compilar.")
+    cli_parser.add_argument("--lexer", default="auto", help="Implementação do lexer (como no main.py).")
+    cli_parser.add_argument("--stream", action="store_true",
+                            help="Compilação em uma passada (como no main.py); compila sem o servidor.")
+    cli_parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                            help="Compilação em N processos (como no main.py); compila sem o servidor.")
+    cli_parser.add_argument("--cache", dest="cache_dir", nargs="?", const="", default=None, metavar="DIR",
+                            help="Usa o cache de compilação (como no main.py).")
+    cli_parser.add_argument("--incremental", action="store_true", help="Recompilação incremental (como no main.py).")
+    cli_parser.add_argument("--emit", default="asm", metavar="ARTIFACTS",
+                            help="Artefatos a gerar (como no main.py); além do .asm, compila sem o servidor.")
+    cli_parser.add_argument("--graph-line", type=int, default=None, metavar="N",
+                            help="Desenha só a N-ésima expressão (como no main.py).")
+    cli_parser.add_argument("--graph-max-nodes", type=int, default=None, metavar="N",
+                            help="Limite de nós por imagem (como no main.py).")
+    cli_parser.add_argument("--graph-max-depth", type=int, default=None, metavar="N",
+                            help="Profundidade máxima das imagens (como no main.py).")
+    cli_parser.add_argument("--graph-collapse", action="store_true",
+                            help="Resume as subárvores repetidas (como no main.py).")
+    cli_parser.add_argument("--precompute", action="store_true",
+                            help="Tabela de resultados na flash (como no main.py).")
+    cli_parser.add_argument("--socket", type=Path, default=SOCKET_PATH, help="Caminho do socket do servidor.")
+    args = cli_parser.parse_args(argv)
+
+    # As mesmas verificações do `main.py`.
+    emit = [artifact.strip() for artifact in args.emit.split(",") if artifact.strip()]
+    other_mode = args.stream or args.jobs > 1 or args.cache_dir is not None or args.incremental
+    if other_mode and emit != ["asm"]:
+        cli_parser.error("--emit is only supported in the default mode (the other modes produce only the .asm)")
+    if other_mode and args.precompute:
+        cli_parser.error("--precompute is only supported in the default mode")
+
+    src_path = Path(args.source_file)
+    if not src_path.is_file():
+        print(f"{RED}[ERROR] File not found: {src_path}{RESET}")
+        sys.exit(1)
+
+    in_process = emit != ["asm"] or args.stream or args.jobs > 1
+    response = None if in_process else request({
+        "source": src_path.read_text(encoding="utf8"),
+        "path": str(src_path.resolve()),
+        "lexer": args.lexer,
+        "cache": args.cache_dir is not None,
+        "cache_dir": args.cache_dir or None,
+        "incremental": args.incremental,
+        "precompute": args.precompute,
+    }, args.socket)
+
+    if response is None:
+        import main as compiler
+        try:
+            emit = compiler.parse_emit(args.emit)
+        except argparse.ArgumentTypeError as e:
+            cli_parser.error(f"argument --emit: {e}")
+        if sum(fmt in emit for fmt in compiler.IMAGE_FORMATS) > 1:
+            cli_parser.error(f"--emit accepts only one image format ({', '.join(compiler.IMAGE_FORMATS)})")
+        max_nodes = compiler.DEFAULT_MAX_NODES if args.graph_max_nodes is None else args.graph_max_nodes
+        view = compiler.GraphView(args.graph_line, max_nodes or None, args.graph_max_depth, args.graph_collapse)
+        cache_dir = None
+        if args.cache_dir is not None:
+            cache_dir = Path(args.cache_dir) if args.cache_dir else compiler.CACHE_DIR
+        compiler.main(args.source_file, args.lexer, args.stream, args.jobs, cache_dir, args.incremental, emit,
+                      view, args.precompute)
+        return
+
+    if not response["ok"]:
+        sys.tracebacklimit = 0
+        print(response["error"])
+        sys.exit(1)
+
+    output_file = src_path.with_suffix(".asm")
+    output_file.write_text(response["asm"], encoding="utf8")
+    print(f"{GREEN}Assembly file saved to {output_file}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
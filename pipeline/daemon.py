@@ -0,0 +1,143 @@
+"""
+Servidor de compilação persistente, para não pagar a inicialização do
+Python e os imports do compilador a cada arquivo.
+
+O servidor (asyncio) aceita pedidos de vários clientes ao mesmo tempo por
+um socket Unix local (`pipeline.protocol`) e compila em um pool de
+processos de tamanho fixo, já aquecidos na partida. Cada pedido leva o
+texto fonte e as opções da linha de comando do `main.py`; a resposta traz
+o assembly ou a mensagem de erro. As imagens da AST não são geradas.
+
+Uso:
+    python -m pipeline.daemon [--socket CAMINHO] [--workers N]
+    python -m pipeline.daemon --stop
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lexer.errors import LexError
+from parser.errors import LL1SyntaxError
+from semantics.errors import SemanticError
+from pipeline.api import compile_source
+from pipeline.cache import CACHE_DIR, CompileCache, compile_cached, compiler_version
+from pipeline.incremental import compile_incremental
+from pipeline.protocol import HEADER, SOCKET_PATH, encode, request
+
+WARMUP_SOURCE = "(1 2.5 +)\n(((1 IF) 2 THEN) 3 ELSE)\n(2 (1 RES) FOR)"
+
+
+async def read_message(reader: asyncio.StreamReader) -> dict | None:
+    """Próxima mensagem do cliente, ou None quando ele fechou a conexão."""
+    try:
+        (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+        return json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def compile_request(message: dict) -> dict:
+    """
+    Compila um pedido (executado nos processos do pool). `lexer`, `cache`
+    (com `cache_dir` opcional), `incremental` (com `path`) e `precompute`
+    têm o mesmo efeito das opções do `main.py`; sem elas, é a compilação
+    padrão.
+    """
+    try:
+        src = message["source"]
+        cache_dir = Path(message.get("cache_dir") or CACHE_DIR)
+        if message.get("incremental"):
+            build_key = f"build:{compiler_version()}:{message['path']}"
+            with CompileCache(cache_dir) as cache:
+                asm, build = compile_incremental(src, cache.get_build(build_key))
+                cache.put_build(build_key, build)
+        elif message.get("cache"):
+            with CompileCache(cache_dir) as cache:
+                asm = compile_cached(src, cache)
+        else:
+            result = compile_source(src, lexer=message.get("lexer", "auto"),
+                                    precompute=bool(message.get("precompute")))
+            if not result.ok:
+                return {"ok": False, "error": str(result.diagnostics[0])}
+            asm = result.asm
+    except (LexError, LL1SyntaxError, SemanticError) as e:
+        return {"ok": False, "error": str(e)}
+    except KeyError as e:
+        return {"ok": False, "error": f"Invalid request: missing or unknown {e}."}
+    except Exception as e:
+        # Qualquer outra falha do compilador vira resposta de erro: o
+        # cliente não deve ficar sem resposta nem derrubar o worker.
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {"ok": True, "asm": asm}
+
+
+class CompileServer:
+    def __init__(self, socket_path: Path = SOCKET_PATH, workers: int | None = None):
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.stopped = asyncio.Event()
+        self.served = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while (message := await read_message(reader)) is not None:
+                command = message.get("command", "compile") if isinstance(message, dict) else None
+                if command == "ping":
+                    response = {"ok": True, "workers": self.workers, "served": self.served}
+                elif command == "shutdown":
+                    response = {"ok": True}
+                    self.stopped.set()
+                elif command == "compile":
+                    response = await loop.run_in_executor(self.pool, compile_request, message)
+                    self.served += 1
+                else:
+                    response = {"ok": False, "error": f"Invalid request: unknown command {command!r}."}
+                writer.write(encode(response))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        if request({"command": "ping"}, self.socket_path) is not None:
+            raise RuntimeError(f"A compile server is already listening on {self.socket_path}.")
+        self.socket_path.unlink(missing_ok=True)  # socket órfão de um servidor que caiu
+
+        # Aquece os processos: imports e caches do compilador ficam prontos.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, compile_request, {"source": WARMUP_SOURCE})
+                               for _ in range(self.workers)))
+
+        server = await asyncio.start_unix_server(self.handle, path=str(self.socket_path))
+        print(f"Compile server listening on {self.socket_path} ({self.workers} workers)")
+        try:
+            async with server:
+                await self.stopped.wait()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            self.socket_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    cli_parser = argparse.ArgumentParser(description="Servidor de compilação para a linguagem RPN.")
+    cli_parser.add_argument("--socket", type=Path, default=SOCKET_PATH, help="Caminho do socket Unix.")
+    cli_parser.add_argument("--workers", type=int, default=None, help="Processos de compilação (padrão: CPUs).")
+    cli_parser.add_argument("--stop", action="store_true", help="Encerra o servidor que está no ar.")
+    args = cli_parser.parse_args()
+
+    if args.stop:
+        if request({"command": "shutdown"}, args.socket) is None:
+            print(f"No compile server listening on {args.socket}")
+            sys.exit(1)
+        sys.exit(0)
+
+    try:
+        asyncio.run(CompileServer(args.socket, args.workers).serve())
+    except KeyboardInterrupt:
+        pass
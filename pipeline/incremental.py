@@ -0,0 +1,142 @@
+"""
+Recompilação incremental (`main.py --incremental`).
+
+Cada compilação guarda um `Build`: o texto, por linha de texto, e, para
+cada expressão de nível superior, as linhas de texto que ela ocupa e o
+código e as temporárias do seu fragmento (`generator.linker`). Na próxima
+compilação do mesmo arquivo, o texto novo é comparado ao anterior (prefixo
+e sufixo comuns) e só a região alterada, alargada até cobrir expressões
+inteiras, passa por lexer, parser, análise e geração; o resto é copiado do
+`Build`, e o `.dseg` é remontado com o novo número de linhas.
+
+RES só depende do índice da linha em que aparece, não do conteúdo da linha
+referenciada. Então as linhas depois da região só precisam ser refeitas
+quando a edição muda o número de expressões e desloca os índices delas.
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from lexer.compiled import CompiledLexer
+from lexer.errors import LexError
+from lexer.token_stream import TokenStream
+from parser.errors import LL1SyntaxError
+from parser.parser import LL1Parser
+from semantics.analyzer import SemanticAnalyzer
+from semantics.errors import SemanticError
+from generator.linker import assemble_program, generate_fragments
+from pipeline.cache import split_lines
+from pipeline.parallel import compile_serial
+
+
+@dataclass(slots=True)
+class Build:
+    lines: list[str]                # texto compilado, separado em "\n"
+    spans: list[tuple[int, int]]    # primeira e última linha de texto de cada expressão
+    codes: list[str]                # código de cada expressão
+    temp_definitions: list[str]     # definições `.byte` de cada expressão, unidas por "\n"
+    recompiled: int = 0             # expressões refeitas na compilação que gerou este build
+
+    def assemble(self) -> str:
+        temp_defs = "\n".join(definitions for definitions in self.temp_definitions if definitions)
+        return assemble_program("\n".join(self.codes), temp_defs, len(self.codes))
+
+
+def compile_region(text: str, first_line: int, first_text_line: int) -> Build:
+    """
+    Compila um trecho de expressões completas. `first_line` é o índice da
+    primeira expressão no programa e `first_text_line`, a linha de texto
+    (a partir de 0) em que o trecho começa.
+    """
+    tokens = TokenStream.from_tokens(CompiledLexer(text))
+    ranges = split_lines(tokens)
+    if not ranges:
+        return Build([], [], [], [], 0)
+
+    arena = LL1Parser().parse_arena(tokens)
+    SemanticAnalyzer().annotate(arena, first_line)
+    fragments = generate_fragments(arena, first_line)
+    if len(fragments) != len(ranges):
+        raise LL1SyntaxError("Top-level expressions do not match the parenthesis balance.", 1, 1, "")
+
+    offset = first_text_line - 1
+    return Build(
+        [],
+        [(tokens.lines[start] + offset, tokens.lines[stop - 1] + offset) for start, stop in ranges],
+        [fragment.code for fragment in fragments],
+        ["\n".join(fragment.temp_definitions) for fragment in fragments],
+        len(fragments)
+    )
+
+
+def _rebuild(src: str, previous: Build) -> Build:
+    old, new = previous.lines, src.split("\n")
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old_end, shift = len(old) - suffix, len(new) - len(old)
+
+    # Expressões [a, b) atingidas pela região alterada [start, end) do texto
+    # antigo; a região cresce até não cortar nenhuma expressão ao meio.
+    spans = previous.spans
+    a = bisect_left(spans, prefix, key=lambda span: span[1])
+    b = bisect_left(spans, old_end, key=lambda span: span[0])
+    start, end = prefix, old_end
+    if a < b:
+        start, end = min(start, spans[a][0]), max(end, spans[b - 1][1] + 1)
+    while a > 0 and spans[a - 1][1] >= start:
+        a -= 1
+        start = min(start, spans[a][0])
+    while b < len(spans) and spans[b][0] < end:
+        end = max(end, spans[b][1] + 1)
+        b += 1
+
+    region = compile_region("\n".join(new[start:end + shift]), a, start)
+    if len(region.codes) != b - a and b < len(spans):
+        # Mudou o número de expressões: os índices das seguintes mudam também.
+        rest = compile_region("\n".join(new[end + shift:]), a + len(region.codes), end + shift)
+        region.spans += rest.spans
+        region.codes += rest.codes
+        region.temp_definitions += rest.temp_definitions
+        b = len(spans)
+
+    return Build(
+        new,
+        spans[:a] + region.spans + [(first + shift, last + shift) for first, last in spans[b:]],
+        previous.codes[:a] + region.codes + previous.codes[b:],
+        previous.temp_definitions[:a] + region.temp_definitions + previous.temp_definitions[b:],
+        len(region.codes)
+    )
+
+
+def compile_incremental(src: str, previous: Build | None = None) -> tuple[str, Build]:
+    """
+    Compila `src` reaproveitando o que não mudou desde `previous` e devolve
+    o assembly e o novo `Build`. A saída é a mesma de uma compilação
+    completa por fragmentos (`compile_parallel`). Erros em uma região são
+    reportados compilando o programa inteiro, com as posições reais.
+    """
+    if previous is not None and previous.lines == src.split("\n"):
+        build = Build(previous.lines, previous.spans, previous.codes, previous.temp_definitions, 0)
+        return build.assemble(), build
+
+    try:
+        if previous is None:
+            build = compile_region(src, 0, 0)
+            if not build.codes:
+                compile_serial(src)
+            build.lines = src.split("\n")
+        else:
+            build = _rebuild(src, previous)
+            if not build.codes:
+                compile_serial(src)
+    except (LexError, LL1SyntaxError, SemanticError):
+        if previous is None:
+            raise
+        return compile_incremental(src)
+
+    return build.assemble(), build
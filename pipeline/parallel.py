@@ -0,0 +1,101 @@
+"""
+Compilação paralela do programa em trechos (`main.py --jobs N`).
+
+Cada expressão `( ... )` de nível superior é independente das demais: RES
+só usa o índice da linha, conhecido em tempo de compilação, e com
+`CodeGenerator(namespaced=True)` labels e temporárias de cada linha ficam
+em um namespace próprio. O fonte é cortado em trechos nas quebras de linha
+em que os parênteses estão balanceados; cada trecho passa por lexer,
+parser, análise semântica e geração de código em um processo do pool, e os
+fragmentos das linhas (`generator.linker`) são ligados no `.asm` final.
+"""
+from __future__ import annotations
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from lexer.compiled import CompiledLexer
+from lexer.errors import LexError
+from lexer.token_stream import TokenStream
+from parser.errors import LL1SyntaxError
+from parser.parser import LL1Parser
+from semantics.analyzer import SemanticAnalyzer
+from semantics.errors import SemanticError
+from generator.linker import Fragment, generate_fragments, link
+
+PAREN_OR_NEWLINE = re.compile(r"[()\n]")
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    text: str
+    first_line: int  # índice (no programa) da primeira expressão do trecho
+
+
+def split_source(src: str, shards: int) -> list[Shard]:
+    """
+    Divide o fonte em até `shards` trechos de tamanho parecido. Só se corta
+    em uma quebra de linha com profundidade de parênteses zero; as
+    expressões de nível superior contadas até o corte dão o `first_line`
+    do trecho seguinte. Basta olhar os caracteres `(`, `)` e `\\n`: nenhum
+    outro token da linguagem contém parênteses.
+    """
+    target = max(1, len(src) // shards)
+    result: list[Shard] = []
+    start = first_line = lines = depth = 0
+
+    for match in PAREN_OR_NEWLINE.finditer(src):
+        ch = match.group()
+        if ch == "(":
+            if depth == 0:
+                lines += 1
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0 and lines > first_line and match.end() - start >= target and len(result) < shards - 1:
+            result.append(Shard(src[start:match.end()], first_line))
+            start, first_line = match.end(), lines
+
+    if result and lines == first_line:
+        # Sobrou só espaço em branco: fica com o trecho anterior.
+        last = result.pop()
+        result.append(Shard(last.text + src[start:], last.first_line))
+    else:
+        result.append(Shard(src[start:], first_line))
+    return result
+
+
+def compile_shard(shard: Shard) -> list[Fragment] | None:
+    """
+    Compila um trecho (executado nos processos do pool). Erros de compilação
+    devolvem None: as posições seriam relativas ao trecho, e quem chamou
+    refaz a compilação serial para reportar o erro do programa inteiro.
+    """
+    try:
+        return compile_serial(shard.text, shard.first_line)
+    except (LexError, LL1SyntaxError, SemanticError):
+        return None
+
+
+def compile_serial(src: str, first_line: int = 0) -> list[Fragment]:
+    """Fragmentos de todas as linhas de `src`, no processo atual (erros são propagados)."""
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+    SemanticAnalyzer().annotate(arena, first_line)
+    return generate_fragments(arena, first_line)
+
+
+def compile_parallel(src: str, jobs: int) -> str:
+    """
+    Compila `src` em até `jobs` processos e devolve o assembly completo. A
+    saída não depende de como o fonte foi dividido: é a mesma de
+    `link(compile_serial(src))`.
+    """
+    shards = split_source(src, jobs)
+    if len(shards) == 1:
+        return link(compile_serial(src))
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(shards))) as pool:
+        outputs = list(pool.map(compile_shard, shards))
+    if None in outputs:
+        return link(compile_serial(src))
+    return link(fragment for fragments in outputs for fragment in fragments)
@@ -0,0 +1,51 @@
+"""
+Protocolo entre o servidor de compilação (`pipeline.daemon`) e o cliente
+(`pipeline.client`): mensagens JSON precedidas do tamanho em 4 bytes, por
+um socket Unix local. Este módulo não importa nada do compilador (nem o
+asyncio), para que o cliente continue leve.
+"""
+from __future__ import annotations
+import json
+import os
+import socket
+import struct
+import tempfile
+from pathlib import Path
+
+SOCKET_PATH = Path(os.environ.get("RPN_DAEMON_SOCKET",
+                                  Path(tempfile.gettempdir()) / f"rpn-compiler-{os.getuid()}.sock"))
+
+HEADER = struct.Struct("!I")
+
+
+def encode(message: dict) -> bytes:
+    body = json.dumps(message).encode("utf8")
+    return HEADER.pack(len(body)) + body
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Compile server closed the connection.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def request(message: dict, socket_path: Path = SOCKET_PATH) -> dict | None:
+    """
+    Envia uma mensagem e espera a resposta; None se não houver servidor no
+    ar. Se a conexão cair no meio do pedido, a resposta é um erro.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            sock.sendall(encode(message))
+            (size,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+            return json.loads(_recv_exactly(sock, size))
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except ConnectionError as e:
+        return {"ok": False, "error": str(e) or "Compile server closed the connection."}
@@ -1,14 +1,22 @@
+import struct
+
 from parser.ast_node import ASTNode
+from parser.arena import ASTArena, Op
 from .types import SemanticType, SignType
 from .errors import SemanticError
 from semantics.annotated_ast import AnnotatedASTNode
-from typing import List
+
+INT, FLOAT, VOID = SemanticType.INT.value, SemanticType.FLOAT.value, SemanticType.VOID.value
+NUMERIC = (INT, FLOAT)
+POSITIVE, NEGATIVE, ZERO, UNKNOWN = (SignType.POSITIVE.value, SignType.NEGATIVE.value,
+                                     SignType.ZERO.value, SignType.UNKNOWN.value)
+BINARY_OPS = (Op.ADD, Op.SUB, Op.MUL, Op.INT_DIV, Op.REAL_DIV, Op.MOD, Op.POW)
 
 
 class SemanticAnalyzer:
     """
-    Percorre a AST do parser e retorna uma nova árvore anotada,
-    com informações de tipo e sinal, aplicando as regras semânticas da linguagem.
+    Aplica as regras semânticas da linguagem à AST do parser, anotando
+    tipo e sinal de cada nó diretamente na arena (`ASTArena`).
     """
 
     def __init__(self):
@@ -16,39 +24,82 @@ class SemanticAnalyzer:
 
     def analyze(self, node: ASTNode, line_index: int = 0) -> AnnotatedASTNode:
         """
-        Método despachante principal. Ele delega a construção do nó anotado
-        para o método de construção (_build_...) apropriado.
+        Analisa uma árvore de `ASTNode` e devolve a vista anotada dela. As
+        regras são as mesmas de `annotate`, aplicadas a uma arena convertida.
         """
+        arena = ASTArena.from_tree(node)
+        self.annotate(arena, line_index)
+        return arena.to_annotated()
 
-        if node.label == '<program>':
-            return self._build_program_node(node)
-        elif self._is_number(node.label):
-            return self._build_literal_node(node)
-        elif node.label in ['+', '-', '*', '/', '|', '%', '^']:
-            return self._build_binary_op_node(node, line_index)
-        elif node.label == 'RES':
-            return self._build_res_node(node, line_index)
-        elif node.label == 'MEM':
-            return self._build_mem_node(node, line_index)
-        elif node.label == 'IF':
-            return self._build_if_node(node, line_index)
-        elif node.label == 'THEN':
-            return self._build_then_node(node, line_index)
-        elif node.label == 'ELSE':
-            return self._build_else_node(node, line_index)
-        elif node.label == 'FOR':
-            return self._build_for_node(node, line_index)
-        elif node.label == '<program_tail>':
-            return AnnotatedASTNode(label=node.label, children=[], eval_type=SemanticType.VOID, sign=SignType.UNKNOWN,
-                                    original_token=node.token)
+    def annotate(self, arena: ASTArena, line_index: int = 0) -> ASTArena:
+        """
+        Anota a arena no lugar. Os nós estão em pós-ordem, então basta uma
+        varredura linear: quando um nó é visitado, os seus filhos já foram.
+        Em um `<program>`, cada linha ocupa o intervalo de IDs que termina
+        na sua raiz, e a posição da linha é o índice usado por RES; nesse
+        caso `line_index` é o índice da primeira linha (diferente de 0 quando
+        a arena é só um trecho do programa).
+        """
+        root = arena.root
+        if arena.ops[root] == Op.PROGRAM:
+            start = 0
+            for line_idx, line_root in enumerate(arena.children(root), line_index):
+                self._annotate_range(arena, start, line_root + 1, line_idx)
+                start = line_root + 1
+            self._annotate_program_node(arena, root)
         else:
-            raise SemanticError(f"No semantic analysis rule found for node: '{node.label}'", node.token)
+            self._annotate_range(arena, 0, root + 1, line_index)
+        return arena
 
-    def _is_number(self, s: str) -> bool:
-        try:
-            float(s); return True
-        except (ValueError, TypeError):
-            return False
+    def annotate_node(self, arena: ASTArena, n: int, line_index: int = 0) -> None:
+        """
+        Anota um único nó cujos filhos já foram anotados. É o gancho usado
+        pelo parser em modo streaming (`LL1Parser.parse_lines`), que chama
+        este método no momento em que cada nó fica completo.
+        """
+        self._annotate_range(arena, n, n + 1, line_index)
+
+    def check_line(self, arena: ASTArena, line: int) -> None:
+        """Uma linha do programa não pode terminar em um condicional incompleto."""
+        if arena.ops[line] in (Op.IF, Op.THEN):
+            raise SemanticError(
+                f"Incomplete conditional: '{arena.label(line)}' is not a valid top-level expression.",
+                arena.token(line)
+            )
+
+    def _annotate_range(self, arena: ASTArena, start: int, stop: int, line_index: int) -> None:
+        """
+        Método despachante principal. Ele delega a anotação de cada nó para
+        o método (_annotate_...) apropriado.
+        """
+        ops = arena.ops
+        for n in range(start, stop):
+            op = ops[n]
+            if op == Op.PROGRAM:
+                self._annotate_program_node(arena, n)
+            elif op == Op.NUMBER:
+                self._annotate_literal_node(arena, n)
+            elif op in BINARY_OPS:
+                self._annotate_binary_op_node(arena, n)
+            elif op == Op.RES:
+                self._annotate_res_node(arena, n, line_index)
+            elif op == Op.MEM:
+                self._annotate_mem_node(arena, n)
+            elif op == Op.IF:
+                self._annotate_if_node(arena, n)
+            elif op == Op.THEN:
+                self._annotate_then_node(arena, n)
+            elif op == Op.ELSE:
+                self._annotate_else_node(arena, n)
+            elif op == Op.FOR:
+                self._annotate_for_node(arena, n)
+            else:
+                raise SemanticError(f"No semantic analysis rule found for node: '{arena.label(n)}'", arena.token(n))
+
+    @staticmethod
+    def _set(arena: ASTArena, n: int, eval_type: int, sign: int) -> None:
+        arena.types[n] = eval_type
+        arena.signs[n] = sign
 
     def _get_sign_from_literal(self, value_str: str) -> SignType:
         value = float(value_str)
@@ -56,149 +107,116 @@ class SemanticAnalyzer:
         if value < 0: return SignType.NEGATIVE
         return SignType.ZERO
 
-    def _build_literal_node(self, node: ASTNode) -> AnnotatedASTNode:
-        eval_type = SemanticType.FLOAT if '.' in node.label else SemanticType.INT
-        sign = self._get_sign_from_literal(node.label)
-        return AnnotatedASTNode(label=node.label, children=[], eval_type=eval_type, sign=sign,
-                                original_token=node.token)
-
-    def _build_program_node(self, node: ASTNode) -> AnnotatedASTNode:
-        """
-        Constrói o nó para a raiz do programa, gerenciando a contagem de linhas
-        de forma segura para programas de uma ou mais linhas.
-        """
-        annotated_children = []
-
-        if node.children:
-            line_idx = 0
-            first_expr_node = node.children[0]
-            annotated_children.append(self.analyze(first_expr_node, line_idx))
-
-            if len(node.children) > 1:
-                current_tail = node.children[1]
-                line_idx = 1
-                while current_tail and current_tail.children:
-                    annotated_children.append(self.analyze(current_tail.children[0], line_idx))
-                    current_tail = current_tail.children[1] if len(current_tail.children) > 1 else None
-                    line_idx += 1
-
-        for final_expr_node in annotated_children:
-            if final_expr_node.label in ('IF', 'THEN'):
-                raise SemanticError(
-                    f"Incomplete conditional: '{final_expr_node.label}' is not a valid top-level expression.",
-                    final_expr_node.original_token
-                )
-
-        return AnnotatedASTNode(label=node.label, children=annotated_children, eval_type=SemanticType.VOID,
-                                sign=SignType.UNKNOWN, original_token=node.token)
-
-    def _build_binary_op_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
-        left_child = self.analyze(node.children[0], line_index)
-        right_child = self.analyze(node.children[1], line_index)
-
-        op = node.label
-        if left_child.eval_type not in (SemanticType.INT, SemanticType.FLOAT) or right_child.eval_type not in (
-        SemanticType.INT, SemanticType.FLOAT):
-            raise SemanticError(f"Operator '{op}' expects numeric operands.", node.token)
-
-        result_type = left_child.eval_type
+    def _annotate_literal_node(self, arena: ASTArena, n: int) -> None:
+        label = arena.label(n)
+        try:
+            # Mesma conversão do gerador: o literal precisa caber em um f16.
+            struct.pack('<e', float(label))
+        except OverflowError:
+            raise SemanticError(f"Literal '{label}' is out of range for a 16-bit float.", arena.token(n))
+        eval_type = FLOAT if '.' in label else INT
+        self._set(arena, n, eval_type, self._get_sign_from_literal(label).value)
+
+    def _annotate_program_node(self, arena: ASTArena, n: int) -> None:
+        """Nó raiz do programa: nenhuma linha pode terminar em um condicional incompleto."""
+        for line in arena.children(n):
+            self.check_line(arena, line)
+        self._set(arena, n, VOID, UNKNOWN)
+
+    def _annotate_binary_op_node(self, arena: ASTArena, n: int) -> None:
+        left, right = arena.child(n, 0), arena.child(n, 1)
+        types = arena.types
+        left_type, right_type = types[left], types[right]
+
+        op = arena.label(n)
+        if left_type not in NUMERIC or right_type not in NUMERIC:
+            raise SemanticError(f"Operator '{op}' expects numeric operands.", arena.token(n))
+
+        right_is_literal = arena.ops[right] == Op.NUMBER
+        result_type = left_type
         if op == '^':
-            if right_child.eval_type is not SemanticType.INT:
-                raise SemanticError(f"The exponent ('^') must be an INT.", right_child.original_token)
-            if self._is_number(right_child.label) and int(right_child.label) < 0:
+            if right_type != INT:
+                raise SemanticError(f"The exponent ('^') must be an INT.", arena.token(right))
+            if right_is_literal and int(arena.label(right)) < 0:
                 raise SemanticError(f"The exponent ('^') must be a non-negative integer literal.",
-                                    right_child.original_token)
-            result_type = left_child.eval_type
+                                    arena.token(right))
+            result_type = left_type
         else:
-            if op in ('/', '|', '%') and self._is_number(right_child.label) and float(right_child.label) == 0:
-                raise SemanticError(f"Division by literal zero for operator '{op}'.", right_child.original_token)
+            if op in ('/', '|', '%') and right_is_literal and float(arena.label(right)) == 0:
+                raise SemanticError(f"Division by literal zero for operator '{op}'.", arena.token(right))
 
             if op in ('%', '|'):
-                result_type = SemanticType.FLOAT
+                result_type = FLOAT
 
             elif op == '/':
-                result_type = SemanticType.INT
+                result_type = INT
 
-            elif left_child.eval_type == SemanticType.FLOAT or right_child.eval_type == SemanticType.FLOAT:
-                result_type = SemanticType.FLOAT
-                if left_child.eval_type != right_child.eval_type:
-                    if left_child.eval_type == SemanticType.INT: left_child.needs_cast_to_float = True
-                    if right_child.eval_type == SemanticType.INT: right_child.needs_cast_to_float = True
+            elif left_type == FLOAT or right_type == FLOAT:
+                result_type = FLOAT
+                if left_type != right_type:
+                    if left_type == INT: arena.casts[left] = True
+                    if right_type == INT: arena.casts[right] = True
             else:
-                result_type = SemanticType.INT
-
-        return AnnotatedASTNode(label=op, children=[left_child, right_child], eval_type=result_type,
-                                sign=SignType.UNKNOWN, original_token=node.token)
-
-    def _build_res_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
-        child = self.analyze(node.children[0], line_index)
-        if child.eval_type is not SemanticType.INT:
-            raise SemanticError(f"'RES' expects an INT operand.", child.original_token)
-        if self._is_number(child.label):
-            n_value = int(child.label)
-            if n_value <= 0: raise SemanticError("'RES' operand must be a positive integer.", child.original_token)
+                result_type = INT
+
+        self._set(arena, n, result_type, UNKNOWN)
+
+    def _annotate_res_node(self, arena: ASTArena, n: int, line_index: int) -> None:
+        child = arena.child(n, 0)
+        if arena.types[child] != INT:
+            raise SemanticError(f"'RES' expects an INT operand.", arena.token(child))
+        if arena.ops[child] == Op.NUMBER:
+            n_value = int(arena.label(child))
+            if n_value <= 0: raise SemanticError("'RES' operand must be a positive integer.", arena.token(child))
             if n_value > line_index: raise SemanticError(
                 f"Cannot 'RES' {n_value} lines back. Only {line_index} previous result(s) are available.",
-                child.original_token)
-        return AnnotatedASTNode(label=node.label, children=[child], eval_type=SemanticType.FLOAT, sign=SignType.UNKNOWN,
-                                original_token=node.token)
-
-    def _build_mem_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
-        if node.children:
-            child = self.analyze(node.children[0], line_index)
-            if child.eval_type not in (SemanticType.INT, SemanticType.FLOAT):
-                raise SemanticError("'MEM' (write) expects a numeric operand.", child.original_token)
-            return AnnotatedASTNode(label=node.label, children=[child], eval_type=child.eval_type, sign=child.sign,
-                                    original_token=node.token)
+                arena.token(child))
+        self._set(arena, n, FLOAT, UNKNOWN)
+
+    def _annotate_mem_node(self, arena: ASTArena, n: int) -> None:
+        if arena.child_count[n]:
+            child = arena.child(n, 0)
+            if arena.types[child] not in NUMERIC:
+                raise SemanticError("'MEM' (write) expects a numeric operand.", arena.token(child))
+            self._set(arena, n, arena.types[child], arena.signs[child])
         else:
-            return AnnotatedASTNode(label=node.label, children=[], eval_type=SemanticType.FLOAT, sign=SignType.UNKNOWN,
-                                    original_token=node.token)
-
-    def _build_if_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
-        condition = self.analyze(node.children[0], line_index)
-        if condition.eval_type not in (SemanticType.INT, SemanticType.FLOAT):
-            raise SemanticError("IF condition must be numeric.", condition.original_token)
-        return AnnotatedASTNode(label=node.label, children=[condition], eval_type=SemanticType.VOID,
-                                sign=SignType.UNKNOWN, original_token=node.token)
-
-    def _build_then_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
-        # Este método não é chamado pelo despachante, mas serve para a recursão interna
-        if_node = self.analyze(node.children[0], line_index)
-        then_branch = self.analyze(node.children[1], line_index)
-        if if_node.label != 'IF':
-            raise SemanticError(f"The first operand for 'THEN' must be 'IF', but got '{if_node.label}'.",
-                                if_node.original_token)
+            self._set(arena, n, FLOAT, UNKNOWN)
 
-        return AnnotatedASTNode(label=node.label, children=[if_node, then_branch], eval_type=then_branch.eval_type,
-                                sign=then_branch.sign, original_token=node.token)
+    def _annotate_if_node(self, arena: ASTArena, n: int) -> None:
+        condition = arena.child(n, 0)
+        if arena.types[condition] not in NUMERIC:
+            raise SemanticError("IF condition must be numeric.", arena.token(condition))
+        self._set(arena, n, VOID, UNKNOWN)
 
-    def _build_else_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
+    def _annotate_then_node(self, arena: ASTArena, n: int) -> None:
+        if_node, then_branch = arena.child(n, 0), arena.child(n, 1)
+        if arena.ops[if_node] != Op.IF:
+            raise SemanticError(f"The first operand for 'THEN' must be 'IF', but got '{arena.label(if_node)}'.",
+                                arena.token(if_node))
+        self._set(arena, n, arena.types[then_branch], arena.signs[then_branch])
 
-        then_node_annotated = self.analyze(node.children[0], line_index)
-        else_branch_annotated = self.analyze(node.children[1], line_index)
+    def _annotate_else_node(self, arena: ASTArena, n: int) -> None:
+        then_node, else_branch = arena.child(n, 0), arena.child(n, 1)
 
-        if then_node_annotated.label != 'THEN':
-            raise SemanticError(f"The first operand for 'ELSE' must be 'THEN', but got '{then_node_annotated.label}'.",
-                                then_node_annotated.original_token)
+        if arena.ops[then_node] != Op.THEN:
+            raise SemanticError(f"The first operand for 'ELSE' must be 'THEN', but got '{arena.label(then_node)}'.",
+                                arena.token(then_node))
 
-        then_type = then_node_annotated.eval_type
-        else_type = else_branch_annotated.eval_type
+        then_type = arena.eval_type(then_node)
+        else_type = arena.eval_type(else_branch)
 
         if then_type != else_type:
             raise SemanticError(
                 f"Incompatible types in conditional branches: THEN branch has type {then_type.name}, but ELSE branch has type {else_type.name}. Types must be identical.",
-                node.token)
+                arena.token(n))
 
-        return AnnotatedASTNode(label=node.label, children=[then_node_annotated, else_branch_annotated],
-                                eval_type=then_type, sign=SignType.UNKNOWN, original_token=node.token)
+        self._set(arena, n, then_type.value, UNKNOWN)
 
-    def _build_for_node(self, node: ASTNode, line_index: int) -> AnnotatedASTNode:
-        iterations = self.analyze(node.children[0], line_index)
-        body_expr = self.analyze(node.children[1], line_index)
+    def _annotate_for_node(self, arena: ASTArena, n: int) -> None:
+        iterations, body_expr = arena.child(n, 0), arena.child(n, 1)
 
-        if iterations.eval_type is not SemanticType.INT:
-            raise SemanticError(f"The loop count for 'FOR' must be an INT, but got {iterations.eval_type.name}.",
-                                iterations.original_token)
+        if arena.types[iterations] != INT:
+            raise SemanticError(f"The loop count for 'FOR' must be an INT, but got {arena.eval_type(iterations).name}.",
+                                arena.token(iterations))
 
-        return AnnotatedASTNode(label=node.label, children=[iterations, body_expr], eval_type=body_expr.eval_type,
-                                sign=body_expr.sign, original_token=node.token)
+        self._set(arena, n, arena.types[body_expr], arena.signs[body_expr])
@@ -5,7 +5,7 @@ from lexer.tokens import Token
 from .types import SemanticType, SignType
 
 
-@dataclass
+@dataclass(slots=True)
 class AnnotatedASTNode:
     """Nó da árvore que contém as anotações da análise semântica."""
     label: str
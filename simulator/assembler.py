@@ -0,0 +1,372 @@
+"""
+Montador do assembly AVR que o gerador emite, para o simulador
+(`simulator/avr.py`). Aceita o mesmo dialeto que o `avra` monta para a
+placa: `.include` (o `m328Pdef.inc` fica na raiz do repositório), `.equ`,
+`.set`, `.def`, `.macro`/`.endm` com `@0..@9`, `.cseg`/`.dseg`/`.org`,
+`.db`/`.dw` na flash, `.byte` na SRAM, rótulos e expressões com `LOW()`,
+`HIGH()`, `'c'`, `0x`, `$` e `0b`. Símbolos e mnemônicos não distinguem
+maiúsculas de minúsculas.
+
+As instruções não são codificadas em opcodes: cada uma vira uma
+`Instruction` já com os operandos resolvidos (registradores, constantes,
+endereços de salto absolutos), no endereço de palavra em que o `avra` a
+colocaria. Só os dados de `.db`/`.dw` vão para a imagem de bytes da flash
+lida por `LPM`.
+"""
+from __future__ import annotations
+import ast
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Onde `.include` procura os arquivos, depois da pasta do próprio fonte.
+INCLUDE_DIRS = (Path(__file__).resolve().parent.parent,)
+# Flash do ATmega328P, em palavras de 16 bits.
+FLASH_WORDS = 0x4000
+# Início da SRAM do ATmega328P, onde o `.dseg` começa.
+SRAM_START = 0x100
+
+# Operandos de cada mnemônico: r = registrador, h = registrador r16..r31,
+# w = par r24/r26/r28/r30, k = constante de 8 bits, b = bit, m = endereço
+# na SRAM, p = ponteiro (X, Y, Z com + ou -), j = salto relativo de 12 bits,
+# s = desvio condicional de 7 bits, a = endereço absoluto.
+OPERANDS = {
+    **dict.fromkeys(("add", "adc", "sub", "sbc", "and", "or", "eor", "mov", "cp", "cpc", "cpse", "mul"), "rr"),
+    **dict.fromkeys(("ldi", "subi", "sbci", "andi", "ori", "cpi"), "hk"),
+    **dict.fromkeys(("lsl", "lsr", "asr", "rol", "ror", "tst", "clr", "dec", "inc", "neg", "com", "swap",
+                     "push", "pop"), "r"),
+    **dict.fromkeys(("sbrs", "sbrc"), "rb"),
+    **dict.fromkeys(("adiw", "sbiw"), "wk"),
+    "lds": "rm", "sts": "mr", "ld": "rp", "st": "pr", "lpm": "rp",
+    **dict.fromkeys(("rjmp", "rcall"), "j"),
+    **dict.fromkeys(("jmp", "call"), "a"),
+    **dict.fromkeys(("breq", "brne", "brcs", "brcc", "brlo", "brsh", "brmi", "brpl", "brlt", "brge",
+                     "brvs", "brvc"), "s"),
+    **dict.fromkeys(("ret", "nop", "clc", "sec", "clz", "sez", "cli", "sei"), ""),
+}
+# Instruções de duas palavras (a segunda é o endereço).
+TWO_WORDS = frozenset(("lds", "sts", "jmp", "call"))
+POINTERS = {"x": 26, "y": 28, "z": 30}
+# Modos de endereçamento por ponteiro.
+PLAIN, POST_INC, PRE_DEC = 0, 1, 2
+
+NUMBER = re.compile(r"'(\\?.)'|\$([0-9A-Fa-f]+)|\b0[xX]([0-9A-Fa-f]+)\b|\b0[bB]([01]+)\b|\b(\d+)\b")
+LABEL = re.compile(r"^\s*([A-Za-z_]\w*)\s*:")
+FUNCTIONS = {
+    "low": lambda x: x & 0xFF,
+    "high": lambda x: (x >> 8) & 0xFF,
+    "byte1": lambda x: x & 0xFF,
+    "byte2": lambda x: (x >> 8) & 0xFF,
+    "byte3": lambda x: (x >> 16) & 0xFF,
+    "lwrd": lambda x: x & 0xFFFF,
+    "hwrd": lambda x: (x >> 16) & 0xFFFF,
+}
+BINARY = {
+    ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: int(a / b), ast.FloorDiv: lambda a, b: int(a / b), ast.Mod: lambda a, b: a % b,
+    ast.LShift: lambda a, b: a << b, ast.RShift: lambda a, b: a >> b,
+    ast.BitAnd: lambda a, b: a & b, ast.BitOr: lambda a, b: a | b, ast.BitXor: lambda a, b: a ^ b,
+}
+UNARY = {ast.USub: lambda a: -a, ast.UAdd: lambda a: a, ast.Invert: lambda a: ~a, ast.Not: lambda a: int(not a)}
+
+
+class AssemblerError(Exception):
+    """Erro no fonte, com o arquivo e a linha (como o `avra` o reportaria)."""
+
+
+@dataclass(frozen=True, slots=True)
+class Instruction:
+    address: int
+    mnemonic: str
+    operands: tuple[int, ...]
+    location: str
+    text: str
+
+    @property
+    def words(self) -> int:
+        return 2 if self.mnemonic in TWO_WORDS else 1
+
+
+@dataclass(slots=True)
+class Program:
+    """Programa montado: instruções por endereço de palavra, imagem de `.db` e a tabela de símbolos."""
+    instructions: dict[int, Instruction] = field(default_factory=dict)
+    flash: bytearray = field(default_factory=lambda: bytearray(FLASH_WORDS * 2))
+    symbols: dict[str, int] = field(default_factory=dict)
+    data_end: int = SRAM_START
+
+
+def split_operands(text: str) -> list[str]:
+    """Separa os operandos por vírgulas fora de aspas."""
+    operands, current, quote = [], "", None
+    for char in text:
+        if quote:
+            quote = None if char == quote and not current.endswith("\\") else quote
+        elif char in "'\"":
+            quote = char
+        elif char == ",":
+            operands.append(current.strip())
+            current = ""
+            continue
+        current += char
+    if current.strip():
+        operands.append(current.strip())
+    return operands
+
+
+def strip_comment(line: str) -> str:
+    quote = None
+    for i, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == ";" or line.startswith("//", i):
+            return line[:i]
+    return line
+
+
+class Assembler:
+    """Duas passagens: a primeira dá endereços aos rótulos, a segunda resolve os operandos."""
+
+    def __init__(self, include_dirs: tuple[Path, ...] = INCLUDE_DIRS):
+        self.include_dirs = include_dirs
+        self.program = Program()
+        self.equs: dict[str, tuple[str, str]] = {}
+        self.defs: dict[str, int] = {}
+        self.macros: dict[str, list[str]] = {}
+        self.segment = "cseg"
+        self.pc = {"cseg": 0, "dseg": SRAM_START}
+        # (endereço, mnemônico, operandos, local, texto) ou (".db", endereço, tamanho, operandos, local).
+        self.pending: list[tuple] = []
+        self._resolving: set[str] = set()
+
+    def assemble(self, source: str, name: str = "<asm>", directory: Path | None = None) -> Program:
+        self._read(source, name, directory)
+        if self.pc["cseg"] > FLASH_WORDS:
+            raise AssemblerError(f"{name}: program needs {self.pc['cseg']} words, flash has {FLASH_WORDS}")
+        program = self.program
+        for item in self.pending:
+            if item[0] == ".db":
+                self._emit_data(*item[1:])
+            else:
+                address, mnemonic, operands, location, text = item
+                program.instructions[address] = Instruction(
+                    address, mnemonic, self._operands(address, mnemonic, operands, location), location, text)
+        for name in self.equs:
+            program.symbols[name] = self._symbol(name, self.equs[name][1])
+        program.data_end = self.pc["dseg"]
+        return program
+
+    # --- Primeira passagem ---
+
+    def _read(self, source: str, name: str, directory: Path | None) -> None:
+        lines = source.splitlines()
+        i = 0
+        while i < len(lines):
+            location = f"{name}:{i + 1}"
+            line = strip_comment(lines[i]).strip()
+            i += 1
+            if not line or line.startswith("#"):
+                continue
+            directive = line.split(None, 1)[0].lower()
+            if directive == ".macro":
+                body = []
+                while i < len(lines) and strip_comment(lines[i]).strip().lower() not in (".endm", ".endmacro"):
+                    body.append(lines[i])
+                    i += 1
+                if i == len(lines):
+                    raise AssemblerError(f"{location}: .macro without .endm")
+                i += 1
+                self.macros[line.split()[1].lower()] = body
+                continue
+            self._statement(line, location, directory)
+
+    def _statement(self, line: str, location: str, directory: Path | None) -> None:
+        while match := LABEL.match(line):
+            self._define(match.group(1), self.pc[self.segment], location)
+            line = line[match.end():].strip()
+        if not line:
+            return
+        head, *rest = line.split(None, 1)
+        head, rest = head.lower(), rest[0].strip() if rest else ""
+
+        if head == ".include":
+            self._include(rest.strip('"<>'), location, directory)
+        elif head in (".equ", ".set"):
+            symbol, _, expression = rest.partition("=")
+            self.equs[symbol.strip().lower()] = (expression.strip(), location)
+        elif head == ".def":
+            symbol, _, register = rest.partition("=")
+            self.defs[symbol.strip().lower()] = self._register(register.strip(), location)
+        elif head in (".cseg", ".dseg"):
+            self.segment = head[1:]
+        elif head == ".org":
+            self.pc[self.segment] = self._evaluate(rest, location)
+        elif head == ".byte":
+            if self.segment != "dseg":
+                raise AssemblerError(f"{location}: .byte outside .dseg")
+            self.pc["dseg"] += self._evaluate(rest, location)
+        elif head in (".db", ".dw"):
+            if self.segment != "cseg":
+                raise AssemblerError(f"{location}: {head} outside .cseg")
+            operands = split_operands(rest)
+            size = 2 if head == ".dw" else 1
+            count = sum(len(op) - 2 if op.startswith('"') else 1 for op in operands) * size
+            self.pending.append((".db", self.pc["cseg"] * 2, size, operands, location))
+            # Cada diretiva ocupa um número inteiro de palavras.
+            self.pc["cseg"] += (count + 1) // 2
+        elif head in (".device", ".list", ".nolist", ".listmac", ".exit"):
+            pass
+        elif head in self.macros:
+            arguments = split_operands(rest)
+
+            def argument(match: re.Match) -> str:
+                index = int(match.group(1))
+                if index >= len(arguments):
+                    raise AssemblerError(f"{location}: macro '{head}' uses @{index} but got {len(arguments)} "
+                                         f"argument(s)")
+                return arguments[index]
+
+            for body_line in self.macros[head]:
+                expanded = re.sub(r"@(\d)", argument, strip_comment(body_line))
+                if expanded.strip():
+                    self._statement(expanded.strip(), location, directory)
+        elif head in OPERANDS:
+            if self.segment != "cseg":
+                raise AssemblerError(f"{location}: instruction outside .cseg")
+            self.pending.append((self.pc["cseg"], head, split_operands(rest), location, line))
+            self.pc["cseg"] += 2 if head in TWO_WORDS else 1
+        else:
+            raise AssemblerError(f"{location}: unknown instruction or directive '{head}'")
+
+    def _include(self, file_name: str, location: str, directory: Path | None) -> None:
+        for include_dir in ((directory,) if directory else ()) + self.include_dirs:
+            path = include_dir / file_name
+            if path.is_file():
+                self._read(path.read_text(encoding="utf8", errors="replace"), path.name, path.parent)
+                return
+        raise AssemblerError(f"{location}: cannot find include file '{file_name}'")
+
+    def _define(self, name: str, value: int, location: str) -> None:
+        key = name.lower()
+        if key in self.program.symbols:
+            raise AssemblerError(f"{location}: label '{name}' is already defined")
+        self.program.symbols[key] = value
+
+    # --- Segunda passagem ---
+
+    def _emit_data(self, address: int, size: int, operands: list[str], location: str) -> None:
+        data = bytearray()
+        for operand in operands:
+            if operand.startswith('"'):
+                data += operand[1:-1].encode("latin-1")
+            else:
+                value = self._evaluate(operand, location)
+                data += (value & (0xFF if size == 1 else 0xFFFF)).to_bytes(size, "little")
+        self.program.flash[address:address + len(data)] = data
+
+    def _operands(self, address: int, mnemonic: str, operands: list[str], location: str) -> tuple[int, ...]:
+        kinds = OPERANDS[mnemonic]
+        if mnemonic == "lpm" and not operands:
+            return 0, POINTERS["z"], PLAIN
+        if len(operands) != len(kinds):
+            raise AssemblerError(f"{location}: '{mnemonic}' takes {len(kinds)} operand(s), got {len(operands)}")
+        resolved: list[int] = []
+        for kind, operand in zip(kinds, operands):
+            if kind in "rhw":
+                register = self._register(operand, location)
+                if kind == "h" and register < 16:
+                    raise AssemblerError(f"{location}: '{mnemonic}' needs a register from r16 to r31")
+                if kind == "w" and register not in (24, 26, 28, 30):
+                    raise AssemblerError(f"{location}: '{mnemonic}' needs r24, r26, r28 or r30")
+                resolved.append(register)
+            elif kind == "p":
+                resolved.extend(self._pointer(operand, location))
+            else:
+                value = self._evaluate(operand, location)
+                limit = {"k": (-128, 255), "b": (0, 7), "m": (0, 0xFFFF), "a": (0, FLASH_WORDS - 1)}.get(kind)
+                if kind == "k" and mnemonic in ("adiw", "sbiw"):
+                    limit = (0, 63)
+                if kind in "js":
+                    reach = 2048 if kind == "j" else 64
+                    if not -reach <= value - (address + 1) < reach:
+                        raise AssemblerError(f"{location}: relative branch to '{operand}' out of reach")
+                elif not limit[0] <= value <= limit[1]:
+                    raise AssemblerError(f"{location}: operand '{operand}' out of range")
+                resolved.append(value & 0xFF if kind == "k" else value)
+        return tuple(resolved)
+
+    def _register(self, text: str, location: str) -> int:
+        key = text.strip().lower()
+        if key in self.defs:
+            return self.defs[key]
+        match = re.fullmatch(r"r(\d+)", key)
+        if not match or int(match.group(1)) > 31:
+            raise AssemblerError(f"{location}: '{text}' is not a register")
+        return int(match.group(1))
+
+    def _pointer(self, text: str, location: str) -> tuple[int, int]:
+        key = text.replace(" ", "").lower()
+        if key in POINTERS:
+            return POINTERS[key], PLAIN
+        if len(key) == 2 and key[0] in POINTERS and key[1] == "+":
+            return POINTERS[key[0]], POST_INC
+        if len(key) == 2 and key[1] in POINTERS and key[0] == "-":
+            return POINTERS[key[1]], PRE_DEC
+        raise AssemblerError(f"{location}: '{text}' is not a pointer register (X, Y, Z, X+, -X, ...)")
+
+    def _evaluate(self, expression: str, location: str) -> int:
+        def number(match: re.Match) -> str:
+            char, dollar, hexa, binary, decimal = match.groups()
+            if char is not None:
+                return str(ord(char[-1]) if not char.startswith("\\") else ord({"n": "\n", "r": "\r", "t": "\t",
+                                                                                   "0": "\0"}.get(char[1], char[1])))
+            if dollar or hexa:
+                return str(int(dollar or hexa, 16))
+            return str(int(binary, 2)) if binary else str(int(decimal))
+
+        try:
+            tree = ast.parse(NUMBER.sub(number, expression.strip()), mode="eval")
+        except SyntaxError:
+            raise AssemblerError(f"{location}: invalid expression '{expression}'") from None
+        return self._value(tree.body, expression, location)
+
+    def _value(self, node: ast.AST, expression: str, location: str) -> int:
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self._symbol(node.id.lower(), location)
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY:
+            left = self._value(node.left, expression, location)
+            right = self._value(node.right, expression, location)
+            try:
+                return BINARY[type(node.op)](left, right)
+            except ZeroDivisionError:
+                raise AssemblerError(f"{location}: division by zero in '{expression}'") from None
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY:
+            return UNARY[type(node.op)](self._value(node.operand, expression, location))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id.lower() in FUNCTIONS and len(node.args) == 1):
+            return FUNCTIONS[node.func.id.lower()](self._value(node.args[0], expression, location))
+        raise AssemblerError(f"{location}: invalid expression '{expression}'")
+
+    def _symbol(self, name: str, location: str) -> int:
+        if name in self.program.symbols:
+            return self.program.symbols[name]
+        if name not in self.equs:
+            raise AssemblerError(f"{location}: undefined symbol '{name}'")
+        if name in self._resolving:
+            raise AssemblerError(f"{location}: circular definition of '{name}'")
+        self._resolving.add(name)
+        expression, equ_location = self.equs[name]
+        value = self._evaluate(expression, equ_location)
+        self._resolving.discard(name)
+        return value
+
+
+def assemble(source: str, name: str = "<asm>", directory: Path | None = None,
+             include_dirs: tuple[Path, ...] = INCLUDE_DIRS) -> Program:
+    """Monta um `.asm` completo; `directory` é onde `.include` procura primeiro."""
+    return Assembler(include_dirs).assemble(source, name, directory)
@@ -0,0 +1,565 @@
+"""
+Simulador do ATmega328P no nível das instruções: executa o `.asm` gerado
+(montado por `simulator/assembler.py`) e devolve os bytes escritos em
+`UDR0`, com a contagem de ciclos do datasheet, sem `avra`, `avrdude` nem
+placa. Cobre as instruções que o gerador, as rotinas de
+`generator/subroutines/` e a tabela do `--precompute` usam.
+
+- Registradores, I/O e SRAM ficam num único espaço de dados, como na
+  placa (r0..r31 em 0x00..0x1F, `SPL`/`SPH`/`SREG` e a USART nos seus
+  endereços); a SRAM começa zerada e a pilha em `RAMEND`.
+- Ciclos: os do ATmega328P (PC de 16 bits), incluindo desvios tomados e
+  `SBRS`/`SBRC` que pulam instruções de duas palavras.
+- USART: por padrão o transmissor está sempre livre (`UDRE0` = 1), então
+  os ciclos medem só o código. Com `usart_timing`, cada byte ocupa o
+  transmissor por um quadro inteiro no baud rate de `UBRR0`, e o laço de
+  `tx_R16` espera como na placa.
+- O programa termina no laço `end: rjmp end` (um salto para si mesmo).
+
+Uso:
+    python -m simulator.avr programa.txt [--precompute] [--usart-timing] [--cycles]
+    python -m simulator.avr programa.asm
+"""
+from __future__ import annotations
+import argparse
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from simulator.assembler import FLASH_WORDS, POST_INC, PRE_DEC, AssemblerError, Program, assemble
+
+RAMEND = 0x08FF
+# Endereços no espaço de dados (os de I/O somados a 0x20), de `m328Pdef.inc`.
+SPL, SPH, SREG = 0x5D, 0x5E, 0x5F
+UCSR0A, UCSR0B, UCSR0C, UBRR0L, UBRR0H, UDR0 = 0xC0, 0xC1, 0xC2, 0xC4, 0xC5, 0xC6
+UDRE0, U2X0 = 5, 1
+# Ciclos antes de desistir de um programa que não chega ao laço final.
+MAX_CYCLES = 500_000_000
+
+
+class AVRError(Exception):
+    """O programa fez algo que a placa não faria de forma definida, ou não terminou."""
+
+
+@dataclass(slots=True)
+class Simulation:
+    output: bytes
+    cycles: int
+    instructions: int
+
+    @property
+    def values(self) -> list[int]:
+        """Os valores `0xHHHH` impressos por `print_f16`, em ordem."""
+        return [int(line, 16) for line in self.output.decode("latin-1").split()]
+
+
+class AVR:
+    """Estado da CPU: espaço de dados, PC, SP, flags, ciclos e a saída da USART."""
+
+    def __init__(self, program: Program, usart_timing: bool = False):
+        self.program = program
+        self.usart_timing = usart_timing
+        self.data = bytearray(RAMEND + 1)
+        self.pc = 0
+        self.sp = RAMEND
+        self.c = self.z = self.n = self.v = self.s = self.h = 0
+        self.cycles = 0
+        self.instructions = 0
+        self.halted = False
+        self.output = bytearray()
+        # Transmissor: fim do quadro em andamento e se há um byte esperando em UDR0.
+        self.tx_done = 0
+        self.tx_pending = False
+        self.data[UCSR0A] = 1 << UDRE0
+        self.code: list[tuple | None] = [None] * FLASH_WORDS
+        for address, instruction in program.instructions.items():
+            handler = getattr(self, f"_{instruction.mnemonic}")
+            self.code[address] = (handler, instruction.operands, instruction.words)
+
+    def run(self, max_cycles: int = MAX_CYCLES) -> bytes:
+        """Executa até o laço final e devolve os bytes transmitidos."""
+        code = self.code
+        while not self.halted:
+            if self.cycles > max_cycles:
+                raise AVRError(f"Program did not reach its final loop within {max_cycles} cycles.")
+            try:
+                handler, operands, words = code[self.pc]
+            except (TypeError, IndexError):
+                raise AVRError(f"No instruction at word address 0x{self.pc:04X}.") from None
+            self.pc += words
+            self.cycles += handler(*operands)
+            # O salto do laço final não conta.
+            self.instructions += not self.halted
+        return bytes(self.output)
+
+    # --- Espaço de dados ---
+
+    def read(self, address: int) -> int:
+        if address >= 0x100 or address < 0x20:
+            return self.data[address]
+        if address == SPL:
+            return self.sp & 0xFF
+        if address == SPH:
+            return self.sp >> 8
+        if address == SREG:
+            return self.c | self.z << 1 | self.n << 2 | self.v << 3 | self.s << 4 | self.h << 5
+        if address == UCSR0A:
+            self._update_usart()
+            return self.data[UCSR0A] & ~(1 << UDRE0) | (0 if self.tx_pending else 1 << UDRE0)
+        if address == UDR0:
+            return 0
+        return self.data[address]
+
+    def write(self, address: int, value: int) -> None:
+        if address >= 0x100 or address < 0x20:
+            self.data[address] = value
+        elif address == SPL:
+            self.sp = self.sp & 0xFF00 | value
+        elif address == SPH:
+            self.sp = self.sp & 0xFF | value << 8
+        elif address == SREG:
+            self.c, self.z, self.n, self.v, self.s, self.h = ((value >> bit) & 1 for bit in range(6))
+        elif address == UDR0:
+            self._transmit(value)
+        elif address == UCSR0A:
+            # UDRE0 só é lido; os demais bits (U2X0, MPCM0) são escritos.
+            self.data[UCSR0A] = value & 0b11
+        else:
+            self.data[address] = value
+
+    def _frame_cycles(self) -> int:
+        """Ciclos de um quadro (início, dados, paridade, parada) no baud rate configurado."""
+        ubrr = (self.data[UBRR0H] & 0x0F) << 8 | self.data[UBRR0L]
+        control = self.data[UCSR0C]
+        bits = 1 + 5 + ((control >> 1) & 0b11) + (1 if control & 0b0011_0000 else 0) + (2 if control & 0b1000 else 1)
+        return (8 if self.data[UCSR0A] & (1 << U2X0) else 16) * (ubrr + 1) * bits
+
+    def _update_usart(self) -> None:
+        # O byte em UDR0 passa para o registrador de deslocamento quando o quadro anterior termina.
+        if self.tx_pending and self.cycles >= self.tx_done:
+            self.tx_pending = False
+            self.tx_done += self._frame_cycles()
+
+    def _transmit(self, value: int) -> None:
+        self.output.append(value)
+        if not self.usart_timing:
+            return
+        self._update_usart()
+        if self.cycles >= self.tx_done:
+            self.tx_done = self.cycles + self._frame_cycles()
+        else:
+            self.tx_pending = True
+
+    # --- Flags ---
+
+    def _flags_add(self, a: int, b: int, result: int) -> int:
+        r = result & 0xFF
+        self.h = ((a & b) | (b & ~r) | (~r & a)) >> 3 & 1
+        self.c = result >> 8 & 1
+        self.v = ((a & b & ~r) | (~a & ~b & r)) >> 7 & 1
+        self.n = r >> 7
+        self.s = self.n ^ self.v
+        self.z = int(r == 0)
+        return r
+
+    def _flags_sub(self, a: int, b: int, result: int, keep_zero: bool = False) -> int:
+        r = result & 0xFF
+        self.h = ((~a & b) | (b & r) | (r & ~a)) >> 3 & 1
+        self.c = int(result < 0)
+        self.v = ((a & ~b & ~r) | (~a & b & r)) >> 7 & 1
+        self.n = r >> 7
+        self.s = self.n ^ self.v
+        # SBC, SBCI e CPC só limpam Z: encadeados, Z vale para a palavra inteira.
+        self.z = int(r == 0) & (self.z if keep_zero else 1)
+        return r
+
+    def _flags_logic(self, r: int) -> int:
+        self.v = 0
+        self.n = r >> 7
+        self.s = self.n
+        self.z = int(r == 0)
+        return r
+
+    def _flags_shift_right(self, r: int, carry: int) -> int:
+        self.c = carry
+        self.n = r >> 7
+        self.v = self.n ^ carry
+        self.s = self.n ^ self.v
+        self.z = int(r == 0)
+        return r
+
+    # --- Aritmética e lógica ---
+
+    def _add(self, d: int, r: int) -> int:
+        a, b = self.data[d], self.data[r]
+        self.data[d] = self._flags_add(a, b, a + b)
+        return 1
+
+    def _adc(self, d: int, r: int) -> int:
+        a, b = self.data[d], self.data[r]
+        self.data[d] = self._flags_add(a, b, a + b + self.c)
+        return 1
+
+    def _sub(self, d: int, r: int) -> int:
+        a, b = self.data[d], self.data[r]
+        self.data[d] = self._flags_sub(a, b, a - b)
+        return 1
+
+    def _sbc(self, d: int, r: int) -> int:
+        a, b = self.data[d], self.data[r]
+        self.data[d] = self._flags_sub(a, b, a - b - self.c, keep_zero=True)
+        return 1
+
+    def _subi(self, d: int, k: int) -> int:
+        a = self.data[d]
+        self.data[d] = self._flags_sub(a, k, a - k)
+        return 1
+
+    def _sbci(self, d: int, k: int) -> int:
+        a = self.data[d]
+        self.data[d] = self._flags_sub(a, k, a - k - self.c, keep_zero=True)
+        return 1
+
+    def _cp(self, d: int, r: int) -> int:
+        a, b = self.data[d], self.data[r]
+        self._flags_sub(a, b, a - b)
+        return 1
+
+    def _cpc(self, d: int, r: int) -> int:
+        a, b = self.data[d], self.data[r]
+        self._flags_sub(a, b, a - b - self.c, keep_zero=True)
+        return 1
+
+    def _cpi(self, d: int, k: int) -> int:
+        a = self.data[d]
+        self._flags_sub(a, k, a - k)
+        return 1
+
+    def _cpse(self, d: int, r: int) -> int:
+        return self._skip_if(self.data[d] == self.data[r])
+
+    def _and(self, d: int, r: int) -> int:
+        self.data[d] = self._flags_logic(self.data[d] & self.data[r])
+        return 1
+
+    def _andi(self, d: int, k: int) -> int:
+        self.data[d] = self._flags_logic(self.data[d] & k)
+        return 1
+
+    def _or(self, d: int, r: int) -> int:
+        self.data[d] = self._flags_logic(self.data[d] | self.data[r])
+        return 1
+
+    def _ori(self, d: int, k: int) -> int:
+        self.data[d] = self._flags_logic(self.data[d] | k)
+        return 1
+
+    def _eor(self, d: int, r: int) -> int:
+        self.data[d] = self._flags_logic(self.data[d] ^ self.data[r])
+        return 1
+
+    def _tst(self, d: int) -> int:
+        self._flags_logic(self.data[d])
+        return 1
+
+    def _clr(self, d: int) -> int:
+        self.data[d] = self._flags_logic(0)
+        return 1
+
+    def _com(self, d: int) -> int:
+        self.data[d] = self._flags_logic(~self.data[d] & 0xFF)
+        self.c = 1
+        return 1
+
+    def _neg(self, d: int) -> int:
+        a = self.data[d]
+        self.data[d] = self._flags_sub(0, a, -a)
+        return 1
+
+    def _inc(self, d: int) -> int:
+        r = (self.data[d] + 1) & 0xFF
+        self.data[d] = self._flags_logic(r)
+        self.v = int(r == 0x80)
+        self.s = self.n ^ self.v
+        return 1
+
+    def _dec(self, d: int) -> int:
+        r = (self.data[d] - 1) & 0xFF
+        self.data[d] = self._flags_logic(r)
+        self.v = int(r == 0x7F)
+        self.s = self.n ^ self.v
+        return 1
+
+    def _lsl(self, d: int) -> int:
+        return self._add(d, d)
+
+    def _rol(self, d: int) -> int:
+        return self._adc(d, d)
+
+    def _lsr(self, d: int) -> int:
+        a = self.data[d]
+        self.data[d] = self._flags_shift_right(a >> 1, a & 1)
+        return 1
+
+    def _asr(self, d: int) -> int:
+        a = self.data[d]
+        self.data[d] = self._flags_shift_right(a >> 1 | a & 0x80, a & 1)
+        return 1
+
+    def _ror(self, d: int) -> int:
+        a = self.data[d]
+        self.data[d] = self._flags_shift_right(a >> 1 | self.c << 7, a & 1)
+        return 1
+
+    def _swap(self, d: int) -> int:
+        a = self.data[d]
+        self.data[d] = (a << 4 | a >> 4) & 0xFF
+        return 1
+
+    def _mul(self, d: int, r: int) -> int:
+        product = self.data[d] * self.data[r]
+        self.data[0], self.data[1] = product & 0xFF, product >> 8
+        self.c = product >> 15
+        self.z = int(product == 0)
+        return 2
+
+    def _adiw(self, d: int, k: int) -> int:
+        a = self.data[d] | self.data[d + 1] << 8
+        r = (a + k) & 0xFFFF
+        self.data[d], self.data[d + 1] = r & 0xFF, r >> 8
+        self.v = (~a & r) >> 15 & 1
+        self.c = (~r & a) >> 15 & 1
+        self.n = r >> 15
+        self.s = self.n ^ self.v
+        self.z = int(r == 0)
+        return 2
+
+    def _sbiw(self, d: int, k: int) -> int:
+        a = self.data[d] | self.data[d + 1] << 8
+        r = (a - k) & 0xFFFF
+        self.data[d], self.data[d + 1] = r & 0xFF, r >> 8
+        self.v = (a & ~r) >> 15 & 1
+        self.c = (r & ~a) >> 15 & 1
+        self.n = r >> 15
+        self.s = self.n ^ self.v
+        self.z = int(r == 0)
+        return 2
+
+    def _clc(self) -> int:
+        self.c = 0
+        return 1
+
+    def _sec(self) -> int:
+        self.c = 1
+        return 1
+
+    def _clz(self) -> int:
+        self.z = 0
+        return 1
+
+    def _sez(self) -> int:
+        self.z = 1
+        return 1
+
+    def _cli(self) -> int:
+        return 1
+
+    _sei = _nop = _cli
+
+    # --- Transferência de dados ---
+
+    def _mov(self, d: int, r: int) -> int:
+        self.data[d] = self.data[r]
+        return 1
+
+    def _ldi(self, d: int, k: int) -> int:
+        self.data[d] = k
+        return 1
+
+    def _lds(self, d: int, address: int) -> int:
+        self.data[d] = self.read(address)
+        return 2
+
+    def _sts(self, address: int, r: int) -> int:
+        self.write(address, self.data[r])
+        return 2
+
+    def _pointer(self, base: int, mode: int) -> int:
+        """Endereço apontado por X/Y/Z, com o pós-incremento ou pré-decremento aplicado ao par."""
+        address = self.data[base] | self.data[base + 1] << 8
+        if mode == PRE_DEC:
+            address = (address - 1) & 0xFFFF
+            self.data[base], self.data[base + 1] = address & 0xFF, address >> 8
+        elif mode == POST_INC:
+            following = (address + 1) & 0xFFFF
+            self.data[base], self.data[base + 1] = following & 0xFF, following >> 8
+        return address
+
+    def _ld(self, d: int, base: int, mode: int) -> int:
+        address = self._pointer(base, mode)
+        if address > RAMEND:
+            raise AVRError(f"LD from 0x{address:04X}, outside the data space.")
+        self.data[d] = self.read(address)
+        return 2
+
+    def _st(self, base: int, mode: int, r: int) -> int:
+        value = self.data[r]
+        address = self._pointer(base, mode)
+        if address > RAMEND:
+            raise AVRError(f"ST to 0x{address:04X}, outside the data space.")
+        self.write(address, value)
+        return 2
+
+    def _lpm(self, d: int, base: int, mode: int) -> int:
+        self.data[d] = self.program.flash[self._pointer(base, mode) & (FLASH_WORDS * 2 - 1)]
+        return 3
+
+    def _push(self, r: int) -> int:
+        self.data[self.sp] = self.data[r]
+        self.sp -= 1
+        return 2
+
+    def _pop(self, d: int) -> int:
+        self.sp += 1
+        if self.sp > RAMEND:
+            raise AVRError("POP with an empty stack.")
+        self.data[d] = self.data[self.sp]
+        return 2
+
+    # --- Desvios ---
+
+    def _rjmp(self, target: int) -> int:
+        if target == self.pc - 1:
+            self.halted = True
+            return 0
+        self.pc = target
+        return 2
+
+    def _jmp(self, target: int) -> int:
+        if target == self.pc - 2:
+            self.halted = True
+            return 0
+        self.pc = target
+        return 3
+
+    def _call_to(self, target: int) -> None:
+        # Endereço de retorno na pilha, byte alto por último (no endereço mais baixo).
+        self.data[self.sp] = self.pc & 0xFF
+        self.data[self.sp - 1] = self.pc >> 8
+        self.sp -= 2
+        if self.sp < 0x100:
+            raise AVRError("Stack overflow into the I/O registers.")
+        self.pc = target
+
+    def _rcall(self, target: int) -> int:
+        self._call_to(target)
+        return 3
+
+    def _call(self, target: int) -> int:
+        self._call_to(target)
+        return 4
+
+    def _ret(self) -> int:
+        if self.sp + 2 > RAMEND:
+            raise AVRError("RET with an empty stack.")
+        self.pc = self.data[self.sp + 1] << 8 | self.data[self.sp + 2]
+        self.sp += 2
+        return 4
+
+    def _branch(self, taken: int, target: int) -> int:
+        if taken:
+            self.pc = target
+            return 2
+        return 1
+
+    def _breq(self, target: int) -> int:
+        return self._branch(self.z, target)
+
+    def _brne(self, target: int) -> int:
+        return self._branch(not self.z, target)
+
+    def _brcs(self, target: int) -> int:
+        return self._branch(self.c, target)
+
+    def _brcc(self, target: int) -> int:
+        return self._branch(not self.c, target)
+
+    _brlo, _brsh = _brcs, _brcc
+
+    def _brmi(self, target: int) -> int:
+        return self._branch(self.n, target)
+
+    def _brpl(self, target: int) -> int:
+        return self._branch(not self.n, target)
+
+    def _brlt(self, target: int) -> int:
+        return self._branch(self.s, target)
+
+    def _brge(self, target: int) -> int:
+        return self._branch(not self.s, target)
+
+    def _brvs(self, target: int) -> int:
+        return self._branch(self.v, target)
+
+    def _brvc(self, target: int) -> int:
+        return self._branch(not self.v, target)
+
+    def _skip_if(self, condition: bool) -> int:
+        if not condition:
+            return 1
+        following = self.code[self.pc]
+        words = following[2] if following else 1
+        self.pc += words
+        return 1 + words
+
+    def _sbrs(self, r: int, bit: int) -> int:
+        return self._skip_if(self.data[r] >> bit & 1)
+
+    def _sbrc(self, r: int, bit: int) -> int:
+        return self._skip_if(not self.data[r] >> bit & 1)
+
+
+def simulate(asm: str, usart_timing: bool = False, max_cycles: int = MAX_CYCLES,
+             name: str = "<asm>", directory: Path | None = None) -> Simulation:
+    """Monta e executa um `.asm` completo; devolve a saída serial e os ciclos gastos."""
+    cpu = AVR(assemble(asm, name, directory), usart_timing)
+    output = cpu.run(max_cycles)
+    return Simulation(output, cpu.cycles, cpu.instructions)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from pipeline.api import compile_file
+
+    cli_parser = argparse.ArgumentParser(description="Executa um programa no simulador do ATmega328P.")
+    cli_parser.add_argument("source_file", type=Path, help="Programa RPN ou um .asm já gerado.")
+    cli_parser.add_argument("--precompute", action="store_true",
+                            help="Compila o programa RPN com --precompute.")
+    cli_parser.add_argument("--usart-timing", action="store_true",
+                            help="Espera o transmissor como na placa (a 2400 baud, a maior parte dos ciclos).")
+    cli_parser.add_argument("--cycles", action="store_true",
+                            help="Mostra os ciclos e as instruções executadas em stderr.")
+    args = cli_parser.parse_args(argv)
+
+    if args.source_file.suffix.lower() == ".asm":
+        asm = args.source_file.read_text(encoding="utf8")
+    else:
+        result = compile_file(str(args.source_file), precompute=args.precompute)
+        if not result.ok:
+            print(*result.diagnostics, file=sys.stderr)
+            return 1
+        asm = result.asm
+    try:
+        simulation = simulate(asm, args.usart_timing, name=args.source_file.name,
+                              directory=args.source_file.resolve().parent)
+    except (AssemblerError, AVRError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    sys.stdout.write(simulation.output.decode("latin-1").replace("\r\n", "\n"))
+    if args.cycles:
+        print(f"{simulation.cycles} cycles, {simulation.instructions} instructions", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,493 @@
+"""
+Avaliação em lote: roda milhares de programas de uma vez, em vetores
+`numpy.float16`, para calcular as saídas esperadas de um corpus inteiro.
+
+Cada programa é rebaixado para uma sequência linear de instruções de
+registrador (uma por nó, mais os saltos de `IF/THEN/ELSE` e `FOR`, como no
+assembly gerado), e todos andam juntos, uma instrução por passo: cada
+programa é uma raia com o seu próprio contador de programa, e cada passo
+executa de uma vez, com máscaras, todas as raias que estão no mesmo tipo
+de instrução. O contador r20 dos `FOR` é um registrador por raia, então as
+contagens de volta são independentes. Um `FOR` no corpo de outro zera o
+contador, e o de fora recomeçaria de 255: a raia é abandonada ali, com as
+linhas que faltam marcadas.
+
+A aritmética é a IEEE do numpy (arredondamento para o mais próximo), e
+não a das rotinas AVR. Cada operação verifica se as duas dão o mesmo
+resultado (operandos e resultado normais ou zero, nenhum bit perdido no
+alinhamento, no produto ou no quociente); quando não há garantia, a raia é
+marcada a partir daquela linha (`BatchResult.flagged`), e os valores
+marcados devem ser conferidos com o interpretador
+(`simulator/interpreter.py`).
+
+Uso:
+    python -m simulator.batch samples/*/*_tests.txt [--verify]
+"""
+from __future__ import annotations
+import argparse
+import sys
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from time import perf_counter
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from generator import f16
+from lexer.compiled import CompiledLexer
+from lexer.token_stream import TokenStream
+from parser.arena import ASTArena, Op
+from parser.parser import LL1Parser
+from semantics.analyzer import SemanticAnalyzer
+from simulator.interpreter import SRAM_START, InterpreterError, interpret, results_address
+
+F16_MIN_NORMAL = 2.0 ** -14
+# Passos (instruções por raia) antes de desistir das raias que não terminaram;
+# um FOR de 255 voltas com corpo de 100 instruções já gasta 25 mil.
+MAX_STEPS = 100_000
+
+
+class BatchOp(IntEnum):
+    HALT = 0
+    ADD = 1       # regs[a] = regs[b] <op> regs[c]
+    SUB = 2
+    MUL = 3
+    REAL_DIV = 4
+    INT_DIV = 5
+    MOD = 6
+    POW = 7
+    MOV = 8       # regs[a] = regs[b]
+    MEM_WRITE = 9   # mem = regs[a] = regs[b]
+    MEM_READ = 10   # regs[a] = mem
+    RES = 11      # regs[a] = results[b]
+    SET_COUNT = 12  # r20 = for_count(regs[b])
+    LOOP = 13     # se r20 == 0, salta para c
+    NEXT = 14     # r20 -= 1 e salta para c
+    JUMP_ZERO = 15  # se regs[b] é ±0, salta para c
+    JUMP = 16     # salta para c
+    STORE = 17    # results[a] = regs[b] (linha a)
+
+
+AST_OPS = {int(Op.ADD): int(BatchOp.ADD), int(Op.SUB): int(BatchOp.SUB), int(Op.MUL): int(BatchOp.MUL),
+           int(Op.REAL_DIV): int(BatchOp.REAL_DIV), int(Op.INT_DIV): int(BatchOp.INT_DIV),
+           int(Op.MOD): int(BatchOp.MOD), int(Op.POW): int(BatchOp.POW)}
+
+
+BRANCH_OPS = frozenset(map(int, (Op.IF, Op.THEN, Op.ELSE, Op.FOR)))
+
+
+class LoweringError(Exception):
+    """O programa não tem um resultado definido na placa (o interpretador levantaria `InterpreterError`)."""
+
+
+# --- Aritmética em float16, com a marca de onde ela pode diferir da AVR ---
+
+# Tabelas indexadas pelos 16 bits de cada valor.
+_ALL_BITS = np.arange(0x10000, dtype=np.uint32)
+# Valores finitos normais ou zero: os únicos que as rotinas AVR tratam como o IEEE.
+NORMAL = (((_ALL_BITS >> 10) & 0x1F) != 0x1F) & ((((_ALL_BITS >> 10) & 0x1F) != 0) | ((_ALL_BITS & 0x7FFF) == 0))
+# Unidade na última casa de cada valor; zero e subnormais contam como
+# expoente 1, como em `f16._unpack`.
+ULP = np.ldexp(1.0, np.maximum((_ALL_BITS >> 10) & 0x1F, 1).astype(np.int32) - 25)
+
+
+def _normal(x: np.ndarray) -> np.ndarray:
+    return NORMAL[x.view(np.uint16)]
+
+
+def batch_add(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    result = a + b
+    # `add_f16` trunca a mantissa do menor expoente no alinhamento, sem
+    # bits de guarda: só é exato quando nenhum bit sai.
+    ulp_a = ULP[a.view(np.uint16)]
+    ulp = np.maximum(ulp_a, ULP[b.view(np.uint16)])
+    a64, b64 = a.astype(np.float64), b.astype(np.float64)
+    exact = ((np.fmod(a64, ulp) == 0) & (np.fmod(b64, ulp) == 0)
+             & (result.astype(np.float64) == a64 + b64))
+    # Com B = ±0 a mantissa de B vale 1 (veja `f16.add_f16`): ela só some
+    # no alinhamento quando o expoente de A passa de 1.
+    exact &= (b != 0) | (ulp_a > ULP[0])
+    return result, exact & _normal(a) & _normal(b) & _normal(result)
+
+
+def batch_sub(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return batch_add(a, -b)
+
+
+def batch_mul(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    result = a * b
+    exact = result.astype(np.float64) == a.astype(np.float64) * b.astype(np.float64)
+    return result, exact & _normal(a) & _normal(b) & _normal(result)
+
+
+def batch_real_div(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    result = a / b
+    # Quociente exato (q * b == a) e sem os 3 bits baixos da mantissa, que
+    # `div_f16` monta sobrepostos.
+    exact = ((result.astype(np.float64) * b.astype(np.float64) == a.astype(np.float64))
+             & ((result.view(np.uint16) & 0x7) == 0))
+    return result, exact & (b != 0) & _normal(a) & _normal(b) & _normal(result)
+
+
+def batch_int_div(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    quotient, exact = batch_real_div(a, b)
+    result = np.trunc(quotient)
+    # Abaixo de 64 os bits que `div_f16` erra são descartados pelo truncamento,
+    # e o quociente truncado da AVR dá a parte inteira exata (desde que ele
+    # seja normal: abaixo disso o expoente de 8 bits dá a volta).
+    true_quotient = np.abs(a.astype(np.float64) / b.astype(np.float64))
+    small = (((true_quotient < 64) & (true_quotient >= 2 * F16_MIN_NORMAL)) | (a == 0))
+    small &= ((result.astype(np.float64) == np.trunc(a.astype(np.float64) / b.astype(np.float64)))
+              & (b != 0) & _normal(a) & _normal(b))
+    return result, exact | small
+
+
+def batch_mod(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # `mod_f16`: a - b * trunc(a / b), passo a passo como a rotina.
+    quotient, exact_quotient = batch_int_div(a, b)
+    product, exact_product = batch_mul(b, quotient)
+    result, exact_result = batch_sub(a, product)
+    return result, exact_quotient & exact_product & exact_result
+
+
+def batch_to_uint16(x: np.ndarray) -> np.ndarray:
+    """`f16_to_uint16` em cada valor: inteiro sem sinal de 16 bits, ignorando o sinal."""
+    bits = x.view(np.uint16).astype(np.int64)
+    exp = (bits >> 10) & 0x1F
+    mant = (bits & 0x3FF) | 0x400
+    shift = exp - 25
+    return np.where(shift < 0, mant >> np.clip(-shift, 0, 63), (mant << np.clip(shift, 0, 63)) & 0xFFFF)
+
+
+def batch_pow(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    n = batch_to_uint16(b)
+    result = np.ones_like(a)
+    power = a.copy()
+    # Só os quadrados que entram no resultado precisam ser exatos.
+    exact = np.ones(a.shape, dtype=np.bool_)
+    exact_power = _normal(a)
+    remaining = n.copy()
+    while remaining.any():
+        use = (remaining & 1).astype(np.bool_)
+        product, exact_product = batch_mul(result, power)
+        result = np.where(use, product, result)
+        exact &= ~use | (exact_power & exact_product)
+        power, exact_square = batch_mul(power, power)
+        exact_power &= exact_square
+        remaining >>= 1
+    # `n == 1` devolve a base sem multiplicar; a partir de 256 `pow_f16`
+    # desloca o expoente com os bytes trocados.
+    result = np.where(n == 1, a, result)
+    return result, np.where(n == 1, True, exact & (n < 256))
+
+
+BATCH_OPS = {int(BatchOp.ADD): batch_add, int(BatchOp.SUB): batch_sub, int(BatchOp.MUL): batch_mul,
+             int(BatchOp.REAL_DIV): batch_real_div, int(BatchOp.INT_DIV): batch_int_div,
+             int(BatchOp.MOD): batch_mod, int(BatchOp.POW): batch_pow}
+
+
+# --- Rebaixamento da AST para instruções ---
+
+def lower(arena: ASTArena, results_address: int = SRAM_START
+          ) -> tuple[list[tuple[int, int, int, int]], dict[int, int]]:
+    """
+    Instruções `(op, a, b, c)` de um `<program>` anotado e os literais
+    (bits f16 por nó); cada nó guarda o seu valor no registrador de mesmo
+    ID, e os dos literais são carregados antes de começar, já que nunca
+    mudam (um laço não refaz o trabalho). Como os IDs estão em pós-ordem,
+    uma varredura linear emite cada nó depois dos seus filhos, e os saltos
+    são emitidos ao fim do filho que os precede (a condição do `IF`, o
+    ramo do `THEN`, a contagem do `FOR`) e corrigidos quando o destino fica
+    conhecido.
+    """
+    code: list[tuple[int, int, int, int]] = []
+    constants: dict[int, int] = {}
+    if not arena or arena.ops[arena.root] != Op.PROGRAM:
+        return [(BatchOp.HALT, 0, 0, 0)], constants
+
+    ops, child_ids, child_start = arena.ops, arena.child_ids, arena.child_start
+    lines = arena.children(arena.root)
+    num_lines = len(lines)
+    # Pai do primeiro filho de cada IF, THEN, ELSE e FOR.
+    parent = {}
+    for n in range(len(ops)):
+        if ops[n] in BRANCH_OPS:
+            parent[child_ids[child_start[n]]] = n
+    # Saltos a corrigir, pelo nó que vai conhecer o destino.
+    jump_else: dict[int, int] = {}
+    jump_end: dict[int, int] = {}
+    loops: dict[int, int] = {}
+
+    def patch(pc: int) -> None:
+        op, a, b, _ = code[pc]
+        code[pc] = (op, a, b, len(code))
+
+    line_index = 0
+    node = lines[0] if lines else arena.root
+    while arena.child_count[node]:
+        node = child_ids[child_start[node]]
+    # Opcodes como int: comparar com membros do IntEnum é bem mais lento.
+    NUMBER, MEM, RES, IF, THEN, ELSE, FOR = map(int, (Op.NUMBER, Op.MEM, Op.RES, Op.IF, Op.THEN, Op.ELSE, Op.FOR))
+    for n in range(node, arena.root):
+        op = ops[n]
+        if op == NUMBER:
+            try:
+                constants[n] = f16.to_bits(float(arena.label(n)))
+            except OverflowError:
+                raise LoweringError(f"Literal {arena.label(n)} is out of range for 16-bit float.") from None
+        elif op in AST_OPS:
+            start = child_start[n]
+            code.append((AST_OPS[op], n, child_ids[start], child_ids[start + 1]))
+        elif op == MEM:
+            if arena.child_count[n]:
+                code.append((BatchOp.MEM_WRITE, n, child_ids[child_start[n]], 0))
+            else:
+                code.append((BatchOp.MEM_READ, n, 0, 0))
+        elif op == RES:
+            # O endereço lido por `res_op` é conhecido na compilação (veja
+            # `Interpreter._res`).
+            target = line_index - int(arena.label(child_ids[child_start[n]]))
+            low = ((results_address & 0xFF) + ((target << 1) & 0xFF)) & 0xFF
+            address = (results_address & 0xFF00) | low
+            index, odd = divmod(address - results_address, 2)
+            if odd or not 0 <= index < num_lines:
+                raise LoweringError(f"Line {line_index + 1}: RES reads 0x{address:04X}, outside the results array.")
+            code.append((BatchOp.RES, n, index, 0))
+        elif op == IF:
+            # Fim da condição: salta para o ramo do ELSE se ela é ±0.
+            jump_else[parent[parent[n]]] = len(code)
+            code.append((BatchOp.JUMP_ZERO, 0, child_ids[child_start[n]], 0))
+        elif op == THEN:
+            else_node = parent[n]
+            code.append((BatchOp.MOV, else_node, child_ids[child_start[n] + 1], 0))
+            jump_end[else_node] = len(code)
+            code.append((BatchOp.JUMP, 0, 0, 0))
+            patch(jump_else.pop(else_node))
+        elif op == ELSE:
+            code.append((BatchOp.MOV, n, child_ids[child_start[n] + 1], 0))
+            patch(jump_end.pop(n))
+        elif op == FOR:
+            code.append((BatchOp.MOV, n, child_ids[child_start[n] + 1], 0))
+            loop = loops.pop(n)
+            code.append((BatchOp.NEXT, 0, 0, loop))
+            patch(loop)
+        elif op == Op.PROGRAM or op == Op.UNKNOWN:
+            raise NotImplementedError(f"Lowering of node '{arena.label(n)}' is not implemented.")
+
+        owner = parent.get(n)
+        if owner is not None and ops[owner] == FOR:
+            # Fim da contagem: r20 recebe as voltas e o laço começa.
+            code.append((BatchOp.SET_COUNT, 0, n, 0))
+            loops[owner] = len(code)
+            code.append((BatchOp.LOOP, 0, 0, 0))
+        if line_index < num_lines and n == lines[line_index]:
+            code.append((BatchOp.STORE, line_index, n, 0))
+            line_index += 1
+
+    code.append((BatchOp.HALT, 0, 0, 0))
+    return code, constants
+
+
+# --- Execução em lote ---
+
+@dataclass(slots=True)
+class BatchResult:
+    """
+    `results[p, i]` é o valor impresso pela linha `i` do programa `p` (NaN
+    depois da última linha do programa, ou onde ele não terminou).
+    `flagged[p, i]` marca as linhas em que a aritmética do numpy pode ter
+    se afastado da AVR: as que usam, direta ou indiretamente (por `RES`,
+    `MEM` ou por um `IF`/`FOR` que decidiu o caminho), o resultado de uma
+    operação sem garantia, e as de um programa que não terminou ou que lê
+    fora de `results`.
+    """
+    results: np.ndarray
+    flagged: np.ndarray
+    line_counts: np.ndarray
+
+    @property
+    def bits(self) -> np.ndarray:
+        """Os resultados como inteiros de 16 bits, como `print_f16` os imprime."""
+        return self.results.view(np.uint16)
+
+    def program(self, p: int) -> tuple[list[int], list[bool]]:
+        """Valores e marcas das linhas do programa `p`."""
+        n = self.line_counts[p]
+        return self.bits[p, :n].tolist(), self.flagged[p, :n].tolist()
+
+
+def evaluate_batch(arenas: Sequence[ASTArena], precompute: bool = False,
+                   max_steps: int = MAX_STEPS) -> BatchResult:
+    """
+    Avalia programas já anotados, todos juntos. `precompute` escolhe a
+    disposição de `results` usada por `RES` (veja `results_address`).
+    """
+    lane_count = len(arenas)
+    line_counts = np.array([arena.child_count[arena.root] if arena and arena.ops[arena.root] == Op.PROGRAM else 0
+                            for arena in arenas], dtype=np.int64)
+    width = max(int(line_counts.max(initial=0)), 1)
+    results = np.full((lane_count, width), np.nan, dtype=np.float16)
+    flagged = np.zeros((lane_count, width), dtype=np.bool_)
+
+    programs = []
+    for p, arena in enumerate(arenas):
+        # O endereço de `results` só muda o que um RES lê.
+        address = results_address(arena, precompute) if arena and Op.RES in arena.ops else SRAM_START
+        try:
+            programs.append(lower(arena, address))
+        except LoweringError:
+            flagged[p, :line_counts[p]] = True
+            programs.append(([(BatchOp.HALT, 0, 0, 0)], {}))
+
+    length = max(len(program) for program, _ in programs) if programs else 1
+    code = np.zeros((lane_count, length, 4), dtype=np.int64)
+    register_count = max((len(arena) for arena in arenas), default=1)
+    register_bits = np.zeros((lane_count, register_count), dtype=np.uint16)
+    # Registradores dos FOR: os únicos lidos sem serem escritos antes (um
+    # FOR que roda zero vezes devolve o resultado de uma execução anterior).
+    loop_registers = np.zeros((lane_count, register_count), dtype=np.bool_)
+    for p, (program, constants) in enumerate(programs):
+        code[p, :len(program)] = program
+        if constants:
+            register_bits[p, list(constants)] = list(constants.values())
+        if arenas[p]:
+            loop_registers[p, :len(arenas[p])] = np.asarray(arenas[p].ops) == Op.FOR
+    registers = register_bits.view(np.float16)
+    # SRAM zerada: `results` e `storeVal` começam em 0.
+    memory = np.zeros(lane_count, dtype=np.float16)
+    board_results = np.zeros((lane_count, width), dtype=np.float16)
+    counter = np.zeros(lane_count, dtype=np.int64)
+    # Valores que podem ter se afastado da AVR, e raias cujo caminho na
+    # linha corrente dependeu de um deles (tudo o que elas escrevem até o
+    # fim da linha fica marcado).
+    tainted = np.zeros(registers.shape, dtype=np.bool_)
+    memory_tainted = np.zeros(lane_count, dtype=np.bool_)
+    results_tainted = np.zeros((lane_count, width), dtype=np.bool_)
+    control_tainted = np.zeros(lane_count, dtype=np.bool_)
+
+    def taint_control(sel: np.ndarray) -> None:
+        # O outro caminho poderia ter escrito em MEM ou no resultado de um
+        # FOR (lido de novo se o mesmo FOR rodar zero vezes): os dois ficam marcados.
+        control_tainted[sel] = True
+        memory_tainted[sel] = True
+        tainted[sel] |= loop_registers[sel]
+    pc = np.zeros(lane_count, dtype=np.int64)
+    # Raias que não terminaram: as linhas que faltam ficam em NaN e marcadas.
+    abandoned = np.zeros(lane_count, dtype=np.bool_)
+
+    lanes = np.arange(lane_count)
+    # Opcodes como int: comparar com membros do IntEnum é bem mais lento.
+    (HALT, _, _, _, _, _, _, _, MOV, MEM_WRITE, MEM_READ, RES,
+     SET_COUNT, LOOP, NEXT, JUMP_ZERO, JUMP, STORE) = map(int, BatchOp)
+    with np.errstate(all="ignore"):
+        for _ in range(max_steps):
+            instructions = code[lanes, pc[lanes]]
+            ops = instructions[:, 0]
+            running = (ops != HALT) & ~abandoned[lanes]
+            lanes, instructions, ops = lanes[running], instructions[running], ops[running]
+            if not len(lanes):
+                break
+            pc[lanes] += 1
+            for op in np.unique(ops).tolist():
+                selected = ops == op
+                sel, (a, b, c) = lanes[selected], instructions[selected, 1:].T
+                control = control_tainted[sel]
+                if op in BATCH_OPS:
+                    value, exact = BATCH_OPS[op](registers[sel, b], registers[sel, c])
+                    registers[sel, a] = value
+                    tainted[sel, a] = tainted[sel, b] | tainted[sel, c] | ~exact | control
+                elif op == MOV:
+                    registers[sel, a] = registers[sel, b]
+                    tainted[sel, a] = tainted[sel, b] | control
+                elif op == MEM_WRITE:
+                    memory[sel] = registers[sel, a] = registers[sel, b]
+                    memory_tainted[sel] = tainted[sel, a] = tainted[sel, b] | control
+                elif op == MEM_READ:
+                    registers[sel, a] = memory[sel]
+                    tainted[sel, a] = memory_tainted[sel] | control
+                elif op == RES:
+                    registers[sel, a] = board_results[sel, b]
+                    tainted[sel, a] = results_tainted[sel, b] | control
+                elif op == SET_COUNT:
+                    counter[sel] = batch_to_uint16(registers[sel, b]) & 0xFF
+                    taint_control(sel[tainted[sel, b]])
+                elif op == LOOP:
+                    done = counter[sel] == 0
+                    pc[sel[done]] = c[done]
+                elif op == NEXT:
+                    # r20 = 0 no fim do corpo: um FOR de dentro zerou o
+                    # contador e o laço recomeçaria de 255 (na placa, quase
+                    # sempre para sempre). A raia sai logo, em vez de prender
+                    # todas as outras até `max_steps`.
+                    abandoned[sel[counter[sel] == 0]] = True
+                    counter[sel] = (counter[sel] - 1) & 0xFF
+                    pc[sel] = c
+                elif op == JUMP_ZERO:
+                    zero = registers[sel, b] == 0
+                    pc[sel[zero]] = c[zero]
+                    taint_control(sel[tainted[sel, b]])
+                elif op == JUMP:
+                    pc[sel] = c
+                elif op == STORE:
+                    board_results[sel, a] = results[sel, a] = registers[sel, b]
+                    results_tainted[sel, a] = flagged[sel, a] = tainted[sel, b] | control
+                    control_tainted[sel] = False
+        else:
+            instructions = code[lanes, pc[lanes]]
+            abandoned[lanes[instructions[:, 0] != HALT]] = True
+
+    for p in np.flatnonzero(abandoned).tolist():
+        done = int(np.count_nonzero(code[p, :pc[p], 0] == STORE))
+        flagged[p, done:line_counts[p]] = True
+        results[p, done:] = np.nan
+
+    return BatchResult(results, flagged, line_counts)
+
+
+def evaluate_sources(sources: Iterable[str], precompute: bool = False, max_steps: int = MAX_STEPS) -> BatchResult:
+    """Compila (até a AST anotada) e avalia cada texto fonte; erros de compilação são propagados."""
+    arenas = []
+    for source in sources:
+        arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(source)))
+        SemanticAnalyzer().annotate(arena)
+        arenas.append(arena)
+    return evaluate_batch(arenas, precompute, max_steps)
+
+
+def main(argv: list[str] | None = None) -> int:
+    cli_parser = argparse.ArgumentParser(description="Avalia vários programas RPN de uma vez, com numpy.")
+    cli_parser.add_argument("source_files", nargs="+", type=Path)
+    cli_parser.add_argument("--precompute", action="store_true",
+                            help="Usa a disposição da memória do modo --precompute.")
+    cli_parser.add_argument("--verify", action="store_true",
+                            help="Confere as linhas não marcadas com o interpretador de referência.")
+    args = cli_parser.parse_args(argv)
+
+    sources = [path.read_text(encoding="utf8") for path in args.source_files]
+    start = perf_counter()
+    batch = evaluate_sources(sources, args.precompute)
+    elapsed = perf_counter() - start
+
+    status = 0
+    for p, path in enumerate(args.source_files):
+        values, flags = batch.program(p)
+        report = f"{path}: {len(values)} line(s), {sum(flags)} flagged"
+        if args.verify:
+            arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(sources[p])))
+            SemanticAnalyzer().annotate(arena)
+            try:
+                reference = interpret(arena, args.precompute)
+            except InterpreterError:
+                reference = [None] * len(values)
+            mismatches = [i + 1 for i, (value, flag, ref) in enumerate(zip(values, flags, reference))
+                          if not flag and value != ref]
+            report += f", {len(mismatches)} unflagged mismatch(es)" + (f" at {mismatches}" if mismatches else "")
+            status |= bool(mismatches)
+        print(report)
+    print(f"{len(sources)} program(s) in {elapsed:.3f}s")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
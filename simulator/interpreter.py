@@ -0,0 +1,193 @@
+"""
+Interpretador de referência: executa a AST anotada no computador e devolve
+o que a placa imprimiria, sem montar nem gravar nada. A aritmética é a de
+`generator/f16.py`, bit a bit igual às rotinas AVR, e o estado da placa
+que muda o resultado também é reproduzido:
+
+- `results` e `RES`: o índice é dobrado em 8 bits por `res_op` e somado ao
+  byte baixo do endereço sem vai-um, então o endereço de `results` importa
+  (ele depende de quantas temporárias vêm antes dele no `.dseg`);
+- `MEM`: um único valor (`storeVal`);
+- r20, o contador de todos os `FOR`: um `FOR` no corpo de outro termina
+  com r20 = 0, e o de fora recomeça de 255;
+- a SRAM começa zerada: `MEM` lido antes de ser escrito e o resultado de um
+  `FOR` que nunca executou valem 0 (a não ser que o mesmo `FOR` já tenha
+  rodado antes, em outra volta de um laço).
+
+Uso:
+    python -m simulator.interpreter programa.txt [--expected esperado.txt]
+"""
+from __future__ import annotations
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from generator import f16
+from generator.generator import line_temps
+from parser.arena import ASTArena, Op
+from parser.traversal import trampoline
+from simulator.assembler import SRAM_START
+
+BINARY_OPS = {Op.ADD: "+", Op.SUB: "-", Op.MUL: "*", Op.REAL_DIV: "|",
+              Op.INT_DIV: "/", Op.MOD: "%", Op.POW: "^"}
+# Voltas de FOR (somadas em todo o programa) antes de desistir: um FOR no
+# corpo de outro pode não terminar nunca na placa.
+MAX_ITERATIONS = 10_000_000
+
+
+class InterpreterError(Exception):
+    """O programa não tem um resultado definido (ou não termina) na placa."""
+
+
+def results_address(arena: ASTArena, precompute: bool = False) -> int:
+    """
+    Endereço de `results` no programa gerado para `arena`: logo depois das
+    temporárias no modo padrão, ou no início da SRAM com `--precompute`.
+    """
+    if precompute or not arena or arena.ops[arena.root] != Op.PROGRAM:
+        return SRAM_START
+    # Dois bytes por temporária (`T<n>_L` e `T<n>_H`).
+    return SRAM_START + 2 * sum(line_temps(arena, line) for line in arena.children(arena.root))
+
+
+class Interpreter:
+    """Estado da placa ao longo de um programa: `results`, `storeVal`, r20 e os resultados de FOR."""
+
+    def __init__(self, results_address: int = SRAM_START, max_iterations: int = MAX_ITERATIONS):
+        self.results_address = results_address
+        self.iterations_left = max_iterations
+        self.results: list[int] = []
+        self.mem = 0
+        self.r20 = 0
+        self.for_results: dict[int, int] = {}
+        self.arena: ASTArena | None = None
+
+    def run(self, arena: ASTArena) -> list[int]:
+        """Executa todas as linhas de um `<program>` anotado e devolve os valores impressos, em ordem."""
+        if not arena or arena.ops[arena.root] != Op.PROGRAM:
+            return []
+        self.arena = arena
+        lines = arena.children(arena.root)
+        self.results = [0] * len(lines)
+        for line_index, line in enumerate(lines):
+            self.results[line_index] = trampoline((line, line_index), self._visit)
+        return list(self.results)
+
+    def _visit(self, request: tuple[int, int]):
+        node, line_index = request
+        arena = self.arena
+        op = arena.ops[node]
+        if op == Op.NUMBER:
+            try:
+                return f16.to_bits(float(arena.label(node)))
+            except OverflowError:
+                raise InterpreterError(f"Literal {arena.label(node)} is out of range for 16-bit float.") from None
+        elif op in BINARY_OPS:
+            return self._binary_op(node, line_index)
+        elif op == Op.ELSE:
+            return self._if_then_else(node, line_index)
+        elif op == Op.FOR:
+            return self._for(node, line_index)
+        elif op == Op.RES:
+            return self._res(node, line_index)
+        elif op == Op.MEM:
+            return self._mem(node, line_index)
+
+        raise NotImplementedError(f"Interpretation of node '{arena.label(node)}' is not implemented.")
+
+    def _binary_op(self, node: int, line_index: int):
+        left = (yield self.arena.child(node, 0), line_index)
+        right = (yield self.arena.child(node, 1), line_index)
+        return f16.BINARY_OPS[BINARY_OPS[self.arena.ops[node]]](left, right)
+
+    def _if_then_else(self, node: int, line_index: int):
+        arena = self.arena
+        then_node, else_branch = arena.children(node)
+        if_node, then_branch = arena.children(then_node)
+        condition = (yield arena.child(if_node, 0), line_index)
+        if not f16.is_zero(condition):
+            return (yield then_branch, line_index)
+        return (yield else_branch, line_index)
+
+    def _for(self, node: int, line_index: int):
+        iterations_node, body_node = self.arena.children(node)
+        count = (yield iterations_node, line_index)
+        self.r20 = f16.for_count(count)
+        while self.r20:
+            self.iterations_left -= 1
+            if self.iterations_left < 0:
+                raise InterpreterError(
+                    f"Line {line_index + 1}: FOR loop does not terminate (a nested FOR resets the r20 counter).")
+            self.for_results[node] = (yield body_node, line_index)
+            self.r20 = (self.r20 - 1) & 0xFF
+        return self.for_results.get(node, 0)
+
+    def _res(self, node: int, line_index: int) -> int:
+        target = line_index - int(self.arena.label(self.arena.child(node, 0)))
+        # `lsl r24` em 8 bits e `add r30, r24` sem propagar o vai-um para r31.
+        low = ((self.results_address & 0xFF) + ((target << 1) & 0xFF)) & 0xFF
+        address = (self.results_address & 0xFF00) | low
+        index, odd = divmod(address - self.results_address, 2)
+        if odd or not 0 <= index < len(self.results):
+            raise InterpreterError(
+                f"Line {line_index + 1}: RES reads 0x{address:04X}, outside the results array.")
+        return self.results[index]
+
+    def _mem(self, node: int, line_index: int):
+        if self.arena.child_count[node]:
+            self.mem = (yield self.arena.child(node, 0), line_index)
+        return self.mem
+
+
+def interpret(arena: ASTArena, precompute: bool = False) -> list[int]:
+    """Valores que o programa gerado para `arena` imprime, na ordem."""
+    return Interpreter(results_address(arena, precompute)).run(arena)
+
+
+def format_output(values: list[int]) -> str:
+    """O texto de `print_f16`, uma linha `0xHHHH` por valor (sem o CR)."""
+    return "".join(f"0x{value:04X}\n" for value in values)
+
+
+def read_expected(text: str) -> list[str]:
+    """Valores `0xHHHH` de um `*_expected.txt`, só os valores ou com a expressão ao lado (`=> 50 (0x5240)`)."""
+    return [f"0x{digits.upper()}" for digits in re.findall(r"0x([0-9A-Fa-f]{4})", text)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    from pipeline.api import compile_file
+
+    cli_parser = argparse.ArgumentParser(description="Executa um programa RPN no computador, como a placa.")
+    cli_parser.add_argument("source_file")
+    cli_parser.add_argument("--precompute", action="store_true",
+                            help="Usa a disposição da memória do modo --precompute.")
+    cli_parser.add_argument("--expected", type=Path, metavar="FILE",
+                            help="Compara a saída com um arquivo *_expected.txt e lista as diferenças.")
+    args = cli_parser.parse_args(argv)
+
+    result = compile_file(args.source_file, stages=("annotated-ast",))
+    if not result.ok:
+        print(*result.diagnostics, file=sys.stderr)
+        return 1
+    try:
+        output = format_output(interpret(result.arena, args.precompute))
+    except InterpreterError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.expected is None:
+        sys.stdout.write(output)
+        return 0
+    expected = read_expected(args.expected.read_text(encoding="utf8"))
+    actual = output.split()
+    mismatches = [(i, e, a) for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+    for i, e, a in mismatches:
+        print(f"line {i + 1}: expected {e}, got {a}")
+    if len(expected) != len(actual):
+        print(f"expected {len(expected)} line(s), got {len(actual)}")
+    return 1 if mismatches or len(expected) != len(actual) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
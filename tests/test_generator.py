@@ -0,0 +1,113 @@
+import pytest
+
+from generator import f16
+from generator.folding import fold_constants
+from generator.generator import CodeGenerator, line_temps
+from generator.table import evaluate_lines
+from pipeline.api import compile_source
+from lexer.compiled import CompiledLexer
+from lexer.token_stream import TokenStream
+from parser.parser import LL1Parser
+from semantics.analyzer import SemanticAnalyzer
+
+
+def annotated(src: str):
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+    SemanticAnalyzer().annotate(arena)
+    return arena
+
+
+def fold_lines(src: str) -> list[float | None]:
+    """Valor dobrado da raiz de cada linha (None se a linha não foi dobrada)."""
+    arena = annotated(src)
+    fold_constants(arena)
+    return [arena.consts.get(line) for line in arena.children(arena.root)]
+
+
+# --- Aritmética f16 das rotinas AVR ---
+
+@pytest.mark.parametrize("op, a, b, expected", [
+    ("+", 2048.0, 3.0, 0x6801),             # trunca em vez de arredondar
+    ("+", 1.0, -1.0, 0x0000),
+    ("+", 2.0 ** -14, 0.0, 0x0401),         # B = ±0 entra com mantissa 1
+    ("-", 0.0, 0.0, 0x8000),
+    ("*", 2.0 ** -10, 2.0 ** -10, 0x7C00),  # o expoente negativo dá a volta
+    ("*", -0.0, 5.0, 0x8000),
+    ("|", 1.0, 3.0, 0x3554),
+    ("|", -3.0, 0.0, 0xFC00),
+    ("|", 1.0, -0.0, 0xF800),               # -0 é dividido como 2^-15
+    ("/", -7.0, 2.0, 0xC200),
+    ("%", 5.0, 0.0, 0x7E00),
+    ("^", 2.0, 3.0, 0x4800),
+    ("^", 2.0, 256.0, 0x3C00),              # bytes trocados no deslocamento
+])
+def test_f16_ops_match_avr_routines(op, a, b, expected):
+    assert f16.BINARY_OPS[op](f16.to_bits(a), f16.to_bits(b)) == expected
+
+
+def test_for_count_uses_low_byte():
+    assert f16.for_count(f16.to_bits(3.0)) == 3
+    assert f16.for_count(f16.to_bits(-3.0)) == 3
+    assert f16.for_count(f16.to_bits(256.0)) == 0
+
+
+# --- Dobra de constantes ---
+
+def test_folds_literal_only_lines():
+    src = "(2 3 +)\n((7 2 /) 2 ^)\n(((0 IF) 2 THEN) 3 ELSE)\n(((1 IF) 2 THEN) 3 ELSE)\n(2 (3 4 +) FOR)\n"
+    assert fold_lines(src) == [5.0, 9.0, 3.0, 2.0, 7.0]
+
+
+def test_does_not_fold_memory_results_or_unsafe_loops():
+    src = ("((1 MEM) 2 +)\n((1 RES) 1 +)\n"
+           "(0 (1 2 +) FOR)\n(256 (1 2 +) FOR)\n(2 (3 (4 5 +) FOR) FOR)\n")
+    assert fold_lines(src) == [None] * 5
+
+
+def test_folded_line_costs_only_its_result_store():
+    asm = compile_source("(2 3 +)\n((1 MEM) 2 +)").asm
+    line_1 = asm[asm.index("; --- Line 1 ---"):asm.index("; --- Line 2 ---")]
+    line_2 = asm[asm.index("; --- Line 2 ---"):asm.index("\nend:")]
+
+    assert "RCALL add_f16" not in line_1 and "LDI r25, 69" in line_1  # 5.0 = 0x4500
+    assert "RCALL add_f16" in line_2
+    # Só a linha 2 usa temporárias (a leitura de MEM e a soma).
+    assert asm.count(": .byte 1") == 4
+
+
+def test_line_temps_match_the_generator_without_touching_the_arena():
+    src = ("(2 3 +)\n((1 MEM) 2 +)\n((((1 RES) IF) (2 MEM) THEN) (3 4 *) ELSE)\n"
+           "(2 (3 (1 RES) +) FOR)\n(60000 60000 +)\n((1 2 +) (2 RES) *)\n")
+    arena = annotated(src)
+    temps = [line_temps(arena, line) for line in arena.children(arena.root)]
+    assert not arena.consts
+
+    code_gen = CodeGenerator()
+    code_gen.generate(arena)
+    assert 2 * sum(temps) == len(code_gen.temp_manager.definitions)
+    assert temps[0] == 0 and temps[1] == 2
+
+
+# --- Tabela de resultados pré-calculados ---
+
+def test_evaluate_lines_follows_res_and_stops_at_mem():
+    arena = annotated("(2 3 +)\n(1.5 (1 RES) *)\n((1 MEM) 2 +)\n((2 RES) 1 +)\n((2 RES) 1 +)\n")
+    assert evaluate_lines(arena) == [0x4500, 0x4780, None, 0x4840, None]
+
+
+def test_evaluate_lines_wraps_res_index_like_res_op():
+    # res_op dobra o índice em 8 bits: a linha 129 lida como a linha 1.
+    arena = annotated("(1 2 +)\n" + "(5 0 +)\n" * 128 + "(1 RES)\n")
+    assert evaluate_lines(arena)[-1] == 0x4200
+
+
+def test_precomputed_program_prints_from_flash_table():
+    src = "(2 3 +)\n(1.5 (1 RES) *)\n((1 MEM) 2 +)\n((2 RES) 1 +)\n"
+    asm = compile_source(src, precompute=True).asm
+    main = asm[asm.index("\nmain:"):asm.index("\nend:")]
+
+    # A linha 1 a dobra comum já reduz a um LDI; só as que leem RES vão para a tabela.
+    assert "LDI r25, 69" in main and main.count("LPM r24, Z+") == 2 and main.count("RCALL add_f16") == 1
+    assert "LDI r26, LOW(1)" in main and "LDI r30, LOW(2*results_table+2)" in main
+    assert "results_table:\n    .db 0x80, 0x47, 0x40, 0x48\n" in asm
+    assert asm.split(".dseg\n")[1].startswith("results: .byte 8")
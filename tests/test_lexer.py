@@ -0,0 +1,184 @@
+import io
+import random
+from pathlib import Path
+
+import pytest
+
+from lexer.dfa import Lexer
+from lexer.compiled import CompiledLexer
+from lexer.errors import LexError
+from lexer.jff import JFF_PATH, cached_module_path, load_generated_lexer
+from lexer.line_index import LineIndex
+from lexer.token_stream import TokenStream
+from lexer.tokens import TokenType
+
+ROOT = Path(__file__).resolve().parent.parent
+CORPUS = sorted((ROOT / "samples").rglob("*.txt")) + sorted((ROOT / "programs").rglob("*.txt"))
+
+
+def lex_all(lexer_cls, src: str):
+    """Returns the token list (with each source line), or the (type, message) of the raised error."""
+    try:
+        return [(tok, tok.src_line) for tok in lexer_cls(src)]
+    except Exception as e:
+        return type(e), str(e)
+
+
+EDGE_CASES = [
+    "",
+    "  \n\t ",
+    "(1 2 +)",
+    "(-3.5 -2 -)",
+    "((res) (mem) if then else for)",
+    "(1 2 +",
+    "1.2.3",
+    "--5",
+    "5-",
+    "(1 @ 2)",
+    "(R E S)",
+    "(1 ² +)",
+    "(ıf)",
+]
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=lambda p: p.name)
+def test_compiled_matches_dfa_on_corpus(path):
+    src = path.read_text(encoding="utf8")
+    assert lex_all(CompiledLexer, src) == lex_all(Lexer, src)
+
+
+@pytest.mark.parametrize("src", EDGE_CASES)
+def test_compiled_matches_dfa_on_edge_cases(src):
+    assert lex_all(CompiledLexer, src) == lex_all(Lexer, src)
+
+
+def fuzz_sources(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    alphabet = "()0123456789.-+*/|%^ RESMIFTHNLOrmes \n\t@"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(count)]
+
+
+def test_vectorized_matches_dfa_on_corpus_and_fuzz():
+    from lexer.vectorized import VectorizedLexer
+
+    sources = [path.read_text(encoding="utf8") for path in CORPUS]
+    sources += EDGE_CASES + ["IFTHEN (2 RESMEM)", "-.5", "5-3 --5 1..2 .5 5.", "(1 é)"]
+    sources += fuzz_sources(2000)
+
+    for src in sources:
+        assert lex_all(VectorizedLexer, src) == lex_all(Lexer, src), src
+
+
+def test_generated_matches_dfa_on_corpus_and_fuzz():
+    generated = load_generated_lexer(build=True)
+
+    sources = [path.read_text(encoding="utf8") for path in CORPUS]
+    sources += EDGE_CASES + ["IFTHEN (2 RESMEM)", "(ſ ıf)", "(1 é)"] + fuzz_sources(2000)
+
+    for src in sources:
+        assert lex_all(generated, src) == lex_all(Lexer, src), src
+
+
+def test_generated_module_is_cached_by_jff_content(tmp_path):
+    jff = tmp_path / "rpn_dfa.jff"
+    jff.write_bytes(JFF_PATH.read_bytes())
+    assert cached_module_path(jff) == cached_module_path(JFF_PATH)
+
+    jff.write_bytes(JFF_PATH.read_bytes().replace(b"<label>KW_FOR</label>", b"<label>KW_FOR</label> "))
+    assert cached_module_path(jff) != cached_module_path(JFF_PATH)
+
+
+@pytest.mark.parametrize("lexer_cls", [Lexer, CompiledLexer, "generated"])
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+@pytest.mark.parametrize("src", EDGE_CASES + ["(1 é)\n(2 3 +)", "(12345.678 RES)\n(THEN ELSE)"])
+def test_streaming_matches_in_memory(lexer_cls, chunk_size, src, tmp_path):
+    if lexer_cls == "generated":
+        lexer_cls = load_generated_lexer(build=True)
+    expected = lex_all(Lexer, src)
+    data = src.encode("utf8")
+
+    assert lex_all(lambda _: lexer_cls.from_file(io.BytesIO(data), chunk_size), src) == expected
+
+    path = tmp_path / "src.txt"
+    path.write_bytes(data)
+    lexer = lexer_cls.from_mmap(path, chunk_size)
+    assert lex_all(lambda _: lexer, src) == expected
+    lexer.close()
+
+
+def test_generated_window_does_not_grow_to_the_next_space():
+    generated = load_generated_lexer(build=True)
+    src = "(1 " + "(2)" * 2000 + ")"
+    lexer = generated.from_file(io.BytesIO(src.encode("utf8")), 16)
+    widest = 0
+    for _ in lexer:
+        widest = max(widest, len(lexer.src))
+    assert widest < 64
+
+
+def test_tokens_resolve_their_source_line():
+    tokens = list(CompiledLexer("(1 2 +)\n(3 RES)\n"))
+    res = tokens[-2]
+    assert res.lexeme == "RES"
+    assert res.offset == 11
+    assert res.src_line == "(3 RES)"
+
+
+def test_incomplete_lexeme_points_at_its_line():
+    with pytest.raises(LexError) as err:
+        list(Lexer("(1 2 +)\n(3 RE"))
+    assert err.value.line == 2
+    assert err.value.src_line == "(3 RE"
+
+
+def test_compiled_reports_unexpected_character():
+    with pytest.raises(LexError) as err:
+        list(CompiledLexer("(1 $ 2)"))
+    assert err.value.line == 1
+    assert err.value.col == 4
+
+
+def test_line_of_and_text():
+    index = LineIndex("(1 2 +)\n\n(3 RES)")
+    assert len(index) == 3
+    assert index.line_of(0) == 1
+    assert index.line_of(7) == 1   # a própria quebra de linha
+    assert index.line_of(8) == 2
+    assert index.line_of(9) == 3
+    assert index.text_at(12) == "(3 RES)"
+    assert index.line_text(2) == ""
+
+
+def test_out_of_range_line_is_empty():
+    index = LineIndex("(1 2 +)")
+    assert index.line_text(0) == ""
+    assert index.line_text(2) == ""
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_token_stream_matches_tokens(streamed):
+    src = "(1 2 +)\n(3.5 res)\n"
+    lexer = CompiledLexer.from_file(io.BytesIO(src.encode("utf8")), 4) if streamed else CompiledLexer(src)
+    stream = TokenStream.from_tokens(lexer)
+    tokens = list(CompiledLexer(src))
+
+    assert len(stream) == len(tokens) + 1
+    assert [stream.token(k) for k in range(len(tokens))] == tokens
+    assert stream.src_line(6) == "(3.5 res)"
+    assert stream.type(len(stream) - 1) is TokenType.EOF
+    assert (stream.lines[-1], stream.cols[-1]) == (2, 10)
+
+
+def test_token_stream_append_keeps_lexemes_until_text_is_read():
+    src = "(1 2 +)\n(3.5 res)\n"
+    tokens = list(CompiledLexer(src))
+    stream = TokenStream()
+    for tok in tokens[:4]:
+        stream.append(tok)
+    assert stream.text == "(12+"
+    for tok in tokens[4:]:
+        stream.append(tok)
+
+    assert [stream.lexeme(k) for k in range(len(tokens))] == [tok.lexeme for tok in tokens]
+    assert stream.text == "".join(tok.lexeme for tok in tokens)
+    assert [stream.token(k) for k in range(len(tokens))] == tokens
@@ -1,9 +1,22 @@
+import io
+import os
+import re
+import sys
+
 import pytest
 
 from lexer.dfa import Lexer
+from lexer.compiled import CompiledLexer
 from lexer.tokens import Token, TokenType
+from lexer.token_stream import TokenStream
 from parser.parser import LL1Parser
-from parser.errors import LL1SyntaxError
+from parser.compiled import NT_BASE, N_TERMINALS
+from parser.arena import ASTArena
+from parser.table import M, P
+from parser import table_builder
+from parser.errors import LL1GrammarError, LL1SyntaxError
+from parser.render import GraphView, dot_source, format_ast, render_annotated_ast, render_ast, render_graph, write_dot
+from semantics.analyzer import SemanticAnalyzer
 
 
 def lex_and_parse(src: str):
@@ -46,3 +59,221 @@ def test_valid_programs(source):
 def test_invalid_programs_raise(source):
     with pytest.raises(LL1SyntaxError):
         lex_and_parse(source)
+
+
+def test_parse_token_stream_matches_token_list():
+    src = "((1 2 +) (3 RES) *)\n(MEM)\n( 10 ( ( (MEM) 1.05 * ) MEM ) FOR )"
+    from_list = lex_and_parse(src)
+    from_stream = LL1Parser().parse(TokenStream.from_tokens(Lexer(src)))
+    assert from_stream == from_list
+
+
+def test_syntax_error_reports_token_position_from_stream():
+    with pytest.raises(LL1SyntaxError) as err:
+        LL1Parser().parse(TokenStream.from_tokens(Lexer("(1 2 +)\n(1 2 + +)")))
+    assert (err.value.line, err.value.col) == (2, 8)
+    assert err.value.src_line == "(1 2 + +)"
+
+
+def test_compiled_grammar_matches_hand_table():
+    grammar = LL1Parser().grammar
+    for name, row in M.items():
+        nt = grammar.names.index(name)
+        for token_type in TokenType:
+            rule = grammar.table[(nt - NT_BASE) * N_TERMINALS + token_type.value]
+            assert rule == row.get(token_type, 0), (name, token_type)
+
+
+def test_renumbered_reduce_rule_is_rejected():
+    productions = {**P, 4: P[6], 6: P[4]}
+    with pytest.raises(ValueError, match="Rule 4"):
+        LL1Parser(M, productions)
+
+
+def test_built_table_matches_reference_table():
+    assert M == {
+        "<program>": {TokenType.L_PAREN: 1},
+        "<expr>": {TokenType.L_PAREN: 2},
+        "<rpn>": {TokenType.KW_MEM: 3, TokenType.NUM_INT: 4, TokenType.NUM_FLOAT: 4, TokenType.L_PAREN: 4},
+        "<rpn_tail>": {TokenType.KW_MEM: 5, TokenType.KW_RES: 5, TokenType.KW_IF: 5,
+                       TokenType.NUM_INT: 6, TokenType.NUM_FLOAT: 6, TokenType.L_PAREN: 6},
+        "<operand>": {TokenType.NUM_INT: 7, TokenType.NUM_FLOAT: 8, TokenType.L_PAREN: 9},
+        "<op_unary>": {TokenType.KW_MEM: 10, TokenType.KW_RES: 11, TokenType.KW_IF: 12},
+        "<op_binary>": {TokenType.KW_THEN: 13, TokenType.KW_ELSE: 14, TokenType.KW_FOR: 15,
+                        TokenType.ARITHMETIC_OP: 16},
+        "<program_tail>": {TokenType.L_PAREN: 17, TokenType.EOF: 18},
+    }
+
+
+def test_first_and_follow_sets():
+    first = table_builder.first_sets(P)
+    follow = table_builder.follow_sets(P, first=first)
+    assert set(first["<rpn_tail>"]) == {"KW_MEM", "KW_RES", "KW_IF", "NUM_INT", "NUM_FLOAT", "L_PAREN"}
+    assert set(first["<program_tail>"]) == {"L_PAREN", table_builder.EPSILON}
+    assert set(follow["<program_tail>"]) == {"EOF"}
+    assert set(follow["<op_binary>"]) == {"R_PAREN"}
+
+
+def test_table_is_cached_by_grammar_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_builder, "CACHE_DIR", tmp_path)
+    built = table_builder.load_table(P)
+    assert not built.from_cache
+    assert table_builder.cache_path(built.grammar_hash).exists()
+
+    cached = table_builder.load_table(P)
+    assert cached.from_cache and cached.table == built.table
+
+    changed = dict(P)
+    changed[19] = ("<op_binary>", ["KW_RES"])
+    assert table_builder.grammar_hash(changed) != built.grammar_hash
+
+
+def test_conflicts_are_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_builder, "CACHE_DIR", tmp_path)
+    ambiguous = dict(P)
+    ambiguous[19] = ("<rpn_tail>", ["<operand>", "<op_unary>"])
+
+    build = table_builder.build_table(ambiguous)
+    assert {(c.nonterminal, c.terminal) for c in build.conflicts} == {
+        ("<rpn_tail>", "NUM_INT"), ("<rpn_tail>", "NUM_FLOAT"), ("<rpn_tail>", "L_PAREN")
+    }
+    with pytest.raises(LL1GrammarError):
+        table_builder.load_table(ambiguous)
+
+
+def test_program_lines_are_flat_children():
+    ast = lex_and_parse("(1 2 +)\n(3 RES)\n(MEM)")
+    assert [child.label for child in ast.children] == ["+", "RES", "MEM"]
+    assert ast.token == ast.children[0].token
+
+
+def test_long_program_builds_no_tail_chain():
+    ast = LL1Parser().parse(TokenStream.from_tokens(CompiledLexer("(1 2 +)\n" * 100_000)))
+    assert len(ast.children) == 100_000
+    assert all(child.label == "+" for child in ast.children)
+
+
+def test_arena_ids_are_post_order():
+    src = "((1 2 +) (MEM) *)\n(3 RES)"
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+
+    assert [arena.label(n) for n in range(len(arena))] == ["1", "2", "+", "MEM", "*", "3", "RES", "<program>"]
+    assert arena.root == 7 and list(arena.children(arena.root)) == [4, 6]
+    for n in range(len(arena)):
+        assert all(child < n for child in arena.children(n))
+
+
+def test_arena_round_trips_through_object_tree():
+    src = "(((4 IF) (5 7 /) THEN) 3 ELSE)\n(10 (2.5 MEM) FOR)"
+    tree = lex_and_parse(src)
+    assert ASTArena.from_tree(tree).to_tree() == tree
+
+
+def test_parse_lines_pulls_tokens_one_line_at_a_time():
+    src = "((1 2 +) (MEM) *)\n(3 RES)\n(4 MEM)"
+    pulled = []
+
+    def tokens():
+        for tok in CompiledLexer(src):
+            pulled.append(tok)
+            yield tok
+
+    lines = LL1Parser().parse_lines(tokens())
+    first = next(lines)
+    assert [first.label(n) for n in range(len(first))] == ["1", "2", "+", "MEM", "*"]
+    assert len(pulled) == 11
+
+    batch = lex_and_parse(src)
+    assert [first.to_tree()] + [line.to_tree() for line in lines] == batch.children
+
+
+def test_parse_lines_reports_syntax_error_position():
+    with pytest.raises(LL1SyntaxError) as err:
+        list(LL1Parser().parse_lines(CompiledLexer("(1 2 +)\n(1 2 + 3)")))
+    assert (err.value.line, err.value.col) == (2, 8)
+
+
+def test_format_ast_is_indented_pre_order():
+    src = "((1 2 +) (MEM) *)\n(3 RES)"
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+    assert format_ast(arena) == "<program>\n  *\n    +\n      1\n      2\n    MEM\n  RES\n    3\n"
+
+    deep = "(" * 5000 + "1" + " 1 +)" * 5000
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(deep)))
+    assert format_ast(arena).count("\n") == len(arena)
+
+
+def dot_nodes(dot: str) -> list[str]:
+    return re.findall(r'^  (\w+) \[label="(.*?)"', dot, re.M)
+
+
+def test_dot_writer_renders_one_line_of_a_program():
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer("(1 2 +)\n(3 RES)\n" * 1000)))
+    out = io.StringIO()
+
+    assert write_dot(arena, out, view=GraphView(line=4)) == 2
+    assert dot_nodes(out.getvalue()) == [("n9", "RES"), ("n8", "3")]
+    assert "n9 -> n8;" in out.getvalue()
+    with pytest.raises(ValueError, match="Line 2001 is out of range"):
+        write_dot(arena, io.StringIO(), view=GraphView(line=2001))
+
+
+def test_dot_writer_respects_the_node_budget_and_depth():
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer("((1 2 +) (3 MEM) *)\n" * 100)))
+
+    dot = dot_source(arena, view=GraphView(max_nodes=10))
+    assert len(dot_nodes(dot)) == 11
+    assert dot_nodes(dot)[-1] == ("omitted", "... 591 more nodes")
+
+    dot = dot_source(arena, view=GraphView(max_depth=1))
+    assert dot_nodes(dot)[:2] == [("n600", "<program>"), ("n5", "*\\n... 6 nodes")]
+    assert len(dot_nodes(dot)) == 101
+
+
+def test_dot_writer_collapses_repeated_subtrees():
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer("((1 2 +) (1 2 +) *)\n((1 2 +) 3 |)")))
+    SemanticAnalyzer().annotate(arena)
+
+    dot = dot_source(arena, annotated=True, view=GraphView(collapse_repeats=True))
+    labels = [label for _, label in dot_nodes(dot)]
+    assert labels.count("{ + | type: INT | sign: UNKNOWN | same as n2 (3 nodes) }") == 2
+    assert "{ \\| | type: FLOAT | sign: UNKNOWN }" in labels
+    assert "{ \\<program\\> | type: VOID | sign: UNKNOWN }" in labels
+
+
+def test_render_ast_returns_a_digraph():
+    graphviz = pytest.importorskip("graphviz")
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer("(1 2 +)\n")))
+    SemanticAnalyzer().annotate(arena)
+
+    graph = render_ast(arena, fmt="svg")
+    assert isinstance(graph, graphviz.Digraph) and graph.format == "svg"
+    assert "\tn3 -> n2\n" in graph.body
+    graph.node("extra")
+
+    graph = render_annotated_ast(arena, fmt="svg")
+    assert isinstance(graph, graphviz.Digraph) and graph.format == "svg"
+    assert any("type: INT" in line and "shape=record" in line for line in graph.body)
+
+
+def fake_dot(tmp_path, monkeypatch, script: str) -> None:
+    dot = tmp_path / "dot"
+    dot.write_text(f"#!{sys.executable}\nimport sys\n{script}\n")
+    dot.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_render_graph_reads_stderr_while_writing_the_graph(tmp_path, monkeypatch):
+    # Enche o pipe de erros antes de ler a entrada: sem leitura em paralelo, trava.
+    fake_dot(tmp_path, monkeypatch, "sys.stderr.write('w' * (1 << 20)); sys.stderr.flush()\n"
+                                    "sys.stdout.write(str(len(sys.stdin.read())))")
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer("(1 2 +)\n" * 20000)))
+    view = GraphView(max_nodes=None)
+    assert int(render_graph(arena, view=view)) == len(dot_source(arena, view=view))
+
+
+def test_render_graph_reports_dot_that_stops_reading(tmp_path, monkeypatch):
+    fake_dot(tmp_path, monkeypatch, "sys.exit(0)")
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer("(1 2 +)\n" * 20000)))
+    with pytest.raises(RuntimeError, match="Graphviz 'dot' failed"):
+        render_graph(arena, view=GraphView(max_nodes=None))
@@ -0,0 +1,366 @@
+import asyncio
+import re
+import socket
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+import pipeline.api
+import pipeline.cache
+import pipeline.client
+from pipeline.api import compile_source
+from parser.render import GraphView
+from pipeline.cache import CompileCache, compile_cached, program_key
+from pipeline.client import main as client_main
+from pipeline.daemon import CompileServer, compile_request
+from pipeline.incremental import compile_incremental
+from pipeline.protocol import request
+from pipeline.parallel import split_source, compile_parallel, compile_serial
+from generator.generator import CodeGenerator
+from generator.linker import generate_fragments, link, LinkError
+from lexer.compiled import CompiledLexer
+from lexer.token_stream import TokenStream
+from parser.errors import LL1SyntaxError
+from parser.parser import LL1Parser
+from semantics.analyzer import SemanticAnalyzer
+from semantics.errors import SemanticError
+
+PROGRAM = "".join(
+    f"(({i} 2.5 +) (3 MEM) *)\n(2 (1 RES) FOR)\n(((1 IF) 2 THEN) 3 ELSE)\n" for i in range(50)
+)
+
+
+def test_split_source_cuts_only_between_top_level_expressions():
+    src = "(1 2 +)\n((3\n4 +) 5 *)\n(1 RES)\n(6 MEM)\n\n"
+    shards = split_source(src, 8)
+
+    assert "".join(shard.text for shard in shards) == src
+    assert [shard.first_line for shard in shards] == [0, 1, 2, 3]
+    assert shards[1].text == "((3\n4 +) 5 *)\n"
+
+
+def test_parallel_output_does_not_depend_on_sharding():
+    serial = compile_parallel(PROGRAM, 1)
+    assert compile_parallel(PROGRAM, 2) == serial
+    assert compile_parallel(PROGRAM, 5) == serial
+
+
+def test_namespaced_symbols_only_rename_default_ones():
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(PROGRAM)))
+    SemanticAnalyzer().annotate(arena)
+    code_gen = CodeGenerator()
+    code_gen.generate(arena)
+    fragments = compile_serial(PROGRAM)
+    code = "\n".join(fragment.code for fragment in fragments)
+    temp_definitions = "\n".join(d for fragment in fragments for d in fragment.temp_definitions)
+
+    def normalize(code: str) -> str:
+        names = {}
+        return re.sub(r"\b(T|else_|endif_|for_start_|for_end_)[\d_]*\d",
+                      lambda m: names.setdefault(m.group(), f"{m.group(1)}#{len(names)}"), code)
+
+    assert "T1_1" in code and fragments[1].labels == ("for_start_2_1", "for_end_2_2")
+    assert normalize(code) == normalize(code_gen.get_main_code())
+    assert normalize(temp_definitions) == normalize(code_gen.get_temp_definitions())
+
+
+def test_parallel_errors_report_program_position():
+    src = PROGRAM + "(2.5 (1 2 +) FOR)\n" + PROGRAM
+    with pytest.raises(SemanticError) as err:
+        compile_parallel(src, 4)
+    assert "(line 151, col 2)" in str(err.value)
+
+
+@pytest.mark.parametrize("edited", ["", "\n  \n"])
+def test_incremental_deleting_every_line_fails_like_a_full_compile(edited):
+    _, build = compile_incremental(PROGRAM)
+    with pytest.raises(LL1SyntaxError) as err:
+        compile_incremental(edited, build)
+    with pytest.raises(LL1SyntaxError) as full:
+        compile_serial(edited)
+    assert str(err.value) == str(full.value)
+
+
+def test_fragments_link_in_any_order_and_on_threads():
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(PROGRAM)))
+    SemanticAnalyzer().annotate(arena)
+    fragments = generate_fragments(arena)
+
+    with ThreadPoolExecutor(4) as pool:
+        assert generate_fragments(arena, executor=pool) == fragments
+    assert link(reversed(fragments)) == link(fragments) == compile_parallel(PROGRAM, 1)
+
+
+def test_link_rejects_missing_lines_and_clashing_symbols():
+    fragments = compile_serial("((1 MEM) 2 +)\n((3 MEM) 4 *)\n((5 MEM) 6 -)")[::2]
+    with pytest.raises(LinkError, match="Missing fragment for line 2"):
+        link(fragments)
+
+    first = fragments[0]
+    with pytest.raises(LinkError, match="Symbol 'T1_1_L'"):
+        link([first, replace(first, line_index=1)])
+
+
+# --- Cache de compilação ---
+
+def test_cache_serves_unchanged_program_without_compiling(tmp_path, monkeypatch):
+    with CompileCache(tmp_path) as cache:
+        cold = compile_cached(PROGRAM, cache)
+        assert cold == compile_parallel(PROGRAM, 1)
+
+        monkeypatch.setattr(pipeline.cache, "CompiledLexer", None)
+        assert compile_cached(PROGRAM, cache) == cold
+        assert cache.stats.hits == {"program": 1, "line": 0}
+
+
+def test_cache_reuses_fragments_of_unchanged_lines(tmp_path):
+    edited = PROGRAM.replace("((7 2.5 +)", "((7 2.5 -)")
+    with CompileCache(tmp_path) as cache:
+        compile_cached(PROGRAM, cache)
+        # Espaços extras não mudam a sequência de tokens das linhas.
+        assert compile_cached(edited.replace(" ", "  "), cache) == compile_parallel(edited, 1)
+        assert cache.stats.hits["line"] == 149 and cache.stats.misses["line"] == 151
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    with CompileCache(tmp_path, max_bytes=40_000) as cache:
+        compile_cached("(1 2 +)", cache)
+        compile_cached(PROGRAM, cache)
+        assert cache.size() <= 40_000
+        assert cache.get_program(program_key("(1 2 +)")) is None
+
+
+def test_cache_reports_errors_like_uncached_compile(tmp_path):
+    src = PROGRAM + "(2.5 (1 2 +) FOR)\n"
+    with CompileCache(tmp_path) as cache, pytest.raises(SemanticError) as err:
+        compile_cached(src, cache)
+    assert "(line 151, col 2)" in str(err.value)
+
+
+def test_cache_keeps_annotated_ast(tmp_path):
+    with CompileCache(tmp_path) as cache:
+        compile_cached("(1 2.5 +)\n(1 RES)", cache, keep_ast=True)
+        arena = cache.get_ast(program_key("(1 2.5 +)\n(1 RES)"))
+    assert [arena.label(n) for n in range(len(arena))] == ["1", "2.5", "+", "1", "RES", "<program>"]
+    assert arena.casts[0]
+
+
+# --- Recompilação incremental ---
+
+def test_incremental_recompiles_only_the_edited_expression():
+    _, build = compile_incremental(PROGRAM)
+    edited = PROGRAM.replace("(((1 IF) 2 THEN) 3 ELSE)\n(", "(((1 IF) 2\nTHEN) 4 ELSE)\n(", 1)
+
+    asm, build = compile_incremental(edited, build)
+    assert asm == compile_parallel(edited, 1)
+    assert build.recompiled == 1 and build.spans[2] == (2, 3)
+
+    asm, build = compile_incremental(edited, build)
+    assert build.recompiled == 0
+
+
+def test_incremental_insertion_shifts_following_lines():
+    _, build = compile_incremental(PROGRAM)
+    lines = PROGRAM.split("\n")
+    edited = "\n".join(lines[:140] + ["(7 (2 RES) *)"] + lines[140:])
+
+    asm, build = compile_incremental(edited, build)
+    assert asm == compile_parallel(edited, 1)
+    assert build.recompiled == 11 and len(build.codes) == 151
+
+
+def test_incremental_errors_report_program_position():
+    _, build = compile_incremental(PROGRAM)
+    with pytest.raises(SemanticError) as err:
+        compile_incremental(PROGRAM + "(2.5 (1 2 +) FOR)\n", build)
+    assert "(line 151, col 2)" in str(err.value)
+
+
+# --- Servidor de compilação ---
+
+def test_compile_server_round_trip(tmp_path):
+    socket_path = tmp_path / "rpn.sock"
+    server = None
+    ready = threading.Event()
+
+    def run():
+        nonlocal server
+
+        async def serve():
+            nonlocal server
+            server = CompileServer(socket_path, workers=1)
+            task = asyncio.create_task(server.serve())
+            while not socket_path.exists():
+                await asyncio.sleep(0.01)
+            ready.set()
+            await task
+
+        asyncio.run(serve())
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        assert ready.wait(30)
+        assert request({"command": "ping"}, socket_path)["workers"] == 1
+
+        response = request({"source": "(1 2.5 +)\n(1 RES)", "lexer": "compiled"}, socket_path)
+        assert response["ok"] and "; --- Line 2 ---" in response["asm"]
+
+        response = request({"source": "(1 RES)"}, socket_path)
+        assert not response["ok"] and "Only 0 previous result(s)" in response["error"]
+
+        response = request({"shutdown": True}, socket_path)
+        assert response == {"ok": False, "error": "Invalid request: missing or unknown 'source'."}
+        response = request({"command": "stop"}, socket_path)
+        assert response == {"ok": False, "error": "Invalid request: unknown command 'stop'."}
+
+        response = request({"source": "(70000 1 +)"}, socket_path)
+        assert not response["ok"] and "Literal '70000' is out of range" in response["error"]
+
+        src = tmp_path / "prog.txt"
+        src.write_text("(1 2 +)\n(3 4 *)")
+        client_main([str(src), "--socket", str(socket_path)])
+        assert (tmp_path / "prog.asm").read_text() == compile_request({"source": src.read_text()})["asm"]
+    finally:
+        request({"command": "shutdown"}, socket_path)
+        thread.join(30)
+    assert not socket_path.exists()
+
+
+def test_compile_request_forwards_precompute():
+    src = "(1 2.5 +)\n(1 RES)"
+    response = compile_request({"source": src, "precompute": True})
+    assert response["asm"] == compile_source(src, precompute=True).asm != compile_source(src).asm
+
+
+def test_client_reports_a_dropped_connection(tmp_path, capsys):
+    socket_path = tmp_path / "rpn.sock"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(socket_path))
+    listener.listen()
+
+    def drop():
+        conn, _ = listener.accept()
+        conn.recv(1 << 16)
+        conn.close()
+
+    thread = threading.Thread(target=drop)
+    thread.start()
+    src = tmp_path / "prog.txt"
+    src.write_text("(1 2 +)")
+    with pytest.raises(SystemExit):
+        client_main([str(src), "--socket", str(socket_path)])
+    thread.join(30)
+    listener.close()
+    assert "Compile server closed the connection." in capsys.readouterr().out
+
+
+def test_client_compiles_in_process_for_other_artifacts(tmp_path, monkeypatch):
+    def no_server(*args):
+        raise AssertionError("the server only returns the .asm")
+
+    monkeypatch.setattr(pipeline.client, "request", no_server)
+    src = tmp_path / "prog.txt"
+    src.write_text("(1 2 +)")
+    client_main([str(src), "--emit", "tokens,asm"])
+    assert (tmp_path / "prog_tokens.txt").exists() and (tmp_path / "prog.asm").exists()
+
+    src.write_text("(1 2 +)\n(3 4 *)")
+    client_main([str(src), "--emit", "dot", "--graph-line", "2"])
+    dot = (tmp_path / "prog_ast.dot").read_text()
+    assert 'label="*"' in dot and 'label="+"' not in dot
+
+    for mode in (["--stream"], ["--jobs", "2"]):
+        (tmp_path / "prog.asm").unlink()
+        client_main([str(src), *mode])
+        assert (tmp_path / "prog.asm").exists()
+
+
+@pytest.mark.parametrize("options", [["--stream", "--precompute"], ["--jobs", "2", "--emit", "ast"],
+                                     ["--incremental", "--emit", "tokens"]])
+def test_client_rejects_what_main_rejects(options, tmp_path, capsys):
+    src = tmp_path / "prog.txt"
+    src.write_text("(1 2 +)")
+    with pytest.raises(SystemExit) as exit_info:
+        client_main([str(src), *options])
+    assert exit_info.value.code == 2 and "only supported in the default mode" in capsys.readouterr().err
+
+
+# --- API de biblioteca ---
+
+def test_compile_source_returns_every_stage_in_memory():
+    result = compile_source(PROGRAM, lexer="compiled")
+
+    assert result.ok and result.num_lines == 150
+    assert result.asm == compile_request({"source": PROGRAM})["asm"]
+    assert result.tokens.lexeme(0) == "("
+    assert result.ast.label == "<program>"
+    assert result.annotated_ast.children[0].eval_type.name == "FLOAT"
+    assert set(result.timings) == {"tokens", "ast", "annotated-ast", "asm"}
+    assert result.images == {}
+
+
+def test_compile_source_runs_only_the_requested_stages():
+    result = compile_source(PROGRAM, stages=["ast"])
+
+    assert result.ok and result.arena is not None
+    assert result.annotated_ast is None and result.asm is None
+    assert set(result.timings) == {"tokens", "ast"}
+
+    with pytest.raises(ValueError, match="Unknown stage 'png'"):
+        compile_source(PROGRAM, stages=["png"])
+
+
+def test_compile_source_reports_diagnostics_instead_of_raising():
+    result = compile_source("(1 2 +)\n(3 RES)")
+    assert result.asm is None and result.arena is not None and not result.annotated
+    [diagnostic] = result.diagnostics
+    assert (diagnostic.stage, diagnostic.line, diagnostic.col) == ("annotated-ast", 2, 2)
+    assert isinstance(diagnostic.error, SemanticError)
+    assert "Cannot 'RES' 3 lines back" in str(diagnostic)
+
+    result = compile_source("(1 2 $)")
+    assert result.tokens is None and result.diagnostics[0].stage == "tokens"
+
+
+def test_compile_source_reports_out_of_range_literals():
+    result = compile_source("(1 2 +)\n(70000 1 +)")
+    assert result.asm is None and not result.annotated
+    [diagnostic] = result.diagnostics
+    assert (diagnostic.stage, diagnostic.line, diagnostic.col) == ("annotated-ast", 2, 2)
+    assert "Literal '70000' is out of range for a 16-bit float" in str(diagnostic)
+    assert compile_source("(65504 1 +)").ok
+
+
+def test_compile_source_renders_images_in_the_background(monkeypatch):
+    threads = []
+
+    def render_graph(*args):
+        threads.append(threading.current_thread())
+        return pipeline.api.render_graph.__wrapped__(*args)
+
+    render_graph.__wrapped__ = pipeline.api.render_graph
+    monkeypatch.setattr(pipeline.api, "render_graph", render_graph)
+    result = compile_source(PROGRAM, render=True, image_format="dot", view=GraphView(line=2))
+
+    assert result.ok and set(result.images) == {"ast", "annotated-ast"}
+    assert result.images["ast"].decode() == 'digraph AST {\n  n9 [label="FOR"];\n  n6 [label="2"];\n  n9 -> n6;\n' \
+                                            '  n8 [label="RES"];\n  n9 -> n8;\n  n7 [label="1"];\n  n8 -> n7;\n}\n'
+    assert b"type: FLOAT" in result.images["annotated-ast"]
+    assert "render" in result.timings
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+    result = compile_source("(1 2 +)\n(3 RES)", render=True, image_format="dot")
+    assert list(result.images) == ["ast"]
+
+
+def test_main_does_not_import_graphviz():
+    code = "import sys, main; print('graphviz' in sys.modules, 'numpy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parents[1],
+                         capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["False", "False"]
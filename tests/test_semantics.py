@@ -4,6 +4,10 @@ from semantics.analyzer import SemanticAnalyzer, AnnotatedASTNode, SemanticError
 from semantics.types import SemanticType, SignType
 from parser.ast_node import ASTNode
 from lexer.tokens import Token
+from generator.generator import CodeGenerator
+from lexer.compiled import CompiledLexer
+from lexer.token_stream import TokenStream
+from parser.parser import LL1Parser
 
 
 @pytest.fixture
@@ -145,3 +149,55 @@ def test_incomplete_then_is_error(analyzer: SemanticAnalyzer):
 
     assert "Incomplete conditional" in str(err.value)
 
+
+
+# --- Aninhamento profundo ---
+
+def test_deeply_nested_expression_does_not_recurse(analyzer: SemanticAnalyzer):
+    ast = ASTNode("1")
+    for _ in range(100_000):
+        ast = ASTNode("+", [ast, ASTNode("1")])
+
+    result = analyzer.analyze(ASTNode("<program>", children=[ast]))
+    assert result.children[0].eval_type == SemanticType.INT
+
+    generator = CodeGenerator()
+    generator.generate(ASTNode("<program>", children=[ast]))
+    assert "; --- Line 1 ---" in generator.get_main_code()
+
+
+def test_annotate_arena_in_place(analyzer: SemanticAnalyzer):
+    tokens = TokenStream.from_tokens(CompiledLexer("(1 2.5 +)\n(1 RES)"))
+    arena = LL1Parser().parse_arena(tokens)
+
+    assert analyzer.annotate(arena) is arena
+    assert [arena.eval_type(n) for n in range(len(arena))] == [
+        SemanticType.INT, SemanticType.FLOAT, SemanticType.FLOAT,
+        SemanticType.INT, SemanticType.FLOAT, SemanticType.VOID
+    ]
+    assert arena.casts[0] and not arena.casts[1]
+
+
+def test_streaming_front_end_matches_batch_pipeline(analyzer: SemanticAnalyzer):
+    src = "(1 2.5 +)\n((1 RES) 3 *)\n(((2 IF) (5 7 /) THEN) 3 ELSE)\n(10 (2.5 MEM) FOR)\n(MEM)"
+
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+    SemanticAnalyzer().annotate(arena)
+    batch = CodeGenerator()
+    batch.generate(arena)
+
+    streaming = CodeGenerator()
+    chunks = []
+    for line_index, line in enumerate(LL1Parser().parse_lines(CompiledLexer(src), analyzer.annotate_node)):
+        analyzer.check_line(line, line.root)
+        streaming.generate_line(line, line_index)
+        chunks.append(streaming.take_main_code())
+
+    assert "\n".join(chunks) == batch.get_main_code()
+    assert streaming.get_temp_definitions() == batch.get_temp_definitions()
+
+
+def test_streaming_front_end_checks_res_range(analyzer: SemanticAnalyzer):
+    with pytest.raises(SemanticError) as err:
+        list(LL1Parser().parse_lines(CompiledLexer("(1 2 +)\n(2 RES)"), analyzer.annotate_node))
+    assert "Only 1 previous result(s) are available" in str(err.value)
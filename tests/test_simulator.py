@@ -0,0 +1,191 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from generator import f16
+from generator.generator import generate_data_segment, generate_full_header
+from generator.table import evaluate_lines
+from lexer.compiled import CompiledLexer
+from lexer.token_stream import TokenStream
+from parser.parser import LL1Parser
+from pipeline.api import compile_source
+from semantics.analyzer import SemanticAnalyzer
+from simulator import avr
+from simulator.assembler import AssemblerError, assemble
+from simulator.batch import evaluate_sources
+from simulator.interpreter import Interpreter, InterpreterError, interpret, main, read_expected
+
+SAMPLES = Path(__file__).resolve().parent.parent / "samples"
+
+
+def annotated(src: str):
+    arena = LL1Parser().parse_arena(TokenStream.from_tokens(CompiledLexer(src)))
+    SemanticAnalyzer().annotate(arena)
+    return arena
+
+
+# --- Interpretador de referência ---
+
+@pytest.mark.parametrize("name", ["res_tests", "mem_tests"])
+def test_interpreter_matches_expected_samples(name, capsys):
+    source = SAMPLES / name / f"{name}.txt"
+    assert main([str(source), "--expected", str(source.with_name(f"{name}_expected.txt"))]) == 0
+    assert capsys.readouterr().out == ""
+
+
+def test_read_expected_accepts_both_sample_formats():
+    assert read_expected("0x5cb0\n0x6088\n") == ["0x5CB0", "0x6088"]
+    assert read_expected("(100 2 /)    => 50 (0x5240)\n(5 RES)    => 50 (0x5240)") == ["0x5240", "0x5240"]
+
+
+def test_interpreter_keeps_memory_and_loop_results():
+    src = "(MEM)\n(3 (((MEM) 1 +) MEM) FOR)\n(0 (7 MEM) FOR)\n(MEM)\n"
+    assert interpret(annotated(src)) == [0x0000, 0x4200, 0x0000, 0x4200]
+
+
+def test_nested_for_never_terminates():
+    arena = annotated("(2 (3 (1 2 +) FOR) FOR)\n")
+    with pytest.raises(InterpreterError, match="does not terminate"):
+        Interpreter(max_iterations=10_000).run(arena)
+
+
+def test_res_follows_res_op_addressing():
+    arena = annotated("(1 2 +)\n(4 5 +)\n(2 RES)\n")
+    assert Interpreter(results_address=0x1FC).run(arena)[-1] == 0x4200
+    # 0xFE + 2 * 1 perde o vai-um: lê 0x0100 em vez de 0x0200.
+    with pytest.raises(InterpreterError, match="RES reads 0x0100"):
+        Interpreter(results_address=0x1FE).run(annotated("(1 2 +)\n(4 5 +)\n((1 RES) (2 RES) +)\n"))
+
+
+def test_precomputed_table_agrees_with_interpreter():
+    for source in SAMPLES.glob("*/*_tests.txt"):
+        arena = annotated(source.read_text(encoding="utf8"))
+        expected = interpret(arena, precompute=True)
+        values = evaluate_lines(arena)
+        assert [v for v in values if v is not None] == [e for v, e in zip(values, expected) if v is not None]
+
+
+# --- Avaliação em lote ---
+
+def test_batch_agrees_with_interpreter_on_unflagged_lines():
+    sources = sorted(SAMPLES.glob("*/*_tests.txt"))
+    batch = evaluate_sources(source.read_text(encoding="utf8") for source in sources)
+    for p, source in enumerate(sources):
+        values, flags = batch.program(p)
+        expected = interpret(annotated(source.read_text(encoding="utf8")))
+        assert not all(flags)
+        assert [v for v, f in zip(values, flags) if not f] == [e for e, f in zip(expected, flags) if not f]
+
+
+def test_batch_flags_lines_that_depend_on_inexact_results():
+    # 2048 + 3 trunca na placa (0x6801) e arredonda no numpy (0x6802).
+    batch = evaluate_sources(["(1 2 +)\n(2048 3 +)\n((1 RES) 1 -)\n((((2 RES) IF) 5 THEN) 6 ELSE)\n(7 8 *)\n",
+                              "(2 (3 (1 2 +) FOR) FOR)\n(1 1 +)\n"], max_steps=10_000)
+    values, flags = batch.program(0)
+    assert flags == [False, True, True, True, False]
+    assert values[0] == 0x4200 and values[4] == 0x5300
+    # O FOR aninhado não termina: a raia inteira fica marcada.
+    assert batch.program(1)[1] == [True, True]
+
+
+def test_batch_abandons_nested_for_lanes_without_waiting_for_the_step_budget():
+    # Sem abandonar a raia, seriam 10^9 passos.
+    batch = evaluate_sources(["(1 2 +)\n(2 (3 (1 2 +) FOR) FOR)\n", "(2 (((MEM) 1 +) MEM) FOR)\n"],
+                             max_steps=10 ** 9)
+    assert batch.program(0) == ([0x4200, 0x7E00], [False, True])
+    assert batch.program(1) == ([0x4000], [False])
+
+
+def test_batch_lanes_keep_their_own_loop_counters():
+    sources = [f"(0 MEM)\n({n} (((MEM) 1 +) MEM) FOR)\n" for n in (0, 3, 255)]
+    batch = evaluate_sources(sources)
+    assert [batch.program(p) for p in range(3)] == [
+        ([0x0000, 0x0000], [False, False]),
+        ([0x0000, 0x4200], [False, False]),
+        ([0x0000, 0x5BF8], [False, False]),
+    ]
+
+
+# --- Simulador do ATmega328P ---
+
+ROUTINES = {"+": "add_f16", "-": "sub_f16", "*": "mul_f16", "|": "div_f16", "/": "div_int_f16",
+            "%": "mod_f16", "^": "pow_f16"}
+
+
+def routine_calls(cases: list[tuple[str, int, int]]) -> str:
+    """Programa que chama a rotina de cada operação com A em r25:r24 e B em r23:r22 e imprime o resultado."""
+    body = []
+    for op, a, b in cases:
+        body += [f"    LDI r24, {a & 0xFF}", f"    LDI r25, {a >> 8}", f"    LDI r22, {b & 0xFF}",
+                 f"    LDI r23, {b >> 8}", f"    CALL {ROUTINES[op]}", "    CALL print_f16"]
+    return generate_full_header() + "\n".join(body) + "\nend:\n\trjmp end\n" + generate_data_segment(2, "")
+
+
+@pytest.mark.parametrize("precompute", [False, True])
+def test_board_prints_what_the_interpreter_predicts(precompute):
+    for source in SAMPLES.glob("*/*_tests.txt"):
+        result = compile_source(source.read_text(encoding="utf8"), precompute=precompute)
+        simulation = avr.simulate(result.asm)
+        assert simulation.output.endswith(b"\r\n")
+        assert simulation.values == interpret(result.arena, precompute), source.name
+
+
+def test_f16_model_matches_avr_routines():
+    rng = random.Random(0)
+    cases = [("+", 0x1515, 0x01EA), ("+", 0x0400, 0x0000), ("-", 0x0000, 0x0000), ("^", 0x4000, 0x5C00)]
+    for op in ROUTINES:
+        for _ in range(40):
+            a, b = rng.randrange(0x10000), rng.randrange(0x10000)
+            cases.append((op, a, f16.to_bits(float(b % 20)) if op == "^" else b))
+    values = avr.simulate(routine_calls(cases)).values
+    assert values == [f16.BINARY_OPS[op](a, b) for op, a, b in cases]
+
+
+def test_cycle_counts_follow_the_datasheet():
+    asm = """
+.include "m328Pdef.inc"
+    ldi r16, 2        ; 1
+loop:
+    dec r16           ; 1 + 1
+    brne loop         ; 2 (tomado) + 1
+    rcall f           ; 3, mais 4 do ret
+    lds r17, 0x100    ; 2
+    sbrc r17, 0       ; 3: pula um sts de duas palavras
+    sts UDR0, r17
+end:
+    rjmp end
+f:
+    ret
+"""
+    simulation = avr.simulate(asm)
+    assert (simulation.cycles, simulation.instructions, simulation.output) == (18, 9, b"")
+
+
+def test_usart_timing_waits_for_each_frame():
+    asm = compile_source("(1 2 +)\n").asm
+    instant, timed = avr.simulate(asm), avr.simulate(asm, usart_timing=True)
+    assert instant.output == timed.output == b"0x4200\r\n"
+    # 2400 baud com 16 MHz: UBRR0 = 416, 10 bits por quadro.
+    frame = 16 * 417 * 10
+    # UDR0 e o registrador de deslocamento guardam dois bytes: os outros seis esperam um quadro cada.
+    assert 5 * frame < timed.cycles - instant.cycles <= 6 * frame
+
+
+def test_assembler_reports_source_locations():
+    with pytest.raises(AssemblerError, match=r"<asm>:2: unknown instruction or directive 'fmul'"):
+        assemble("    ldi r16, 1\n    fmul r16, r17\n")
+    with pytest.raises(AssemblerError, match="needs a register from r16 to r31"):
+        assemble("    ldi r0, 1\n")
+    with pytest.raises(AssemblerError, match="out of reach"):
+        assemble("    breq far\n" + "    nop\n" * 100 + "far:\n    ret\n")
+    with pytest.raises(AssemblerError, match=r"<asm>:4: macro 'store' uses @1 but got 1 argument\(s\)"):
+        assemble(".macro store\n    sts @0, @1\n.endmacro\n    store 0x100\n")
+
+
+def test_avr_main_runs_rpn_programs(capsys):
+    source = SAMPLES / "res_tests" / "res_tests.txt"
+    assert avr.main([str(source), "--precompute", "--cycles"]) == 0
+    out, err = capsys.readouterr()
+    assert read_expected(out) == read_expected((SAMPLES / "res_tests" / "res_tests_expected.txt").read_text())
+    assert err.endswith("instructions\n")